@@ -0,0 +1,73 @@
+"""Benchmark of the compact inputs against the full ones, stored size and load
+time of a synthetic padded tensor, and the time to rebuild the masks by batches.
+
+Usage:
+    $ python -m benchmarks.compact_benchmark --rows 100000 --max_length 128
+"""
+import os
+from pathlib import Path
+import tempfile
+
+import click
+import numpy as np
+from transformers.tokenization_utils_base import BatchEncoding
+
+from benchmarks.utils import synthetic_padded_ids, timeit
+from bert_extractor.compact import CompactEncoding, compact_batch
+from bert_extractor.compression import CompressedTensorReader
+from bert_extractor.extractors.base import TokenizedTensor
+from bert_extractor.utils import from_pickle, store_tensor
+
+
+@click.command()
+@click.option("--rows", type=click.INT, default=100_000, help="Amount of sentences")
+@click.option("--max_length", type=click.INT, default=128, help="Padded length")
+@click.option("--batch_size", type=click.INT, default=32, help="Training batch size")
+@click.option("--codec", default="zstd", help="Codec of the compressed files")
+def main(rows: int, max_length: int, batch_size: int, codec: str):
+    """Print size and load time of the full and compact tensors, pickled and
+    compressed, and the time to read the compact inputs by batches."""
+    input_ids, attention_mask, token_type_ids = synthetic_padded_ids(rows, max_length)
+    full = BatchEncoding(
+        {
+            "input_ids": input_ids,
+            "token_type_ids": token_type_ids,
+            "attention_mask": attention_mask,
+        }
+    )
+    compact = CompactEncoding(compact_batch(dict(full)))
+
+    print(f"{'inputs':<10}{'store':>8}{'MB':>10}{'load s':>10}")
+    for name, inputs in [("full", full), ("compact", compact)]:
+        tensor = TokenizedTensor(inputs, inputs, np.zeros(rows), np.zeros(rows))
+        for store in ["pickle", codec]:
+            with tempfile.TemporaryDirectory() as output_path:
+                if store == "pickle":
+                    filepath = store_tensor(tensor, output_path, "bench")
+                    load_time = timeit(lambda: from_pickle(filepath))
+                else:
+                    filepath = store_tensor(tensor, output_path, "bench", codec)
+
+                    def load():
+                        with CompressedTensorReader(filepath) as reader:
+                            reader.to_tensor()
+
+                    load_time = timeit(load)
+                size = os.path.getsize(Path(filepath))
+            print(f"{name:<10}{store:>8}{size / 2 ** 20:>10.1f}{load_time:>10.3f}")
+
+    def iterate_full():
+        return [
+            {key: value[start : start + batch_size] for key, value in full.items()}
+            for start in range(0, rows, batch_size)
+        ]
+
+    def iterate_compact():
+        return list(compact.iter_batches(batch_size))
+
+    print(f"Batches of {batch_size} rows, full: {timeit(iterate_full):.3f}s")
+    print(f"Batches of {batch_size} rows, compact: {timeit(iterate_compact):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
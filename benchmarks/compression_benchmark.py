@@ -0,0 +1,81 @@
+"""Benchmark of the store_tensor codecs on a synthetic padded tensor.
+
+Usage:
+    $ python -m benchmarks.compression_benchmark --rows 100000 --max_length 128
+"""
+import os
+from pathlib import Path
+import tempfile
+
+import click
+import numpy as np
+from transformers.tokenization_utils_base import BatchEncoding
+
+from benchmarks.utils import synthetic_padded_ids, timeit
+from bert_extractor.compression import CompressedTensorReader
+from bert_extractor.extractors.base import TokenizedTensor
+from bert_extractor.utils import from_pickle, store_tensor
+
+CODECS_LEVELS = [
+    ("gzip", 1),
+    ("gzip", 6),
+    ("zstd", 1),
+    ("zstd", 3),
+    ("zstd", 9),
+    ("lz4", 0),
+    ("lz4", 9),
+]
+
+
+@click.command()
+@click.option("--rows", type=click.INT, default=100_000, help="Amount of sentences")
+@click.option("--max_length", type=click.INT, default=128, help="Padded length")
+@click.option("--workers", type=click.INT, default=None, help="Compression threads")
+def main(rows: int, max_length: int, workers: int):
+    """Print write time, read time and size of each codec against pickle."""
+    input_ids, attention_mask, token_type_ids = synthetic_padded_ids(rows, max_length)
+    inputs = BatchEncoding(
+        {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "token_type_ids": token_type_ids,
+        }
+    )
+    tensor = TokenizedTensor(inputs, inputs, np.zeros(rows), np.zeros(rows))
+
+    with tempfile.TemporaryDirectory() as output_path:
+        write_time = timeit(lambda: store_tensor(tensor, output_path, "bench"))
+        filepath = Path(output_path) / "bench_bert_extraction_tensor.pkl"
+        read_time = timeit(lambda: from_pickle(filepath))
+        raw_size = os.path.getsize(filepath)
+        print(
+            f"{'codec':<10}{'level':>6}{'write s':>10}{'read s':>10}"
+            f"{'MB':>10}{'ratio':>8}"
+        )
+        print(
+            f"{'pickle':<10}{'-':>6}{write_time:>10.3f}{read_time:>10.3f}"
+            f"{raw_size / 2 ** 20:>10.1f}{1:>8.1f}"
+        )
+
+        for codec, level in CODECS_LEVELS:
+            write_time = timeit(
+                lambda: store_tensor(
+                    tensor, output_path, "bench", codec, level, workers
+                )
+            )
+            filepath = Path(output_path) / f"bench_bert_extraction_tensor.{codec}"
+
+            def read():
+                with CompressedTensorReader(filepath) as reader:
+                    reader.to_arrays()
+
+            read_time = timeit(read)
+            size = os.path.getsize(filepath)
+            print(
+                f"{codec:<10}{level:>6}{write_time:>10.3f}{read_time:>10.3f}"
+                f"{size / 2 ** 20:>10.1f}{raw_size / size:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
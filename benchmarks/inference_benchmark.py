@@ -0,0 +1,78 @@
+"""Latency benchmark of tokenize_for_inference, micro-batched concurrent
+calls against a tokenizer call per text.
+
+Usage:
+    $ python -m benchmarks.inference_benchmark --clients 16 --calls 200
+"""
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Callable, List
+
+import click
+import numpy as np
+
+from benchmarks.utils import synthetic_sentences
+from bert_extractor.extractors.base import BaseBERTExtractor
+
+
+def latencies(
+    call: Callable[[str], object], sentences: List[str], clients: int
+) -> np.ndarray:
+    """Milliseconds of each call, with `clients` concurrent callers."""
+
+    def timed(sentence: str) -> float:
+        start = perf_counter()
+        call(sentence)
+        return (perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(clients) as executor:
+        return np.array(list(executor.map(timed, sentences)))
+
+
+@click.command()
+@click.option(
+    "--pretrained", type=click.STRING, default="bert-base-uncased", help="Tokenizer"
+)
+@click.option("--clients", type=click.INT, default=16, help="Concurrent callers")
+@click.option("--calls", type=click.INT, default=200, help="Calls per client")
+@click.option("--max_length", type=click.INT, default=128, help="Padded length")
+def main(pretrained: str, clients: int, calls: int, max_length: int):
+    """Print p50 and p99 latency and throughput of each path."""
+    extractor = BaseBERTExtractor(pretrained, "text", "label")
+    tokenizer = extractor.load_tokenizer()
+    words = [word for word in tokenizer.get_vocab() if word.isalpha()]
+    sentences = synthetic_sentences(clients * calls, words)
+    manifest = {"pretrained_model_name_or_path": pretrained, "max_length": max_length}
+
+    def micro_batched(max_latency_ms: float) -> Callable[[str], object]:
+        batched = BaseBERTExtractor(pretrained, "text", "label")
+        batched.tokenize_for_inference(
+            "warm up", manifest, max_latency_ms=max_latency_ms
+        )
+        return batched.tokenize_for_inference
+
+    paths = {
+        "per_call": lambda sentence: tokenizer(
+            [sentence],
+            max_length=max_length,
+            padding="max_length",
+            truncation=True,
+            return_tensors="np",
+        ),
+        "batched_0ms": micro_batched(0),
+        "batched_1ms": micro_batched(1),
+        "batched_5ms": micro_batched(5),
+    }
+    print(f"{'path':<15}{'p50 ms':>9}{'p99 ms':>9}{'texts/s':>10}")
+    for name, call in paths.items():
+        start = perf_counter()
+        elapsed = latencies(call, sentences, clients)
+        throughput = len(sentences) / (perf_counter() - start)
+        print(
+            f"{name:<15}{np.percentile(elapsed, 50):>9.2f}"
+            f"{np.percentile(elapsed, 99):>9.2f}{throughput:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark of the reviews `extract_raw`, decompressing and parsing the whole
+dump at once, against the pipelined reader parsing batches in a process pool,
+on a synthetic gzip compressed JSON lines dump served over local HTTP.
+
+Usage:
+    $ python -m benchmarks.jsonl_benchmark --rows 200000 --workers 1 --workers 4
+"""
+from functools import partial
+import gzip
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import json
+from pathlib import Path
+import tempfile
+from threading import Thread
+from typing import Tuple
+
+import click
+import numpy as np
+
+from benchmarks.utils import synthetic_sentences, timeit
+from bert_extractor.constants import JSON_BACKENDS
+from bert_extractor.extractors.reviews import ReviewsExtractor
+
+WORDS = [f"w{index}" for index in range(5000)]
+
+
+def synthetic_reviews_dump(rows: int, filepath: Path, seed: int = 2020):
+    """Write `rows` reviews with the fields of the Amazon dumps as gzip JSON lines."""
+    rng = np.random.default_rng(seed)
+    texts = synthetic_sentences(rows, WORDS, mean_words=60, seed=seed)
+    summaries = synthetic_sentences(rows, WORDS, mean_words=4, seed=seed + 1)
+    with gzip.open(filepath, "wt") as file:
+        for index, (text, summary) in enumerate(zip(texts, summaries)):
+            review = {
+                "overall": float(rng.integers(1, 6)),
+                "verified": True,
+                "reviewTime": "09 1, 2016",
+                "reviewerID": f"A{index:013d}",
+                "asin": f"B{index % 1000:09d}",
+                "style": {"Size:": " 7.0 oz", "Flavor:": " Classic Ice Blue"},
+                "reviewerName": f"reviewer {index}",
+                "reviewText": text,
+                "summary": summary,
+                "unixReviewTime": 1472688000 + index,
+            }
+            file.write(json.dumps(review) + "\n")
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+@click.command()
+@click.option("--rows", type=click.INT, default=200_000, help="Amount of reviews")
+@click.option(
+    "--workers", type=click.INT, multiple=True, default=[1, 2, 4], help="Processes"
+)
+def main(rows: int, workers: Tuple[int]):
+    """Print the extract_raw time of each reader."""
+    with tempfile.TemporaryDirectory() as directory:
+        synthetic_reviews_dump(rows, Path(directory) / "reviews.json.gz")
+        size = (Path(directory) / "reviews.json.gz").stat().st_size
+        server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), partial(QuietHandler, directory=directory)
+        )
+        Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/reviews.json.gz"
+        cache_path = Path(directory) / "cache"
+        print(f"{rows} reviews, {size / 2 ** 20:.1f} MiB compressed")
+
+        print(f"{'reader':<12}{'backend':>9}{'workers':>9}{'s':>9}")
+        current = ReviewsExtractor(
+            "bert-base-uncased", "text", "label", cache_path=cache_path
+        )
+        seconds = timeit(lambda: current.extract_raw(url), 1)
+        print(f"{'extract_raw':<12}{'json':>9}{'-':>9}{seconds:>9.2f}")
+
+        for backend in JSON_BACKENDS:
+            for processes in workers:
+                try:
+                    parallel = ReviewsExtractor(
+                        "bert-base-uncased",
+                        "text",
+                        "label",
+                        cache_path=cache_path,
+                        parse_workers=processes,
+                        json_backend=backend,
+                    )
+                except ImportError:
+                    break
+                seconds = timeit(lambda: parallel.extract_raw(url), 1)
+                print(f"{'pipelined':<12}{backend:>9}{processes:>9}{seconds:>9.2f}")
+
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Benchmark of the NER labels alignment of each sub-token label strategy,
+against the tokenization of the same sentences, with the tokenizer and with
+the word-piece index, on a CoNLL 2003 sized corpus.
+
+Usage:
+    $ python -m benchmarks.ner_labels_benchmark --rows 20000
+"""
+from typing import List
+
+import click
+import numpy as np
+
+from benchmarks.utils import synthetic_sentences, timeit
+from bert_extractor.constants import NER_LABEL_STRATEGIES, NER_LABLES_MAP
+from bert_extractor.extractors.ner import NERExtractor
+from bert_extractor.ragged import RaggedArray
+from bert_extractor.word_index import WordIndex
+
+
+@click.command()
+@click.option("--rows", type=click.INT, default=20_000, help="Amount of sentences")
+@click.option("--mean_words", type=click.INT, default=14, help="Words per sentence")
+@click.option(
+    "--pretrained", type=click.STRING, default="bert-base-cased", help="Tokenizer"
+)
+def main(rows: int, mean_words: int, pretrained: str):
+    """Print the tokenization time and the alignment time of each strategy."""
+    extractor = NERExtractor(pretrained, "text", "label")
+    tokenizer = extractor.load_tokenizer()
+    words = [word for word in tokenizer.get_vocab() if word.isalpha()]
+    sentences: List[List[str]] = [
+        sentence.split() for sentence in synthetic_sentences(rows, words, mean_words)
+    ]
+    rng = np.random.default_rng(2020)
+    labels = RaggedArray.from_lists(
+        [
+            rng.choice(list(NER_LABLES_MAP.values()), len(sentence)).tolist()
+            for sentence in sentences
+        ],
+        dtype=np.int8,
+    )
+    max_length = extractor.get_max_length(
+        extractor._token_lengths(sentences, tokenizer), tokenizer
+    )
+
+    def tokenize():
+        return tokenizer(
+            sentences,
+            max_length=max_length,
+            padding="max_length",
+            truncation=True,
+            is_split_into_words=True,
+            return_tensors="np",
+        )
+
+    tokenized = tokenize()
+    print(f"{rows} sentences, max length {max_length}")
+    print(f"{'step':<24}{'s':>9}")
+    print(f"{'tokenize':<24}{timeit(tokenize):>9.3f}")
+    ragged = RaggedArray.from_lists(sentences, dtype=str)
+    seconds = timeit(lambda: WordIndex(tokenizer).add(ragged.values.tolist()))
+    print(f"{'word index build':<24}{seconds:>9.3f}")
+    index = WordIndex(tokenizer)
+    seconds = timeit(lambda: index.encode(ragged, max_length))
+    print(f"{'word index encode':<24}{seconds:>9.3f}")
+    seconds = timeit(lambda: extractor._word_ids_matrix(tokenized))
+    print(f"{'word_ids matrix':<24}{seconds:>9.3f}")
+    for strategy in NER_LABEL_STRATEGIES:
+        aligner = NERExtractor(pretrained, "text", "label", label_strategy=strategy)
+        seconds = timeit(lambda: aligner.process_labels(labels, tokenized))
+        print(f"{'process_labels ' + strategy:<24}{seconds:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
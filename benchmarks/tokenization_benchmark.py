@@ -0,0 +1,91 @@
+"""Benchmark of the threaded batch tokenization against one sentence at a
+time lengths and one tokenizer call for the whole split.
+
+Usage:
+    $ python -m benchmarks.tokenization_benchmark --rows 50000 --workers 1 --workers 4
+"""
+import os
+from typing import List, Tuple
+
+import click
+import numpy as np
+
+from benchmarks.utils import synthetic_sentences, timeit
+from bert_extractor.extractors.base import BaseBERTExtractor
+
+
+def sequential_tokenize(extractor: BaseBERTExtractor, sentences: List[str]):
+    """Lengths encoding each sentence in Python, then a single call."""
+    tokenizer = extractor.load_tokenizer()
+    lengths = (len(tokenizer.encode(sentence)) for sentence in sentences)
+    max_length = extractor.get_max_length(lengths, tokenizer)
+    tokenized = tokenizer(
+        sentences,
+        max_length=max_length,
+        padding="max_length",
+        truncation=True,
+        return_tensors="np",
+    )
+    return extractor.process_labels(np.zeros(len(sentences)), tokenized)
+
+
+def threaded_tokenize(extractor: BaseBERTExtractor, sentences: List[str]):
+    """Lengths and tokenization by batches from the thread pool."""
+    tokenizer = extractor.load_tokenizer()
+    max_length = extractor.get_max_length(
+        extractor._token_lengths(sentences, tokenizer), tokenizer
+    )
+    return extractor._tokenize_split(
+        sentences, np.zeros(len(sentences)), max_length, tokenizer
+    )
+
+
+@click.command()
+@click.option("--rows", type=click.INT, default=50_000, help="Amount of sentences")
+@click.option(
+    "--pretrained", type=click.STRING, default="bert-base-uncased", help="Tokenizer"
+)
+@click.option(
+    "--workers", type=click.INT, multiple=True, default=[1, 2, 4], help="Threads"
+)
+@click.option(
+    "--batch_sizes",
+    type=click.INT,
+    multiple=True,
+    default=[256, 1024, 4096],
+    help="Sentences of each tokenizer call",
+)
+def main(
+    rows: int, pretrained: str, workers: Tuple[int], batch_sizes: Tuple[int],
+):
+    """Print the tokenization time of each configuration."""
+    extractor = BaseBERTExtractor(pretrained, "text", "label")
+    vocab = extractor.load_tokenizer().get_vocab()
+    words = [word for word in vocab if word.isalpha()]
+    sentences = synthetic_sentences(rows, words)
+
+    print(f"{'path':<12}{'parallelism':>12}{'workers':>9}{'batch':>7}{'s':>9}")
+    for parallelism in [True, False]:
+        os.environ["TOKENIZERS_PARALLELISM"] = str(parallelism).lower()
+        seconds = timeit(lambda: sequential_tokenize(extractor, sentences), 1)
+        print(f"{'sequential':<12}{parallelism!s:>12}{'-':>9}{'-':>7}{seconds:>9.2f}")
+
+        for threads in workers:
+            for batch_size in batch_sizes:
+                threaded = BaseBERTExtractor(
+                    pretrained,
+                    "text",
+                    "label",
+                    tokenize_batch_size=batch_size,
+                    tokenize_workers=threads,
+                    tokenizers_parallelism=parallelism,
+                )
+                seconds = timeit(lambda: threaded_tokenize(threaded, sentences), 1)
+                print(
+                    f"{'threaded':<12}{parallelism!s:>12}{threads:>9}"
+                    f"{batch_size:>7}{seconds:>9.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmarks shared helpers."""
+from time import perf_counter
+from typing import Callable, List, Sequence, Tuple
+
+import numpy as np
+
+
+def synthetic_padded_ids(
+    rows: int, max_length: int, vocab_size: int = 30522, seed: int = 2020
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Create padded input_ids, attention_mask and token_type_ids
+    that look like a tokenized corpus, sentences of random length with
+    word-piece ids following a Zipf distribution.
+
+    Parameters
+    ----------
+    rows : int
+        amount of sentences.
+    max_length : int
+        padded length of each sentence.
+    vocab_size : int
+        size of the vocabulary.
+    seed : int
+        random seed.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, np.ndarray]
+        - input_ids.
+        - attention_mask.
+        - token_type_ids.
+    """
+    rng = np.random.default_rng(seed)
+    lengths = np.clip(rng.geometric(1 / (max_length / 4), rows) + 2, 3, max_length)
+    attention_mask = (np.arange(max_length) < lengths[:, None]).astype(np.int64)
+    input_ids = np.minimum(rng.zipf(1.3, (rows, max_length)) + 999, vocab_size - 1)
+    input_ids = input_ids * attention_mask
+    input_ids[:, 0] = 101
+    input_ids[np.arange(rows), lengths - 1] = 102
+
+    return input_ids, attention_mask, np.zeros_like(input_ids)
+
+
+def synthetic_sentences(
+    rows: int, words: Sequence[str], mean_words: int = 40, seed: int = 2020
+) -> List[str]:
+    """Create sentences of random length, with words following a Zipf
+    distribution over the given words.
+
+    Parameters
+    ----------
+    rows : int
+        amount of sentences.
+    words : Sequence[str]
+        words to pick from, the most frequent first.
+    mean_words : int
+        mean amount of words of each sentence.
+    seed : int
+        random seed.
+
+    Returns
+    -------
+    List[str]
+        sentences.
+    """
+    rng = np.random.default_rng(seed)
+    lengths = rng.geometric(1 / mean_words, rows)
+    indexes = np.minimum(rng.zipf(1.3, int(lengths.sum())), len(words)) - 1
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+    return [
+        " ".join(words[index] for index in indexes[start:stop])
+        for start, stop in zip(offsets[:-1], offsets[1:])
+    ]
+
+
+def timeit(function: Callable, repeat: int = 3) -> float:
+    """Best wall time in seconds of calling the function `repeat` times."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        best = min(best, perf_counter() - start)
+    return best
@@ -0,0 +1,162 @@
+"""Micro-batching of concurrent tokenize calls, for online scoring."""
+from concurrent.futures import Future
+import logging
+from queue import Empty, Queue
+from threading import Thread
+from time import monotonic
+from typing import Dict, List, Mapping, Tuple
+
+import numpy as np
+from transformers.tokenization_utils_base import PreTrainedTokenizerBase
+
+from bert_extractor.constants import MICRO_BATCH_MAX_LATENCY_MS, MICRO_BATCH_MAX_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+def _copy_rows(
+    arrays: Mapping[str, np.ndarray], start: int, stop: int
+) -> Dict[str, np.ndarray]:
+    """Rows `[start, stop)` of the arrays, copied into preallocated arrays."""
+    rows = {}
+    for key, value in arrays.items():
+        rows[key] = np.empty((stop - start, *value.shape[1:]), value.dtype)
+        np.copyto(rows[key], value[start:stop])
+    return rows
+
+
+class MicroBatcher:
+    """Tokenize the sentences of concurrent callers together, in one call
+    of up to `max_batch_size` sentences or `max_latency_ms` of waiting.
+    Each caller gets its rows copied into arrays of its own, preallocated for
+    its amount of sentences, so it doesn't keep the whole batch in memory."""
+
+    def __init__(
+        self,
+        tokenizer: PreTrainedTokenizerBase,
+        max_length: int,
+        max_batch_size: int = MICRO_BATCH_MAX_SIZE,
+        max_latency_ms: float = MICRO_BATCH_MAX_LATENCY_MS,
+        is_split_into_words: bool = False,
+    ):
+        """
+        Parameters
+        ----------
+        tokenizer : PreTrainedTokenizerBase
+            loaded tokenizer.
+        max_length : int
+            padded length of the tokenized sentences.
+        max_batch_size : int
+            amount of sentences to stop waiting for more callers.
+        max_latency_ms : float
+            milliseconds to wait for more callers after the first one.
+        is_split_into_words : bool
+            True if the sentences are lists of words.
+        """
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+        self.is_split_into_words = is_split_into_words
+        self._requests: Queue = Queue()
+        self._worker = Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, sentences: List) -> Future:
+        """Queue sentences to tokenize.
+
+        Parameters
+        ----------
+        sentences : List
+            sentences to tokenize.
+
+        Returns
+        -------
+        Future
+            future of the tokenized arrays of the sentences.
+
+        Raises
+        ------
+        ValueError
+            if there are no sentences.
+        """
+        sentences = list(sentences)
+        if not sentences:
+            error_message = "There are no sentences to tokenize"
+            logger.error(error_message)
+            raise ValueError(error_message)
+
+        future: Future = Future()
+        self._requests.put((sentences, future))
+        return future
+
+    def tokenize(self, sentences: List) -> Dict[str, np.ndarray]:
+        """Tokenize sentences, along with the ones of other callers.
+
+        Parameters
+        ----------
+        sentences : List
+            sentences to tokenize.
+
+        Returns
+        -------
+        Dict[str, np.ndarray]
+            tokenized arrays, `input_ids`, `attention_mask`, ...
+        """
+        return self.submit(sentences).result()
+
+    def close(self):
+        """Stop the worker once the queued requests are done."""
+        self._requests.put(None)
+        self._worker.join()
+
+    def _collect(self, first: Tuple[List, Future]) -> Tuple[List, bool]:
+        """Requests of a batch, from the first one until the batch is full or
+        the latency budget is spent. True if the batcher was closed."""
+        batch = [first]
+        rows = len(first[0])
+        deadline = monotonic() + self.max_latency
+        while rows < self.max_batch_size:
+            try:
+                request = self._requests.get(timeout=max(deadline - monotonic(), 0))
+            except Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+            rows += len(request[0])
+
+        return batch, False
+
+    def _run(self):
+        """Tokenize the collected batches and resolve each caller future."""
+        closed = False
+        while not closed:
+            first = self._requests.get()
+            if first is None:
+                return
+            batch, closed = self._collect(first)
+
+            sentences = [sentence for request, _ in batch for sentence in request]
+            try:
+                tokenized = self.tokenizer(
+                    sentences,
+                    add_special_tokens=True,
+                    max_length=self.max_length,
+                    padding="max_length",
+                    truncation=True,
+                    return_attention_mask=True,
+                    is_split_into_words=self.is_split_into_words,
+                    return_tensors="np",
+                )
+            except Exception as error:  # pylint: disable=broad-except
+                for _, future in batch:
+                    future.set_exception(error)
+                continue
+
+            start = 0
+            for request, future in batch:
+                stop = start + len(request)
+                future.set_result(_copy_rows(tokenized, start, stop))
+                start = stop
+            logger.debug("Tokenized %s requests together", len(batch))
@@ -0,0 +1,202 @@
+"""Cache of the preprocessed text, independent of the tokenizer."""
+from functools import wraps
+from hashlib import sha256
+import logging
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Tuple
+
+import numpy as np
+
+from bert_extractor.cache_store import read_entry, read_metadata, write_entry
+from bert_extractor.ragged import RaggedArray, StringBuffer
+
+logger = logging.getLogger(__name__)
+
+PREPROCESSED_DIR = "preprocessed"
+
+
+def raw_entry_path(extractor, url: str) -> Path:
+    """Path of the raw data cache entry of the url, see `cache_extract_raw`.
+
+    Parameters
+    ----------
+    extractor : BaseBERTExtractor
+        extractor that extracts the data.
+    url : str
+        url of the raw data.
+
+    Returns
+    -------
+    Path
+        path of the `.pkl` entry, that may not exist.
+    """
+    return Path(extractor.cache_path) / f"{sha256(url.encode()).hexdigest()}.pkl"
+
+
+def _raw_version(extractor, url: str) -> str:
+    """Checksum of the raw data entry, its creation time if it has no sidecar,
+    empty if the raw data isn't cached."""
+    raw_path = raw_entry_path(extractor, url)
+    if not raw_path.exists():
+        return ""
+
+    entry = read_metadata(raw_path)
+    return entry.sha256 or str(entry.created)
+
+
+def preprocessed_key(extractor, url: str) -> str:
+    """Key of the preprocessed cache, made of the raw data key (the hashed url
+    as in `cache_extract_raw`) and the checksum of its entry, the extractor and
+    its preprocess version. A rewritten raw entry changes the key, so the
+    preprocessed entry of the old raw data is not read.
+
+    Parameters
+    ----------
+    extractor : BaseBERTExtractor
+        extractor that preprocess the data.
+    url : str
+        url of the raw data.
+
+    Returns
+    -------
+    str
+        hashed key.
+    """
+    raw_key = sha256(url.encode()).hexdigest()
+    key = ":".join(
+        [
+            raw_key,
+            _raw_version(extractor, url),
+            type(extractor).__name__,
+            str(extractor.preprocess_version),
+            extractor.sentence_col,
+            extractor.labels_col,
+        ]
+    )
+    return sha256(key.encode()).hexdigest()
+
+
+def preprocessed_path(extractor, url: str) -> Path:
+    """Path of the preprocessed cache entry of the url.
+
+    Parameters
+    ----------
+    extractor : BaseBERTExtractor
+        extractor that preprocess the data.
+    url : str
+        url of the raw data.
+
+    Returns
+    -------
+    Path
+        path of the `.npz` entry, that may not exist.
+    """
+    cache_dir = Path(extractor.cache_path) / PREPROCESSED_DIR
+    return cache_dir / f"{preprocessed_key(extractor, url)}.npz"
+
+
+def cache_preprocess():
+    """Cache the sentences and labels output of the preprocess,
+    stored in a columnar form on `cache_path/preprocessed`.
+    """
+
+    def use_cache_decorator(function):
+        """Function result caching wrapper."""
+
+        @wraps(function)
+        def wrapper(*args):
+            extractor, url = args
+            filepath = preprocessed_path(extractor, url)
+
+            extractor_name = type(extractor).__name__
+
+            if extractor.read_cache and filepath.exists():
+                result = read_entry(filepath, _read_columns, url, extractor_name)
+                logger.info("Using cached preprocessed: %s.", filepath)
+            else:
+                result = function(*args)
+                # the raw entry may have just been written
+                filepath = preprocessed_path(extractor, url)
+                columns = texts_to_columns(*result)
+                write_entry(
+                    filepath,
+                    lambda file: np.savez(file, **columns),
+                    url,
+                    extractor_name,
+                )
+                logger.info("Cached preprocessed to: %s.", filepath)
+            return result
+
+        return wrapper
+
+    return use_cache_decorator
+
+
+def _read_columns(file: BinaryIO) -> Tuple[Any, Any]:
+    """Sentences and labels of a cached npz file."""
+    with np.load(file) as columns:
+        return columns_to_texts(dict(columns))
+
+
+def texts_to_columns(sentences: Any, labels: Any) -> Dict[str, np.ndarray]:
+    """Columnar form of the preprocessed sentences and labels.
+    Sentences are either a list of strings, or a RaggedArray (or lists) of
+    words with a RaggedArray of labels per word.
+
+    Parameters
+    ----------
+    sentences : Any
+        preprocessed sentences.
+    labels : Any
+        preprocessed labels.
+
+    Returns
+    -------
+    Dict[str, np.ndarray]
+        columns of the texts.
+    """
+    if len(sentences) and isinstance(sentences[0], list):
+        sentences = RaggedArray.from_lists(sentences, dtype=str)
+        labels = RaggedArray.from_lists(labels, dtype=np.int64)
+
+    split_into_words = isinstance(sentences, RaggedArray)
+    if split_into_words:
+        words = sentences.values
+        sentence_offsets = sentences.offsets
+        labels = labels.values
+    else:
+        words = StringBuffer.from_strings(sentences)
+        sentence_offsets = np.zeros(1, dtype=np.int64)
+
+    return {
+        "buffer": words.data,
+        "offsets": words.offsets,
+        "sentence_offsets": sentence_offsets,
+        "labels": np.asarray(labels),
+        "split_into_words": np.asarray(split_into_words),
+    }
+
+
+def columns_to_texts(columns: Dict[str, np.ndarray]) -> Tuple[Any, Any]:
+    """Sentences and labels from the output of `texts_to_columns`.
+
+    Parameters
+    ----------
+    columns : Dict[str, np.ndarray]
+        columns of the texts.
+
+    Returns
+    -------
+    Tuple[Any, Any]
+        - sentences: preprocessed sentences.
+        - labels: preprocessed labels.
+    """
+    words = StringBuffer(columns["buffer"], columns["offsets"])
+    if not columns["split_into_words"]:
+        return words.tolist(), columns["labels"].tolist()
+
+    sentence_offsets = columns["sentence_offsets"]
+    return (
+        RaggedArray(words, sentence_offsets),
+        RaggedArray(columns["labels"], sentence_offsets),
+    )
@@ -0,0 +1,235 @@
+"""Cache manager CLI, to inspect, verify, prune and pre-warm the cache entries
+under a cache path, see `bert_extractor.cache_store`.
+
+Usage:
+    $ python -m bert_extractor.cache_manager list --cache_path=./data/reviews
+    $ python -m bert_extractor.cache_manager verify --cache_path=./data/reviews
+    $ python -m bert_extractor.cache_manager prune --cache_path=./data/reviews \
+        --max_size_mb=2048 --max_age_days=30 --policy=lru
+    $ python -m bert_extractor.cache_manager prewarm --cache_path=./data/reviews
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import click
+
+from bert_extractor import registry
+from bert_extractor.cache_store import (
+    list_entries,
+    prune_entries,
+    remove_entry,
+    verify_entries,
+)
+from bert_extractor.constants import CACHE_PRUNE_POLICIES, PREWARM_MAX_WORKERS
+
+logger = logging.getLogger(__name__)
+
+
+def prewarm(
+    cache_path: Union[str, os.PathLike],
+    extractor_types: Optional[Sequence[str]] = None,
+    pretrained_model_name_or_path: str = "bert-base-uncased",
+    auth_username: Optional[str] = None,
+    auth_key: Optional[str] = None,
+    workers: int = PREWARM_MAX_WORKERS,
+) -> Dict[Tuple[str, str], Optional[str]]:
+    """Extract and preprocess every known dataset into the cache, a dataset
+    per thread, skipping the ones already cached.
+
+    Parameters
+    ----------
+    cache_path : Union[str, os.PathLike]
+        root of the cache.
+    extractor_types : Optional[Sequence[str]]
+        extractor types of the datasets, every type if None.
+    pretrained_model_name_or_path : str
+        tokenizer of the extractors, not loaded to pre-warm.
+    auth_username : Optional[str]
+        username of the datasets that need authentication.
+    auth_key : Optional[str]
+        private key of the datasets that need authentication.
+    workers : int
+        datasets extracted concurrently.
+
+    Returns
+    -------
+    Dict[Tuple[str, str], Optional[str]]
+        error of each extractor type and dataset name, None if cached.
+    """
+    jobs = [
+        (extractor_type, name, url)
+        for extractor_type in extractor_types or registry.extractor_types()
+        for name, url in registry.get_datasets(extractor_type).items()
+    ]
+
+    def warm(job: Tuple[str, str, str]) -> Optional[str]:
+        extractor_type, name, url = job
+        extractor_class = registry.get_extractor_class(extractor_type)
+        try:
+            extractor = extractor_class(
+                pretrained_model_name_or_path,
+                "text",
+                "label",
+                auth_username,
+                auth_key,
+                cache_path=cache_path,
+                read_cache=True,
+            )
+            extractor.extract_preprocessed(url)
+        except Exception as error:  # pylint: disable=broad-except
+            logger.error("Could not pre-warm %s %s: %r", extractor_type, name, error)
+            return repr(error)
+        logger.info("Pre-warmed %s %s", extractor_type, name)
+        return None
+
+    with ThreadPoolExecutor(max(workers, 1)) as executor:
+        errors = list(executor.map(warm, jobs))
+
+    return {(job[0], job[1]): error for job, error in zip(jobs, errors)}
+
+
+def _format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat(sep=" ", timespec="seconds")
+
+
+@click.group()
+def main():
+    """Inspect, verify, prune and pre-warm a cache path."""
+
+
+cache_path_option = click.option(
+    "--cache_path",
+    type=click.STRING,
+    default="/tmp/bert_extractor",
+    help="Path of the cache",
+)
+
+
+@main.command(name="list")
+@cache_path_option
+def list_command(cache_path: str):
+    """List the entries with their metadata."""
+    entries = list_entries(cache_path)
+    click.echo(
+        f"{'entry':<48}{'MB':>10}{'hits':>6}  {'created':<20}{'last access':<20}url"
+    )
+    for entry in entries:
+        click.echo(
+            f"{str(entry.path.relative_to(cache_path)):<48}"
+            f"{entry.size / 2 ** 20:>10.1f}{entry.hits:>6}  "
+            f"{_format_time(entry.created):<20}{_format_time(entry.last_access):<20}"
+            f"{entry.url or '-'}"
+        )
+    total = sum(entry.size for entry in entries)
+    click.echo(f"{len(entries)} entries, {total / 2 ** 20:.1f} MB")
+
+
+@main.command()
+@cache_path_option
+@click.option("--skip_checksum", is_flag=True, help="Check only the metadata and sizes")
+@click.option("--delete", is_flag=True, help="Remove the entries with problems")
+def verify(cache_path: str, skip_checksum: bool, delete: bool):
+    """Check the entries match their metadata, exit with 1 if any doesn't."""
+    problems = verify_entries(cache_path, checksum=not skip_checksum)
+    for path, problem in problems.items():
+        click.echo(f"{path}: {problem}")
+        if delete:
+            if path.suffix in (".json", ".tmp"):
+                path.unlink(missing_ok=True)
+            else:
+                remove_entry(path)
+
+    click.echo(f"{len(problems)} problems")
+    if problems and not delete:
+        raise SystemExit(1)
+
+
+@main.command()
+@cache_path_option
+@click.option(
+    "--max_size_mb",
+    type=click.FLOAT,
+    default=None,
+    help="Evict entries until the cache fits in this size",
+)
+@click.option(
+    "--max_age_days",
+    type=click.FLOAT,
+    default=None,
+    help="Remove the entries created before this amount of days",
+)
+@click.option(
+    "--policy",
+    type=click.Choice(CACHE_PRUNE_POLICIES),
+    default="lru",
+    help="Eviction order: least recently used, oldest or largest first",
+)
+@click.option("--dry_run", is_flag=True, help="Only list the entries to remove")
+def prune(
+    cache_path: str,
+    max_size_mb: Optional[float],
+    max_age_days: Optional[float],
+    policy: str,
+    dry_run: bool,
+):
+    """Remove old entries and evict entries over a size."""
+    removed = prune_entries(
+        cache_path,
+        max_bytes=None if max_size_mb is None else int(max_size_mb * 2 ** 20),
+        max_age=None if max_age_days is None else max_age_days * 24 * 3600,
+        policy=policy,
+        dry_run=dry_run,
+    )
+    for entry in removed:
+        click.echo(f"{'would remove' if dry_run else 'removed'} {entry.path}")
+    freed = sum(entry.size for entry in removed)
+    click.echo(f"{len(removed)} entries, {freed / 2 ** 20:.1f} MB")
+
+
+@main.command(name="prewarm")
+@cache_path_option
+@click.option(
+    "--extractor_type",
+    type=click.STRING,
+    multiple=True,
+    help="Extractor types to pre-warm, all if not set",
+)
+@click.option(
+    "--pretrained",
+    type=click.STRING,
+    default="bert-base-uncased",
+    help="Tokenizer of the extractors",
+)
+@click.option("--auth_username", envvar="KAGGLE_USERNAME", default=None)
+@click.option("--auth_key", envvar="KAGGLE_KEY", default=None)
+@click.option(
+    "--workers",
+    type=click.INT,
+    default=PREWARM_MAX_WORKERS,
+    help="Datasets extracted concurrently",
+)
+def prewarm_command(
+    cache_path: str,
+    extractor_type: List[str],
+    pretrained: str,
+    auth_username: Optional[str],
+    auth_key: Optional[str],
+    workers: int,
+):
+    """Extract and preprocess every known dataset into the cache."""
+    Path(cache_path).mkdir(parents=True, exist_ok=True)
+    results = prewarm(
+        cache_path, extractor_type, pretrained, auth_username, auth_key, workers
+    )
+    for (extractor_type_name, name), error in results.items():
+        click.echo(f"{extractor_type_name} {name}: {error or 'ok'}")
+    if any(results.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,446 @@
+"""Cache entries under `cache_path`, with a metadata sidecar for each one.
+
+An entry is a cached file, e.g. `<sha256>.pkl` of `cache_extract_raw`,
+`preprocessed/<sha256>.npz` of `cache_preprocess` or `kaggle/<sha256>.zip`.
+Next to it `<entry>.meta.json` records its source url, extractor, creation
+and last access times, size, hits and checksum.
+
+Entries are written to a temporary file then renamed, so readers never see a
+partial entry, and writes, sidecar updates and removals hold an exclusive
+lock on `<entry>.lock`, so concurrent jobs on a shared node don't corrupt them.
+"""
+from contextlib import contextmanager
+from hashlib import sha256
+import json
+import logging
+import os
+from pathlib import Path
+import tempfile
+import time
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Union,
+)
+
+from bert_extractor.constants import (
+    CACHE_ENTRY_SUFFIXES,
+    CACHE_LOCK_SUFFIX,
+    CACHE_PRUNE_POLICIES,
+    CACHE_SIDECAR_SUFFIX,
+)
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_TEMP_SUFFIX = ".tmp"
+
+
+class CacheEntry(NamedTuple):
+    """Metadata of a cache entry, unknown fields are None for entries
+    written without a sidecar."""
+
+    path: Path
+    url: Optional[str]
+    extractor: Optional[str]
+    created: float
+    last_access: float
+    size: int
+    hits: int
+    sha256: Optional[str]
+
+
+def file_sha256(filepath: Union[str, Path], block_size: int = 2 ** 20) -> str:
+    """Checksum of a file, read by blocks."""
+    checksum = sha256()
+    with open(filepath, "rb") as handle:
+        for block in iter(lambda: handle.read(block_size), b""):
+            checksum.update(block)
+    return checksum.hexdigest()
+
+
+def _sibling(filepath: Path, suffix: str) -> Path:
+    return filepath.with_name(filepath.name + suffix)
+
+
+@contextmanager
+def entry_lock(filepath: Union[str, os.PathLike]) -> Iterator[None]:
+    """Exclusive lock of an entry, across threads and processes.
+
+    Parameters
+    ----------
+    filepath : Union[str, os.PathLike]
+        path of the entry, the lock is held on `<entry>.lock`.
+    """
+    lock_path = _sibling(Path(filepath), CACHE_LOCK_SUFFIX)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def atomic_write(filepath: Union[str, os.PathLike]) -> Iterator[BinaryIO]:
+    """Binary file to write, renamed to `filepath` once it is complete.
+    Nothing is written to `filepath` if an error is raised.
+
+    Parameters
+    ----------
+    filepath : Union[str, os.PathLike]
+        final path of the file.
+
+    Returns
+    -------
+    Iterator[BinaryIO]
+        temporary file in the same directory.
+    """
+    filepath = Path(filepath)
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    file = tempfile.NamedTemporaryFile(
+        dir=filepath.parent,
+        prefix=f".{filepath.name}.",
+        suffix=_TEMP_SUFFIX,
+        delete=False,
+    )
+    try:
+        with file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(file.name, filepath)
+    except BaseException:
+        Path(file.name).unlink(missing_ok=True)
+        raise
+
+
+def read_metadata(filepath: Union[str, os.PathLike]) -> CacheEntry:
+    """Metadata of an entry, from its sidecar or from the file stats if it
+    has none.
+
+    Parameters
+    ----------
+    filepath : Union[str, os.PathLike]
+        path of the entry.
+
+    Returns
+    -------
+    CacheEntry
+        metadata of the entry.
+    """
+    filepath = Path(filepath)
+    sidecar_path = _sibling(filepath, CACHE_SIDECAR_SUFFIX)
+    if sidecar_path.exists():
+        try:
+            with open(sidecar_path, "r") as file:
+                return CacheEntry(path=filepath, **json.load(file))
+        except (TypeError, ValueError):
+            logger.warning("Unreadable cache metadata: %s.", sidecar_path)
+
+    stats = filepath.stat()
+    return CacheEntry(
+        filepath, None, None, stats.st_mtime, stats.st_mtime, stats.st_size, 0, None
+    )
+
+
+def _write_sidecar(entry: CacheEntry):
+    """Write the sidecar of an entry, with the entry lock held."""
+    metadata = entry._asdict()
+    del metadata["path"]
+    with atomic_write(_sibling(entry.path, CACHE_SIDECAR_SUFFIX)) as file:
+        file.write(json.dumps(metadata, indent=2).encode())
+
+
+def _record(filepath: Path, url: Optional[str], extractor: Optional[str]) -> CacheEntry:
+    """Write the sidecar of a new entry, with the entry lock held."""
+    now = time.time()
+    entry = CacheEntry(
+        filepath,
+        url,
+        extractor,
+        now,
+        now,
+        filepath.stat().st_size,
+        0,
+        file_sha256(filepath),
+    )
+    _write_sidecar(entry)
+    return entry
+
+
+def record_entry(
+    filepath: Union[str, os.PathLike],
+    url: Optional[str] = None,
+    extractor: Optional[str] = None,
+) -> CacheEntry:
+    """Write the sidecar of an entry already in place, e.g. renamed into the
+    cache by its writer.
+
+    Parameters
+    ----------
+    filepath : Union[str, os.PathLike]
+        path of the entry.
+    url : Optional[str]
+        source url of the entry.
+    extractor : Optional[str]
+        name of the extractor that wrote it.
+
+    Returns
+    -------
+    CacheEntry
+        metadata of the entry.
+    """
+    filepath = Path(filepath)
+    with entry_lock(filepath):
+        return _record(filepath, url, extractor)
+
+
+def write_entry(
+    filepath: Union[str, os.PathLike],
+    write: Callable[[BinaryIO], Any],
+    url: Optional[str] = None,
+    extractor: Optional[str] = None,
+) -> CacheEntry:
+    """Write an entry atomically, with its sidecar.
+
+    Parameters
+    ----------
+    filepath : Union[str, os.PathLike]
+        path of the entry.
+    write : Callable[[BinaryIO], Any]
+        function that writes the content to the given binary file.
+    url : Optional[str]
+        source url of the entry.
+    extractor : Optional[str]
+        name of the extractor that wrote it.
+
+    Returns
+    -------
+    CacheEntry
+        metadata of the entry.
+    """
+    filepath = Path(filepath)
+    with entry_lock(filepath):
+        with atomic_write(filepath) as file:
+            write(file)
+        return _record(filepath, url, extractor)
+
+
+def record_hit(
+    filepath: Union[str, os.PathLike],
+    url: Optional[str] = None,
+    extractor: Optional[str] = None,
+):
+    """Count a hit of an entry and its access time in its sidecar.
+
+    Parameters
+    ----------
+    filepath : Union[str, os.PathLike]
+        path of the entry.
+    url : Optional[str]
+        source url of the entry, recorded if the entry has no sidecar.
+    extractor : Optional[str]
+        name of the extractor, recorded if the entry has no sidecar.
+    """
+    filepath = Path(filepath)
+    with entry_lock(filepath):
+        entry = read_metadata(filepath)
+        _write_sidecar(
+            entry._replace(
+                url=entry.url or url,
+                extractor=entry.extractor or extractor,
+                last_access=time.time(),
+                hits=entry.hits + 1,
+            )
+        )
+
+
+def read_entry(
+    filepath: Union[str, os.PathLike],
+    read: Callable[[BinaryIO], Any],
+    url: Optional[str] = None,
+    extractor: Optional[str] = None,
+) -> Any:
+    """Read an entry and count the hit in its sidecar.
+
+    Parameters
+    ----------
+    filepath : Union[str, os.PathLike]
+        path of the entry.
+    read : Callable[[BinaryIO], Any]
+        function that reads the content of the given binary file.
+    url : Optional[str]
+        source url of the entry, recorded if the entry has no sidecar.
+    extractor : Optional[str]
+        name of the extractor, recorded if the entry has no sidecar.
+
+    Returns
+    -------
+    Any
+        content of the entry.
+    """
+    with open(filepath, "rb") as file:
+        result = read(file)
+
+    record_hit(filepath, url, extractor)
+    return result
+
+
+def remove_entry(filepath: Union[str, os.PathLike]):
+    """Remove an entry and its sidecar, the lock file is kept since other
+    processes may be waiting on it.
+
+    Parameters
+    ----------
+    filepath : Union[str, os.PathLike]
+        path of the entry.
+    """
+    filepath = Path(filepath)
+    with entry_lock(filepath):
+        filepath.unlink(missing_ok=True)
+        _sibling(filepath, CACHE_SIDECAR_SUFFIX).unlink(missing_ok=True)
+    logger.info("Removed cache entry: %s.", filepath)
+
+
+def _is_entry(path: Path) -> bool:
+    return (
+        path.suffix in CACHE_ENTRY_SUFFIXES
+        and not path.name.startswith(".")
+        and path.is_file()
+    )
+
+
+def list_entries(cache_path: Union[str, os.PathLike]) -> List[CacheEntry]:
+    """Metadata of every entry under the cache path.
+
+    Parameters
+    ----------
+    cache_path : Union[str, os.PathLike]
+        root of the cache.
+
+    Returns
+    -------
+    List[CacheEntry]
+        metadata of the entries, sorted by path.
+    """
+    paths = sorted(Path(cache_path).rglob("*"))
+    return [read_metadata(path) for path in paths if _is_entry(path)]
+
+
+def verify_entries(
+    cache_path: Union[str, os.PathLike], checksum: bool = True
+) -> Dict[Path, str]:
+    """Find entries without metadata or not matching it, sidecars without
+    entry and temporary files left by interrupted writes.
+
+    Parameters
+    ----------
+    cache_path : Union[str, os.PathLike]
+        root of the cache.
+    checksum : bool
+        True to check the checksum of each entry, reading it whole.
+
+    Returns
+    -------
+    Dict[Path, str]
+        problem of each path with one.
+    """
+    problems: Dict[Path, str] = {}
+    for path in sorted(Path(cache_path).rglob("*")):
+        if path.name.endswith(CACHE_SIDECAR_SUFFIX):
+            entry_path = path.with_name(path.name[: -len(CACHE_SIDECAR_SUFFIX)])
+            if not entry_path.exists():
+                problems[path] = "metadata without entry"
+        elif path.name.startswith(".") and path.name.endswith(_TEMP_SUFFIX):
+            problems[path] = "temporary file"
+        elif _is_entry(path):
+            entry = read_metadata(path)
+            if entry.sha256 is None:
+                problems[path] = "no metadata"
+            elif path.stat().st_size != entry.size:
+                problems[path] = f"size {path.stat().st_size} != {entry.size}"
+            elif checksum and file_sha256(path) != entry.sha256:
+                problems[path] = "checksum mismatch"
+
+    return problems
+
+
+def prune_entries(
+    cache_path: Union[str, os.PathLike],
+    max_bytes: Optional[int] = None,
+    max_age: Optional[float] = None,
+    policy: str = "lru",
+    dry_run: bool = False,
+) -> List[CacheEntry]:
+    """Remove the entries older than `max_age`, then evict entries until the
+    cache fits in `max_bytes`, in the order of the policy.
+
+    Parameters
+    ----------
+    cache_path : Union[str, os.PathLike]
+        root of the cache.
+    max_bytes : Optional[int]
+        max total size of the entries, no limit if None.
+    max_age : Optional[float]
+        max seconds since the creation of an entry, no limit if None.
+    policy : str
+        eviction order, one of `CACHE_PRUNE_POLICIES`:
+        - lru: least recently accessed first.
+        - age: oldest created first.
+        - size: largest first.
+    dry_run : bool
+        True to only return the entries to remove.
+
+    Returns
+    -------
+    List[CacheEntry]
+        removed entries.
+
+    Raises
+    ------
+    ValueError
+        if the policy is unknown.
+    """
+    if policy not in CACHE_PRUNE_POLICIES:
+        error_message = f"Unknown prune policy {policy}, knows {CACHE_PRUNE_POLICIES}"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    now = time.time()
+    removed: List[CacheEntry] = []
+    kept: List[CacheEntry] = []
+    for entry in list_entries(cache_path):
+        expired = max_age is not None and now - entry.created > max_age
+        (removed if expired else kept).append(entry)
+
+    if max_bytes is not None:
+        order = {
+            "lru": lambda entry: entry.last_access,
+            "age": lambda entry: entry.created,
+            "size": lambda entry: -entry.size,
+        }[policy]
+        total = sum(entry.size for entry in kept)
+        for entry in sorted(kept, key=order):
+            if total <= max_bytes:
+                break
+            removed.append(entry)
+            total -= entry.size
+
+    if not dry_run:
+        for entry in removed:
+            remove_entry(entry.path)
+    return removed
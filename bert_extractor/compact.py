@@ -0,0 +1,189 @@
+"""Compact tokenized inputs of single sentences: only the `input_ids` and the
+length of each row are kept, the `attention_mask` and the all zeros
+`token_type_ids` are rebuilt from the lengths when read, for the whole split
+or by batches.
+"""
+import logging
+from typing import Dict, Iterator, Mapping, Union
+
+import numpy as np
+from transformers.tokenization_utils_base import BatchEncoding
+
+from bert_extractor.constants import COMPACT_LENGTHS_KEY, COMPACT_REBUILT_INPUTS
+
+logger = logging.getLogger(__name__)
+
+
+def _rebuild(input_ids: np.ndarray, lengths: np.ndarray) -> Dict[str, np.ndarray]:
+    """Token type ids and attention mask of right padded rows."""
+    attention_mask = np.arange(input_ids.shape[1]) < lengths[:, None]
+    return {
+        "token_type_ids": np.zeros(input_ids.shape, input_ids.dtype),
+        "attention_mask": attention_mask.astype(input_ids.dtype),
+    }
+
+
+def compact_batch(batch: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Replace the token type ids and the attention mask of a tokenized batch
+    by the length of each row, if they can be rebuilt from it.
+
+    Parameters
+    ----------
+    batch : Dict[str, np.ndarray]
+        tokenized arrays, with `COMPACT_REBUILT_INPUTS`.
+
+    Returns
+    -------
+    Dict[str, np.ndarray]
+        the other arrays, plus the int32 `COMPACT_LENGTHS_KEY` array.
+
+    Raises
+    ------
+    ValueError
+        if the batch is not of right padded single sentences.
+    """
+    if any(key not in batch for key in COMPACT_REBUILT_INPUTS):
+        error_message = f"Compact inputs need the {COMPACT_REBUILT_INPUTS} inputs"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    compacted = {
+        key: value for key, value in batch.items() if key not in COMPACT_REBUILT_INPUTS
+    }
+    lengths = batch["attention_mask"].sum(axis=1, dtype=np.int32)
+    rebuilt = _rebuild(batch["input_ids"], lengths)
+    if any(not np.array_equal(rebuilt[key], batch[key]) for key in rebuilt):
+        error_message = "Only right padded single sentences can be compacted"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    compacted[COMPACT_LENGTHS_KEY] = lengths
+    return compacted
+
+
+def expand_arrays(arrays: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Rebuild the compacted inputs of stored arrays, e.g. a shard.
+
+    Parameters
+    ----------
+    arrays : Dict[str, np.ndarray]
+        stored arrays, compacted or not.
+
+    Returns
+    -------
+    Dict[str, np.ndarray]
+        the arrays with `COMPACT_REBUILT_INPUTS` instead of the lengths.
+    """
+    if COMPACT_LENGTHS_KEY not in arrays:
+        return arrays
+    expanded = {
+        key: value for key, value in arrays.items() if key != COMPACT_LENGTHS_KEY
+    }
+    expanded.update(_rebuild(arrays["input_ids"], arrays[COMPACT_LENGTHS_KEY]))
+    return expanded
+
+
+class CompactEncoding(Mapping):
+    """Read-only mapping of model inputs, like a `BatchEncoding` of numpy
+    arrays, that stores only the `input_ids`, the rows lengths and the extra
+    arrays such as `word_ids`. The `COMPACT_REBUILT_INPUTS` are rebuilt on
+    each access, use `batch` to rebuild them only for some rows.
+    As a `BatchEncoding`, inputs are also read as attributes, e.g.
+    `inputs.attention_mask`, and `data` is the dict of all of them; the
+    tokenizer methods of a `BatchEncoding`, e.g. `word_ids()`, are not kept.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        """
+        Parameters
+        ----------
+        arrays : Dict[str, np.ndarray]
+            stored arrays, `input_ids` and `COMPACT_LENGTHS_KEY` at least.
+        """
+        self.arrays = arrays
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """Tokens of each row, special tokens included."""
+        return self.arrays[COMPACT_LENGTHS_KEY]
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        if key in COMPACT_REBUILT_INPUTS:
+            return _rebuild(self.arrays["input_ids"], self.lengths)[key]
+        if key == COMPACT_LENGTHS_KEY:
+            raise KeyError(key)
+        return self.arrays[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield "input_ids"
+        yield from COMPACT_REBUILT_INPUTS
+        for key in self.arrays:
+            if key not in ("input_ids", COMPACT_LENGTHS_KEY):
+                yield key
+
+    def __len__(self) -> int:
+        return len(self.arrays) - 1 + len(COMPACT_REBUILT_INPUTS)
+
+    def __getattr__(self, item: str) -> np.ndarray:
+        # arrays isn't set yet while unpickling
+        if item == "arrays" or item.startswith("__"):
+            raise AttributeError(item)
+        try:
+            return self[item]
+        except KeyError as error:
+            raise AttributeError(item) from error
+
+    @property
+    def data(self) -> Dict[str, np.ndarray]:
+        """All the inputs rebuilt, as the `data` dict of a BatchEncoding."""
+        return dict(self.items())
+
+    def __getstate__(self) -> Dict[str, np.ndarray]:
+        return self.arrays
+
+    def __setstate__(self, arrays: Dict[str, np.ndarray]):
+        self.arrays = arrays
+
+    def batch(self, start: int, stop: int) -> Dict[str, np.ndarray]:
+        """Model inputs of the rows `[start, stop)`.
+
+        Parameters
+        ----------
+        start : int
+            first row.
+        stop : int
+            row to stop at.
+
+        Returns
+        -------
+        Dict[str, np.ndarray]
+            views of the stored arrays and the rebuilt inputs of the rows.
+        """
+        return expand_arrays(
+            {key: value[start:stop] for key, value in self.arrays.items()}
+        )
+
+    def iter_batches(self, batch_size: int) -> Iterator[Dict[str, np.ndarray]]:
+        """Model inputs by batches of `batch_size` rows, see `batch`."""
+        rows = len(self.lengths)
+        for start in range(0, rows, batch_size):
+            yield self.batch(start, min(start + batch_size, rows))
+
+    def to_batch_encoding(self) -> BatchEncoding:
+        """All the inputs rebuilt, as a BatchEncoding."""
+        return BatchEncoding(self.data)
+
+
+def as_inputs(arrays: Dict[str, np.ndarray]) -> Union[BatchEncoding, CompactEncoding]:
+    """Model inputs of stored arrays: a CompactEncoding if they are compacted,
+    else a BatchEncoding."""
+    if COMPACT_LENGTHS_KEY in arrays:
+        return CompactEncoding(arrays)
+    return BatchEncoding(arrays)
+
+
+def stored_arrays(inputs: Mapping) -> Mapping:
+    """Arrays to store of model inputs, the compacted ones of a CompactEncoding."""
+    if isinstance(inputs, CompactEncoding):
+        return inputs.arrays
+    return inputs
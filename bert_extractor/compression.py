@@ -0,0 +1,353 @@
+"""Chunked and compressed storage for tokenized tensors.
+
+The file layout is::
+
+    MAGIC | chunk_0 | chunk_1 | ... | header (json) | header length (uint64) | MAGIC
+
+Every array of a `TokenizedTensor` is split by rows into chunks, each chunk is
+compressed independently so they can be compressed in parallel and a reader
+only decompresses the chunks it needs.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+from itertools import islice
+import json
+import logging
+import mmap
+import os
+from pathlib import Path
+import struct
+from threading import Lock
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from bert_extractor.compact import as_inputs, stored_arrays
+from bert_extractor.constants import (
+    COMPRESSION_CODECS,
+    DEFAULT_CHUNK_ROWS,
+    DEFAULT_COMPRESSION_LEVELS,
+)
+from bert_extractor.extractors.base import TokenizedTensor
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover
+    lz4_frame = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"BXTC"
+FORMAT_VERSION = 1
+_FOOTER = struct.Struct("<Q4s")
+_INPUTS_FIELDS = ("train_inputs", "validation_inputs")
+_LABELS_FIELDS = ("train_labels", "validation_labels")
+
+
+def tensor_to_arrays(tensor: TokenizedTensor) -> Dict[str, np.ndarray]:
+    """Flatten a TokenizedTensor into named numpy arrays.
+
+    Inputs are named `<field>.<key>`, e.g. `train_inputs.input_ids`,
+    and labels by their field name, e.g. `train_labels`. Compact inputs are
+    stored compacted, with their `lengths`.
+
+    Parameters
+    ----------
+    tensor : TokenizedTensor
+        Tensor processed and ready to use with BERT.
+
+    Returns
+    -------
+    Dict[str, np.ndarray]
+        named arrays of the tensor.
+    """
+    arrays = {}
+    for field in _INPUTS_FIELDS:
+        for key, value in stored_arrays(getattr(tensor, field)).items():
+            arrays[f"{field}.{key}"] = np.asarray(value)
+    for field in _LABELS_FIELDS:
+        arrays[field] = np.asarray(getattr(tensor, field))
+
+    return arrays
+
+
+def arrays_to_tensor(arrays: Dict[str, np.ndarray]) -> TokenizedTensor:
+    """Build back a TokenizedTensor from the arrays of `tensor_to_arrays`.
+
+    Parameters
+    ----------
+    arrays : Dict[str, np.ndarray]
+        named arrays of the tensor.
+
+    Returns
+    -------
+    TokenizedTensor
+        rebuilt tensor, inputs are BatchEncoding without the tokenizer encodings,
+        or CompactEncoding if they were compacted.
+    """
+    inputs: Dict[str, Dict[str, np.ndarray]] = {field: {} for field in _INPUTS_FIELDS}
+    for name, array in arrays.items():
+        field, _, key = name.partition(".")
+        if key:
+            inputs[field][key] = array
+
+    return TokenizedTensor(
+        train_inputs=as_inputs(inputs["train_inputs"]),
+        validation_inputs=as_inputs(inputs["validation_inputs"]),
+        train_labels=arrays["train_labels"],
+        validation_labels=arrays["validation_labels"],
+    )
+
+
+def get_codec(
+    codec: str, level: Optional[int] = None
+) -> Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    """Get compress and decompress functions for a codec.
+
+    Parameters
+    ----------
+    codec : str
+        one of `COMPRESSION_CODECS`.
+    level : Optional[int]
+        compression level, the codec default if None.
+
+    Returns
+    -------
+    Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]
+        - compress function.
+        - decompress function.
+
+    Raises
+    ------
+    ValueError
+        if the codec is unknown.
+    ImportError
+        if the codec library is not installed.
+    """
+    if codec not in COMPRESSION_CODECS:
+        error_message = f"Unknown codec {codec}, knows {COMPRESSION_CODECS}"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    if level is None:
+        level = DEFAULT_COMPRESSION_LEVELS[codec]
+
+    if codec == "none":
+        return bytes, bytes
+
+    if codec == "gzip":
+        return (
+            lambda data: gzip.compress(data, compresslevel=level, mtime=0),
+            gzip.decompress,
+        )
+
+    if codec == "zstd":
+        if zstandard is None:
+            raise ImportError("zstd codec requires `pip install zstandard`")
+        return (
+            lambda data: zstandard.ZstdCompressor(level=level).compress(data),
+            lambda data: zstandard.ZstdDecompressor().decompress(data),
+        )
+
+    if lz4_frame is None:
+        raise ImportError("lz4 codec requires `pip install lz4`")
+    return (
+        lambda data: lz4_frame.compress(data, compression_level=level),
+        lz4_frame.decompress,
+    )
+
+
+def _iter_chunks(array: np.ndarray, chunk_rows: int) -> Iterator[bytes]:
+    """Yield the raw bytes of each chunk of rows of the array."""
+    for start in range(0, max(len(array), 1), chunk_rows):
+        yield np.ascontiguousarray(array[start : start + chunk_rows]).tobytes()
+
+
+def write_compressed(
+    arrays: Dict[str, np.ndarray],
+    filepath: Union[str, os.PathLike],
+    codec: str = "zstd",
+    level: Optional[int] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    workers: Optional[int] = None,
+) -> Path:
+    """Write named arrays into a chunked compressed file.
+
+    Chunks are compressed in parallel in a thread pool, all the supported
+    codecs release the GIL while compressing.
+
+    Parameters
+    ----------
+    arrays : Dict[str, np.ndarray]
+        named arrays to store.
+    filepath : Union[str, os.PathLike]
+        path of the output file.
+    codec : str
+        one of `COMPRESSION_CODECS`.
+    level : Optional[int]
+        compression level, the codec default if None.
+    chunk_rows : int
+        amount of rows of each compressed chunk.
+    workers : Optional[int]
+        amount of threads to compress with, all the cores if None.
+
+    Returns
+    -------
+    Path
+        path of the written file.
+    """
+    compress, _ = get_codec(codec, level)
+    workers = workers or os.cpu_count() or 1
+    header: Dict = {
+        "version": FORMAT_VERSION,
+        "codec": codec,
+        "level": level,
+        "chunk_rows": chunk_rows,
+        "arrays": {},
+    }
+    filepath = Path(filepath)
+
+    with open(filepath, "wb") as file, ThreadPoolExecutor(workers) as executor:
+        file.write(MAGIC)
+        for name, array in arrays.items():
+            array = np.asarray(array)
+            chunks: List[List[int]] = []
+            raw_chunks = _iter_chunks(array, chunk_rows)
+            # Bound the amount of chunks in flight to keep memory flat.
+            window = list(islice(raw_chunks, workers * 2))
+            while window:
+                for compressed in executor.map(compress, window):
+                    chunks.append([file.tell(), len(compressed)])
+                    file.write(compressed)
+                window = list(islice(raw_chunks, workers * 2))
+
+            header["arrays"][name] = {
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+                "chunks": chunks,
+            }
+
+        encoded_header = json.dumps(header).encode()
+        file.write(encoded_header)
+        file.write(_FOOTER.pack(len(encoded_header), MAGIC))
+
+    logger.info("Stored %s compressed tensor in: %s", codec, filepath)
+    return filepath
+
+
+class CompressedTensorReader:
+    """Read arrays from a file written by `write_compressed`.
+
+    Chunks are decompressed on demand, so reading a rows range only
+    decompresses the chunks that overlap it.
+    """
+
+    def __init__(self, filepath: Union[str, os.PathLike]):
+        """
+        Parameters
+        ----------
+        filepath : Union[str, os.PathLike]
+            path of the compressed file.
+
+        Raises
+        ------
+        ValueError
+            if the file is not a compressed tensor.
+        """
+        self.filepath = Path(filepath)
+        self._file = open(self.filepath, "rb")
+        self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._lock = Lock()
+
+        header_length, magic = _FOOTER.unpack(self._buffer[-_FOOTER.size :])
+        if magic != MAGIC or self._buffer[: len(MAGIC)] != MAGIC:
+            self.close()
+            error = f"File {filepath} is not a compressed tensor."
+            logger.error(error)
+            raise ValueError(error)
+
+        header_end = len(self._buffer) - _FOOTER.size
+        self.header = json.loads(self._buffer[header_end - header_length : header_end])
+        _, self._decompress = get_codec(self.header["codec"], self.header["level"])
+
+    def __enter__(self) -> "CompressedTensorReader":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Release the file handles."""
+        self._buffer.close()
+        self._file.close()
+
+    def keys(self) -> List[str]:
+        """Names of the stored arrays."""
+        return list(self.header["arrays"])
+
+    def shape(self, name: str) -> Tuple[int, ...]:
+        """Shape of the stored array."""
+        return tuple(self.header["arrays"][name]["shape"])
+
+    def __len__(self) -> int:
+        return len(self.header["arrays"])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.read(name)
+
+    def read(
+        self, name: str, start: Optional[int] = None, stop: Optional[int] = None
+    ) -> np.ndarray:
+        """Read rows `[start, stop)` of the named array.
+
+        Parameters
+        ----------
+        name : str
+            name of the stored array.
+        start : Optional[int]
+            first row to read, 0 if None.
+        stop : Optional[int]
+            row to stop reading at, the end of the array if None.
+
+        Returns
+        -------
+        np.ndarray
+            requested rows.
+        """
+        meta = self.header["arrays"][name]
+        shape = meta["shape"]
+        dtype = np.dtype(meta["dtype"])
+        chunk_rows = self.header["chunk_rows"]
+        start, stop, _ = slice(start, stop).indices(shape[0])
+        if start >= stop:
+            return np.empty((0, *shape[1:]), dtype)
+        first_chunk = start // chunk_rows
+        last_chunk = max(first_chunk, (stop - 1) // chunk_rows)
+        parts = [
+            np.frombuffer(self._read_chunk(chunk), dtype).reshape(-1, *shape[1:])
+            for chunk in meta["chunks"][first_chunk : last_chunk + 1]
+        ]
+        offset = first_chunk * chunk_rows
+        rows = np.concatenate(parts)
+
+        return rows[start - offset : stop - offset]
+
+    def _read_chunk(self, chunk: List[int]) -> bytes:
+        """Decompress a chunk given its offset and length."""
+        offset, length = chunk
+        with self._lock:
+            data = self._buffer[offset : offset + length]
+        return self._decompress(data)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Read all the stored arrays."""
+        return {name: self.read(name) for name in self.keys()}
+
+    def to_tensor(self) -> TokenizedTensor:
+        """Read all the stored arrays as a TokenizedTensor."""
+        return arrays_to_tensor(self.to_arrays())
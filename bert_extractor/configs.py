@@ -4,13 +4,7 @@ import logging
 import os
 from typing import Dict, Union
 
-from bert_extractor.constants import (
-    KNOWN_CONFIGS_TYPES,
-    KNOWN_NER_URLS,
-    KNOWN_REVIEWS_URLS,
-    NER_CONFIG_TYPE,
-    REVIEWS_CONFIG_TYPE,
-)
+from bert_extractor import registry
 
 logger = logging.getLogger(__name__)
 
@@ -37,7 +31,8 @@ def read_config(config_path: Union[str, os.PathLike]) -> Dict:
 
 
 def _validate_config(config: Dict):
-    """Validate configs are set properly.
+    """Validate configs are set properly, against the extractor types and
+    datasets of the registry.
 
     Parameters
     ----------
@@ -48,19 +43,10 @@ def _validate_config(config: Dict):
     ------
         ValueError if any validation does not fullfil.
     """
-    if config.get("extractor_type") not in KNOWN_CONFIGS_TYPES:
-        error_message = f"Unknown extractor type, knows {KNOWN_CONFIGS_TYPES}"
+    extractor_types = registry.extractor_types()
+    if config.get("extractor_type") not in extractor_types:
+        error_message = f"Unknown extractor type, knows {extractor_types}"
         logger.error(error_message)
         raise ValueError(error_message)
 
-    if config.get("extractor_type") == NER_CONFIG_TYPE:
-        if config.get("extractor_url") not in KNOWN_NER_URLS:
-            error_message = f"Unknown extractor type, knows {KNOWN_NER_URLS}"
-            logger.error(error_message)
-            raise ValueError(error_message)
-
-    elif config.get("extractor_type") == REVIEWS_CONFIG_TYPE:
-        if config.get("extractor_url") not in KNOWN_REVIEWS_URLS:
-            error_message = f"Unknown extractor type, knows {KNOWN_REVIEWS_URLS}"
-            logger.error(error_message)
-            raise ValueError(error_message)
+    registry.resolve_url(config["extractor_type"], config.get("extractor_url"))
@@ -11,9 +11,17 @@ NER_LABLES_MAP = {
     "I-ORG": 8,
     "O": 9,
 }
+NER_UNKNOWN_LABEL = 0
+# Label of the sub-tokens after the first one of a word:
+# - all: the word label.
+# - first: `SPECIAL_TOKEN_LABEL`, only the first sub-token is labeled.
+# - b_to_i: the word label, with B- labels turned into their I- label.
+NER_LABEL_STRATEGIES = ["all", "first", "b_to_i"]
 NER_KAGGLE_DATASET = {"conll_2003": "alaakhaled/conll003-englishversion"}
+KAGGLE_ARCHIVES_DIR = "kaggle"
 
 SPECIAL_TOKEN_LABEL = -100
+SPECIAL_TOKEN_WORD_ID = -1
 
 
 # AMAZON REVIEWS
@@ -27,7 +35,87 @@ REVIEWS_DATASET = {
 
 NER_CONFIG_TYPE = "ner"
 REVIEWS_CONFIG_TYPE = "reviews"
-KNOWN_CONFIGS_TYPES = [NER_CONFIG_TYPE, REVIEWS_CONFIG_TYPE]
+LOCAL_CONFIG_TYPE = "local"
 
-KNOWN_NER_URLS = list(NER_KAGGLE_DATASET.keys())
-KNOWN_REVIEWS_URLS = list(REVIEWS_DATASET.keys())
+# Registry
+
+EXTRACTORS_ENTRY_POINTS = "bert_extractor.extractors"
+DATASETS_ENTRY_POINTS = "bert_extractor.datasets"
+
+# Local files
+
+LOCAL_FILE_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".parquet": "parquet"}
+
+# Cache
+
+CACHE_ENTRY_SUFFIXES = [".pkl", ".npz", ".zip"]
+CACHE_SIDECAR_SUFFIX = ".meta.json"
+CACHE_LOCK_SUFFIX = ".lock"
+CACHE_PRUNE_POLICIES = ["lru", "age", "size"]
+PREWARM_MAX_WORKERS = 4
+
+# Storage
+
+COMPRESSION_CODECS = ["none", "gzip", "zstd", "lz4"]
+DEFAULT_COMPRESSION_LEVELS = {"none": 0, "gzip": 6, "zstd": 3, "lz4": 0}
+DEFAULT_CHUNK_ROWS = 4096
+
+# Profiling
+
+PROFILE_TRAINING_BATCH_SIZE = 32
+PROFILE_PERCENTILES = [50, 90, 95, 99, 100]
+PROFILE_PADDING_POLICIES = [
+    "max_length",
+    "p99_truncation",
+    "batch_longest",
+    "no_padding",
+]
+
+# Split
+
+SPLIT_STRATEGIES = ["random", "external", "hash"]
+SPLIT_SEED = 2020
+SPLIT_MEMORY_BUDGET = 512 * 2 ** 20
+TOKENIZE_CHUNK_ROWS = 8192
+
+# Tokenization
+
+TOKENIZE_BATCH_SIZE = 1024
+TOKENIZE_MAX_WORKERS = 4
+# Tokenized outputs over the memory budget go to memory-mapped files here,
+# inside the cache path.
+SPILL_DIR = "spill"
+# Token classification encoders: the tokenizer, or the word-piece index of the
+# distinct words, cached in its directory inside the cache path.
+TOKENIZE_ENGINES = ["tokenizer", "word_index"]
+WORD_INDEX_DIR = "word_index"
+# Compact inputs keep the length of each row instead of these inputs, rebuilt
+# from it when read.
+COMPACT_LENGTHS_KEY = "lengths"
+COMPACT_REBUILT_INPUTS = ["token_type_ids", "attention_mask"]
+
+# Pipeline
+
+STREAM_CHUNK_BYTES = 2 ** 20
+
+# JSON lines
+
+JSON_BACKENDS = ["json", "orjson"]
+JSON_PARSE_BATCH_BYTES = 4 * 2 ** 20
+JSON_PARSE_QUEUE_SIZE = 8
+# Start method of the parsing processes, created from pipeline threads.
+JSON_PARSE_START_METHOD = "spawn"
+
+# Server and inference
+
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8080
+SERVER_MAX_LENGTH = 128
+SERVER_OUTPUT_PATH = "./data/"
+MICRO_BATCH_MAX_SIZE = 256
+MICRO_BATCH_MAX_LATENCY_MS = 5
+NPZ_CONTENT_TYPE = "application/x-npz"
+
+# Tensors
+
+FRAMEWORKS = ["pt", "tf", "jax"]
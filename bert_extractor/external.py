@@ -0,0 +1,187 @@
+"""Out-of-core shuffle and split for datasets larger than memory.
+
+It is an external sort on random keys: each row gets a seeded random key and
+goes to train or validation, rows are buffered up to the memory budget, sorted
+by key and spilled into run files, then the runs of each split are merged
+back lazily, that is a uniform shuffle streamed with bounded memory.
+"""
+import heapq
+import logging
+import os
+from pathlib import Path
+import pickle
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SPLITS = ("train", "validation")
+_KEYS_BATCH = 4096
+
+
+class ExternalSplit:
+    """Train and validation rows shuffled out of core."""
+
+    def __init__(
+        self,
+        test_size: float,
+        seed: int,
+        memory_budget: int,
+        tmp_dir: Optional[Union[str, os.PathLike]] = None,
+    ):
+        """
+        Parameters
+        ----------
+        test_size : float
+            probability of a row to go to validation, between [0,1].
+        seed : int
+            random seed of the shuffle and split.
+        memory_budget : int
+            bytes of rows to hold in memory before spilling them to disk.
+        tmp_dir : Optional[Union[str, os.PathLike]]
+            directory for the run files, the system temporary directory if None.
+        """
+        self.test_size = test_size
+        self.memory_budget = memory_budget
+        self._rng = np.random.default_rng(seed)
+        self._tmp_dir = tempfile.TemporaryDirectory(dir=tmp_dir)
+        self._runs = {split: [] for split in SPLITS}
+        self.num_rows = {split: 0 for split in SPLITS}
+
+    def __enter__(self) -> "ExternalSplit":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Delete the run files."""
+        self._tmp_dir.cleanup()
+
+    def _random_keys(self) -> Iterator[Tuple[int, bool]]:
+        """Yield the shuffle key and if it goes to validation of each row."""
+        while True:
+            keys = self._rng.integers(0, 2 ** 63, _KEYS_BATCH, dtype=np.int64)
+            validation = self._rng.random(_KEYS_BATCH) < self.test_size
+            yield from zip(keys.tolist(), validation.tolist())
+
+    def write(self, rows: Iterable[Any]) -> "ExternalSplit":
+        """Split and spill the rows into sorted run files.
+
+        Parameters
+        ----------
+        rows : Iterable[Any]
+            picklable rows, e.g. (sentence, label) tuples.
+
+        Returns
+        -------
+        ExternalSplit
+            self, to chain it with the readers.
+        """
+        buffers = {split: [] for split in SPLITS}
+        buffered_bytes = 0
+
+        for row, (key, validation) in zip(rows, self._random_keys()):
+            split = SPLITS[validation]
+            encoded = pickle.dumps(row, protocol=pickle.HIGHEST_PROTOCOL)
+            buffers[split].append((key, encoded))
+            buffered_bytes += len(encoded)
+            self.num_rows[split] += 1
+
+            if buffered_bytes >= self.memory_budget:
+                self._spill(buffers)
+                buffered_bytes = 0
+
+        self._spill(buffers)
+        logger.info(
+            "Spilled %s train and %s validation runs",
+            len(self._runs["train"]),
+            len(self._runs["validation"]),
+        )
+        return self
+
+    def _spill(self, buffers: Dict[str, List[Tuple[int, bytes]]]):
+        """Sort the buffered rows by key and write them into run files."""
+        for split, buffer in buffers.items():
+            if not buffer:
+                continue
+            buffer.sort(key=lambda item: item[0])
+            run_path = Path(self._tmp_dir.name) / f"{split}_{len(self._runs[split])}"
+            with open(run_path, "wb") as file:
+                for key, encoded in buffer:
+                    file.write(key.to_bytes(8, "little"))
+                    file.write(len(encoded).to_bytes(8, "little"))
+                    file.write(encoded)
+            self._runs[split].append(run_path)
+            buffer.clear()
+
+    @staticmethod
+    def _read_run(run_path: Path) -> Iterator[Tuple[int, bytes]]:
+        """Yield the key and the encoded row of a run file."""
+        with open(run_path, "rb") as file:
+            while True:
+                header = file.read(16)
+                if not header:
+                    return
+                length = int.from_bytes(header[8:], "little")
+                yield int.from_bytes(header[:8], "little"), file.read(length)
+
+    def read(self, split: str) -> Iterator[Any]:
+        """Stream the shuffled rows of a split.
+
+        Parameters
+        ----------
+        split : str
+            `train` or `validation`.
+
+        Returns
+        -------
+        Iterator[Any]
+            shuffled rows.
+        """
+        runs = [self._read_run(run_path) for run_path in self._runs[split]]
+        for _, encoded in heapq.merge(*runs, key=lambda item: item[0]):
+            yield pickle.loads(encoded)
+
+    def train(self) -> Iterator[Any]:
+        """Stream the shuffled train rows."""
+        return self.read("train")
+
+    def validation(self) -> Iterator[Any]:
+        """Stream the shuffled validation rows."""
+        return self.read("validation")
+
+
+def external_shuffle_split(
+    rows: Iterable[Any],
+    test_size: float,
+    seed: int,
+    memory_budget: int,
+    tmp_dir: Optional[Union[str, os.PathLike]] = None,
+) -> ExternalSplit:
+    """Shuffle and split rows keeping at most `memory_budget` bytes in memory.
+    The result is the same for the same rows and seed.
+
+    Parameters
+    ----------
+    rows : Iterable[Any]
+        picklable rows, e.g. (sentence, label) tuples.
+    test_size : float
+        probability of a row to go to validation, between [0,1].
+    seed : int
+        random seed of the shuffle and split.
+    memory_budget : int
+        bytes of rows to hold in memory before spilling them to disk.
+    tmp_dir : Optional[Union[str, os.PathLike]]
+        directory for the run files, the system temporary directory if None.
+
+    Returns
+    -------
+    ExternalSplit
+        split to stream the train and validation rows, close it to delete
+        the run files.
+    """
+    return ExternalSplit(test_size, seed, memory_budget, tmp_dir).write(rows)
+
@@ -1,27 +1,226 @@
 """Extractor base class"""
 from abc import ABC
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 import logging
 import os
-from typing import Any, List, NamedTuple, Optional, Tuple, Union
+from pathlib import Path
+import shutil
+import tempfile
+from threading import Lock
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+import weakref
 
 import numpy as np
 from sklearn.model_selection import train_test_split
 from transformers import AutoTokenizer
 from transformers.tokenization_utils_base import BatchEncoding, PreTrainedTokenizerBase
 
+from bert_extractor.batching import MicroBatcher
+from bert_extractor.cache import cache_preprocess, preprocessed_path, raw_entry_path
+from bert_extractor.compact import as_inputs, compact_batch, stored_arrays
+from bert_extractor.constants import (
+    COMPACT_LENGTHS_KEY,
+    FRAMEWORKS,
+    MICRO_BATCH_MAX_LATENCY_MS,
+    MICRO_BATCH_MAX_SIZE,
+    SPECIAL_TOKEN_WORD_ID,
+    SPILL_DIR,
+    SPLIT_MEMORY_BUDGET,
+    SPLIT_SEED,
+    SPLIT_STRATEGIES,
+    TOKENIZE_BATCH_SIZE,
+    TOKENIZE_CHUNK_ROWS,
+    TOKENIZE_MAX_WORKERS,
+)
+from bert_extractor.external import external_shuffle_split
+from bert_extractor.hash_split import validation_mask
+from bert_extractor.manifest import read_manifest
+from bert_extractor.parallel import batched, bounded_map
+from bert_extractor.pipeline import Stage, run_pipeline
+
 logger = logging.getLogger(__name__)
 
 
 class TokenizedTensor(NamedTuple):
-    """ Tuple of preprocessed tensors."""
+    """ Tuple of preprocessed tensors.
+    Inputs hold plain contiguous numpy arrays, without the tokenizer encodings,
+    so they are cheap to keep and to serialize. With `compact_inputs` they are
+    `bert_extractor.compact.CompactEncoding` mappings, that rebuild the
+    `attention_mask` and `token_type_ids` when read, with the mapping, the
+    attributes and the `data` of a `BatchEncoding` but not its tokenizer
+    methods.
+    """
 
     train_inputs: BatchEncoding
     validation_inputs: BatchEncoding
     train_labels: np.array
     validation_labels: np.array
 
+    def to_framework(self, framework: str) -> "TokenizedTensor":
+        """Convert the arrays to PyTorch, TensorFlow or JAX tensors,
+        sharing the memory of the numpy arrays instead of copying it.
+
+        Parameters
+        ----------
+        framework : str
+            one of `FRAMEWORKS`: pt, tf or jax.
+
+        Returns
+        -------
+        TokenizedTensor
+            tensor with the framework arrays.
+        """
+        convert = _framework_converter(framework)
+        return TokenizedTensor(
+            train_inputs=BatchEncoding(
+                {key: convert(value) for key, value in self.train_inputs.items()}
+            ),
+            validation_inputs=BatchEncoding(
+                {key: convert(value) for key, value in self.validation_inputs.items()}
+            ),
+            train_labels=convert(self.train_labels),
+            validation_labels=convert(self.validation_labels),
+        )
+
+    def to_arrow(self) -> Dict[str, Any]:
+        """Convert each split to an Arrow record batch, with a column for
+        each input and the labels, without copying the arrays.
+
+        Returns
+        -------
+        Dict[str, pyarrow.RecordBatch]
+            record batch of the `train` and the `validation` splits.
+        """
+        try:
+            import pyarrow  # pylint: disable=import-outside-toplevel
+        except ImportError as error:  # pragma: no cover
+            raise ImportError(
+                "to_arrow requires `pip install pyarrow` or the arrow extra"
+            ) from error
+
+        def to_column(array: np.ndarray) -> pyarrow.Array:
+            array = np.ascontiguousarray(array)
+            values = pyarrow.array(array.reshape(-1))
+            if array.ndim == 1:
+                return values
+            return pyarrow.FixedSizeListArray.from_arrays(values, array.shape[1])
+
+        batches = {}
+        for split, inputs, labels in [
+            ("train", self.train_inputs, self.train_labels),
+            ("validation", self.validation_inputs, self.validation_labels),
+        ]:
+            columns = {key: to_column(value) for key, value in inputs.items()}
+            columns["labels"] = to_column(labels)
+            batches[split] = pyarrow.RecordBatch.from_pydict(columns)
+
+        return batches
+
+
+def _framework_converter(framework: str) -> Callable[[np.ndarray], Any]:
+    """Zero copy conversion function from numpy to the framework.
+
+    Raises
+    ------
+    ValueError
+        if the framework is unknown.
+    """
+    # Frameworks are optional and heavy, import only the requested one.
+    # pylint: disable=import-outside-toplevel
+    if framework == "pt":
+        import torch
+
+        return torch.from_numpy
+
+    if framework == "tf":
+        import tensorflow as tf
+
+        return lambda array: tf.experimental.dlpack.from_dlpack(array.__dlpack__())
+
+    if framework == "jax":
+        import jax.dlpack
+
+        return jax.dlpack.from_dlpack
+
+    error_message = f"Unknown framework {framework}, knows {FRAMEWORKS}"
+    logger.error(error_message)
+    raise ValueError(error_message)
+
+
+def _take(rows: Any, *indexes: np.ndarray) -> Tuple:
+    """Select the rows at each of the indexes, from a list or anything
+    with a numpy like `take`, e.g. np.ndarray or RaggedArray."""
+    if hasattr(rows, "take"):
+        return tuple(rows.take(index) for index in indexes)
+    return tuple([rows[position] for position in index] for index in indexes)
+
+
+def _remove_spilled(split_path: Path):
+    """Remove the memory-mapped files of a split, and the directory of the
+    extraction once both of its splits are removed."""
+    shutil.rmtree(split_path, ignore_errors=True)
+    try:
+        split_path.parent.rmdir()
+    except OSError:
+        pass
+
+
+class _SpilledSplit:
+    """Owner of the memory-mapped files of a split, referenced by each of its
+    arrays. The files are removed once no array or view of the split is left,
+    or at exit."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        weakref.finalize(self, _remove_spilled, path)
+
+
+def _allocate_outputs(
+    rows: int,
+    batch: Dict[str, np.ndarray],
+    batch_labels: np.ndarray,
+    spill_path: Optional[Path] = None,
+) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """Preallocate the outputs of a split, with the shape and dtype of its
+    first batch: in-RAM arrays, or `.npy` memory-mapped files in `spill_path`."""
+
+    def allocate(name: str, value: np.ndarray) -> np.ndarray:
+        shape = (rows,) + value.shape[1:]
+        if spill_path is None:
+            return np.empty(shape, value.dtype)
+        return np.lib.format.open_memmap(
+            spill_path / f"{name}.npy", mode="w+", dtype=value.dtype, shape=shape
+        )
+
+    if spill_path is not None:
+        spill_path.mkdir(parents=True, exist_ok=True)
+    arrays = {key: allocate(key, value) for key, value in batch.items()}
+    labels = allocate("labels", batch_labels)
+    if spill_path is not None:
+        owner = _SpilledSplit(spill_path)
+        for array in (*arrays.values(), labels):
+            array.spilled_split = owner
+    return arrays, labels
+
 
 class BaseBERTExtractor(ABC):
+    # Bump it when `preprocess` output changes, to invalidate its cache.
+    preprocess_version = 1
+    # True if `stream_raw` is implemented, to extract through the pipeline.
+    streams_raw = False
+
     def __init__(
         self,
         pretrained_model_name_or_path: Union[str, os.PathLike],
@@ -32,6 +231,16 @@ class BaseBERTExtractor(ABC):
         split_test_size: float = 0.1,
         cache_path: Union[str, os.PathLike] = "/tmp/bert_extractor",
         read_cache: bool = False,
+        split_strategy: str = "random",
+        split_seed: int = SPLIT_SEED,
+        split_memory_budget: int = SPLIT_MEMORY_BUDGET,
+        keep_word_ids: bool = False,
+        tokenize_batch_size: int = TOKENIZE_BATCH_SIZE,
+        tokenize_workers: Optional[int] = None,
+        tokenizers_parallelism: Optional[bool] = None,
+        pipeline_queue_size: Optional[int] = None,
+        tokenize_memory_budget: Optional[int] = None,
+        compact_inputs: bool = False,
     ):
         """Base class to extract BERT classification data from any datasource.
 
@@ -50,10 +259,55 @@ class BaseBERTExtractor(ABC):
         split_test_size : float
             amount of dataset to use for test, between [0,1].
         cache_path : Union[str, os.PathLike]
-            path to store cached raw data.
+            path to store cached raw and preprocessed data.
         read_cache : bool
             True to read from cache_path
+        split_strategy : str
+            how to split train and validation, one of `SPLIT_STRATEGIES`:
+            - random: shuffle and split in memory.
+            - external: shuffle and split out of core, in `split_memory_budget`.
+            - hash: each sentence by its content hash, keeping the order, stable
+              when rows are appended and when splitting shards independently.
+        split_seed : int
+            random seed of the split, the salt of the hash split.
+        split_memory_budget : int
+            bytes of rows to keep in memory with the external split.
+        keep_word_ids : bool
+            True to keep the word index of each token as a `word_ids` input,
+            `SPECIAL_TOKEN_WORD_ID` for special tokens.
+        tokenize_batch_size : int
+            amount of sentences of each fast tokenizer call.
+        tokenize_workers : Optional[int]
+            threads sending batches to the fast tokenizer, that releases the GIL,
+            up to `TOKENIZE_MAX_WORKERS` cores if None.
+        tokenizers_parallelism : Optional[bool]
+            value of `TOKENIZERS_PARALLELISM`, the tokenizer parallelism inside
+            each batch, left as set in the environment if None.
+        pipeline_queue_size : Optional[int]
+            run the raw data stream, its stages and `preprocess` concurrently,
+            with up to this amount of items between stages, if the extractor
+            streams its raw data. Sequentially if None.
+        tokenize_memory_budget : Optional[int]
+            bytes of tokenized arrays to keep in memory. If the projected size of
+            the tokenized outputs is over it, they are written by batches into
+            memory-mapped files in `cache_path`, instead of in-RAM arrays,
+            removed once the arrays are garbage collected. No limit if None.
+        compact_inputs : bool
+            True to keep only the `input_ids` and the length of each row, the
+            all zeros `token_type_ids` and the `attention_mask` are rebuilt from
+            it when read, for the whole split or by batches, see
+            `bert_extractor.compact.CompactEncoding`.
+
+        Raises
+        ------
+        ValueError
+            if the split strategy is unknown.
         """
+        if split_strategy not in SPLIT_STRATEGIES:
+            error_message = f"Unknown split strategy, knows {SPLIT_STRATEGIES}"
+            logger.error(error_message)
+            raise ValueError(error_message)
+
         self.pretrained_model_name_or_path = pretrained_model_name_or_path
         self.sentence_col = sentence_col
         self.labels_col = labels_col
@@ -62,7 +316,22 @@ class BaseBERTExtractor(ABC):
         self.auth_key = auth_key
         self.cache_path = cache_path
         self.read_cache = read_cache
+        self.split_strategy = split_strategy
+        self.split_seed = split_seed
+        self.split_memory_budget = split_memory_budget
+        self.keep_word_ids = keep_word_ids
+        self.tokenize_batch_size = tokenize_batch_size
+        self.tokenize_workers = tokenize_workers or min(
+            TOKENIZE_MAX_WORKERS, os.cpu_count() or 1
+        )
+        self.tokenizers_parallelism = tokenizers_parallelism
+        self.pipeline_queue_size = pipeline_queue_size
+        self.tokenize_memory_budget = tokenize_memory_budget
+        self.compact_inputs = compact_inputs
         self.token_classification = False
+        self._tokenizer: Optional[PreTrainedTokenizerBase] = None
+        self._inference_batcher: Optional[MicroBatcher] = None
+        self._inference_lock = Lock()
 
     def authenticate(self):
         """Authenticate to a services if needed"""
@@ -71,7 +340,7 @@ class BaseBERTExtractor(ABC):
         """Extract and preprocess data, for BERT tasks.
         The pipelines is:
             - extract_raw (here we read it from or set the cache)
-            - preprocess
+            - preprocess (here we read it from or set the cache)
             - bert_tokenizer
             - validate
 
@@ -85,11 +354,152 @@ class BaseBERTExtractor(ABC):
         TokenizedTensor
             Extracted and preprocessed data to consume BERT model.
         """
+        if self.split_strategy == "external":
+            # Only the batch being split is in memory, not the whole corpus.
+            rows = (
+                row
+                for sentences, labels in self._preprocessed_batches(url)
+                for row in zip(sentences, labels)
+            )
+            return self._external_bert_tokenizer(rows, self.load_tokenizer())
+
+        sentences, labels = self.extract_preprocessed(url)
+
+        return self.bert_tokenizer(sentences, labels)
+
+    @cache_preprocess()
+    def extract_preprocessed(self, url: str) -> Tuple[List, List]:
+        """Extract and preprocess the raw data, before tokenization.
+        Its output doesn't depend on the tokenizer, so it is cached to start
+        tokenizer sweeps straight from the preprocessed text.
+
+        Parameters
+        ----------
+        url : str
+            url to extract data from.
+
+        Returns
+        -------
+        Tuple[List, List]
+            - sentences: preprocessed sentences.
+            - labels: preprocessed labels.
+        """
         self.authenticate()
+        if self.pipeline_queue_size and self._streams_url(url):
+            return self._pipelined_preprocess(self.stream_raw(url))
+
         extracted = self.extract_raw(url)
-        sentences, labels = self.preprocess(extracted)
 
-        return self.bert_tokenizer(sentences, labels)
+        return self.preprocess(extracted)
+
+    def _pipelined_preprocess(self, stream: Iterable[Any]) -> Tuple[List, List]:
+        """Preprocess the raw stream by batches, the stream, each of the
+        `raw_stages` and `preprocess` running concurrently.
+
+        Parameters
+        ----------
+        stream : Iterable[Any]
+            raw data stream, from `stream_raw`.
+
+        Returns
+        -------
+        Tuple[List, List]
+            - sentences: preprocessed sentences.
+            - labels: preprocessed labels.
+        """
+        sentences: List = []
+        labels: List = []
+        for batch_sentences, batch_labels in self._preprocess_stream(stream):
+            sentences.extend(batch_sentences)
+            labels.extend(batch_labels)
+
+        logger.info("Pipelined extraction of %s sentences", len(sentences))
+        return sentences, labels
+
+    def _preprocess_stream(self, stream: Iterable[Any]) -> Iterator[Tuple[List, List]]:
+        """Preprocessed batches of the raw stream, through the `raw_stages` and
+        `preprocess`, run concurrently if `pipeline_queue_size` is set, else
+        one after the other.
+
+        Parameters
+        ----------
+        stream : Iterable[Any]
+            raw data stream, from `stream_raw`.
+
+        Returns
+        -------
+        Iterator[Tuple[List, List]]
+            sentences and labels of each batch.
+        """
+        stages = self.raw_stages() + [
+            lambda batches: (self.preprocess(batch) for batch in batches)
+        ]
+        if self.pipeline_queue_size:
+            return run_pipeline(stream, stages, self.pipeline_queue_size)
+
+        batches: Iterable[Any] = stream
+        for stage in stages:
+            batches = stage(iter(batches))
+        return iter(batches)
+
+    def _preprocessed_batches(self, url: str) -> Iterator[Tuple[List, List]]:
+        """Preprocessed sentences and labels by batches, streamed from
+        `stream_raw`, for the external split. The preprocessed cache is read
+        but not written from a stream, as it needs the whole corpus.
+        Extractors that don't stream give `extract_preprocessed` as one batch.
+
+        Parameters
+        ----------
+        url : str
+            url to extract data from.
+
+        Returns
+        -------
+        Iterator[Tuple[List, List]]
+            sentences and labels of each batch.
+        """
+        cached = self.read_cache and preprocessed_path(self, url).exists()
+        if not cached and self._streams_url(url):
+            self.authenticate()
+            yield from self._preprocess_stream(self.stream_raw(url))
+            return
+
+        yield self.extract_preprocessed(url)
+
+    def _streams_url(self, url: str) -> bool:
+        """True to stream the raw data of the url: the extractor streams it and
+        it isn't read from the raw data cache."""
+        return self.streams_raw and not (
+            self.read_cache and raw_entry_path(self, url).exists()
+        )
+
+    def stream_raw(self, url: str) -> Iterable[Any]:
+        """Raw data as a stream, e.g. the downloaded bytes by chunks,
+        for the pipelined extraction, implemented by the extractors that set
+        `streams_raw`. The raw data cache is neither read nor written.
+
+        Parameters
+        ----------
+        url : str
+            url to extract data from.
+
+        Returns
+        -------
+        Iterable[Any]
+            raw data stream.
+        """
+        raise NotImplementedError(f"{type(self).__name__} doesn't stream")
+
+    def raw_stages(self) -> List[Stage]:
+        """Stages from the `stream_raw` items to batches of extracted raw data,
+        each batch is preprocessed with `preprocess`.
+
+        Returns
+        -------
+        List[Stage]
+            functions from an iterator of items to an iterable of items.
+        """
+        return []
 
     def extract_raw(self, url: str) -> Any:
         """Extract raw data from a url.
@@ -131,9 +541,9 @@ class BaseBERTExtractor(ABC):
         Parameters
         ----------
         sentences : List
-            sentences to tokenize.
+            sentences to tokenize, a list or a RaggedArray of words.
         labels: List
-            labels to processes if needed.
+            labels to processes if needed, a list or a RaggedArray.
 
         Returns
         -------
@@ -145,35 +555,228 @@ class BaseBERTExtractor(ABC):
             isn't dependant on TensorFlow or PyTorch.
 
         """
-        logger.info("Pretrained model name: %s", self.pretrained_model_name_or_path)
-        tokenizer = AutoTokenizer.from_pretrained(
-            self.pretrained_model_name_or_path, do_lower_case=True, use_fast=True,
-        )
-        if self.token_classification:
-            max_length = self._round_nearst_pow(
-                min(
-                    max(len(tokenizer.encode(" ".join(sent))) for sent in sentences),
-                    512,
-                )
-            )
-        else:
-            max_length = self._round_nearst_pow(
-                min(
-                    max(len(tokenizer.encode(sent)) for sent in sentences),
-                    tokenizer.model_max_length,
-                )
-            )
+        tokenizer = self.load_tokenizer()
+        if self.split_strategy == "external":
+            return self._external_bert_tokenizer(zip(sentences, labels), tokenizer)
+
+        lengths = self._token_lengths(sentences, tokenizer)
+        max_length = self.get_max_length(lengths, tokenizer)
         logger.info("Max sentences length %s", max_length)
-        train_sentences, val_sentences, train_labels, val_labels = train_test_split(
-            sentences, labels, random_state=2020, test_size=self.test_size,
-        )
+        train_index, val_index = self._split_indexes(sentences)
+        train_sentences, val_sentences = _take(sentences, train_index, val_index)
+        train_labels, val_labels = _take(labels, train_index, val_index)
+        spill_path = self._spill_path(len(sentences), max_length, tokenizer)
         train_tokenized, train_labels = self._tokenize_split(
-            train_sentences, train_labels, max_length, tokenizer
+            train_sentences,
+            train_labels,
+            max_length,
+            tokenizer,
+            spill_path and spill_path / "train",
         )
         val_tokenized, val_labels = self._tokenize_split(
-            val_sentences, val_labels, max_length, tokenizer
+            val_sentences,
+            val_labels,
+            max_length,
+            tokenizer,
+            spill_path and spill_path / "validation",
+        )
+
+        return TokenizedTensor(
+            train_inputs=train_tokenized,
+            validation_inputs=val_tokenized,
+            train_labels=train_labels,
+            validation_labels=val_labels,
+        )
+
+    def extraction_manifest(self, tensor: TokenizedTensor) -> Dict:
+        """Tokenizer settings of an extraction, to tokenize texts for inference
+        as the extracted data, see `tokenize_for_inference`.
+
+        Parameters
+        ----------
+        tensor : TokenizedTensor
+            extracted tensor.
+
+        Returns
+        -------
+        Dict
+            settings of the extraction.
+        """
+        return {
+            "extractor": type(self).__name__,
+            "pretrained_model_name_or_path": str(self.pretrained_model_name_or_path),
+            "max_length": int(tensor.train_inputs["input_ids"].shape[1]),
+            "padding": "max_length",
+            "truncation": True,
+            "is_split_into_words": self.token_classification,
+            "model_input_names": list(tensor.train_inputs.keys()),
+            "rows": {
+                "train": len(tensor.train_labels),
+                "validation": len(tensor.validation_labels),
+            },
+            "split_strategy": self.split_strategy,
+            "split_seed": self.split_seed,
+        }
+
+    def tokenize_for_inference(
+        self,
+        texts: Union[str, List],
+        manifest: Optional[Union[str, os.PathLike, Dict]] = None,
+        max_batch_size: int = MICRO_BATCH_MAX_SIZE,
+        max_latency_ms: float = MICRO_BATCH_MAX_LATENCY_MS,
+    ) -> Dict[str, np.ndarray]:
+        """Tokenize unlabeled texts with the max length and padding of a stored
+        extraction. Concurrent calls are coalesced into micro-batches of up to
+        `max_batch_size` texts or `max_latency_ms` of waiting, each call gets
+        its rows copied into arrays of its own.
+
+        Parameters
+        ----------
+        texts : Union[str, List]
+            a text, or a list of texts (of words for token classification).
+        manifest : Optional[Union[str, os.PathLike, Dict]]
+            extraction manifest, or its path, needed on the first call,
+            the following calls reuse it.
+        max_batch_size : int
+            amount of texts to stop waiting for more calls, set with a manifest.
+        max_latency_ms : float
+            milliseconds to wait for more calls, set with a manifest. With 0
+            only the calls already waiting are batched together.
+
+        Returns
+        -------
+        Dict[str, np.ndarray]
+            tokenized arrays, as `TokenizedTensor` inputs, a row per text.
+
+        Raises
+        ------
+        ValueError
+            if there is no manifest, or it is from another pretrained model,
+            or there are no texts.
+        """
+        batcher = self._load_inference_batcher(
+            manifest, max_batch_size, max_latency_ms
+        )
+        single = isinstance(texts, str) or (
+            self.token_classification and bool(texts) and isinstance(texts[0], str)
         )
 
+        return batcher.tokenize([texts] if single else texts)
+
+    def _load_inference_batcher(
+        self,
+        manifest: Optional[Union[str, os.PathLike, Dict]],
+        max_batch_size: int,
+        max_latency_ms: float,
+    ) -> MicroBatcher:
+        """Micro-batcher with the settings of the manifest, created on the first
+        call and when a new manifest is given."""
+        with self._inference_lock:
+            if manifest is None:
+                if self._inference_batcher is None:
+                    error_message = "tokenize_for_inference needs a manifest first"
+                    logger.error(error_message)
+                    raise ValueError(error_message)
+                return self._inference_batcher
+
+            manifest = read_manifest(manifest)
+            pretrained = manifest.get("pretrained_model_name_or_path")
+            if pretrained is not None and pretrained != str(
+                self.pretrained_model_name_or_path
+            ):
+                error_message = (
+                    f"Manifest of {pretrained}, the extractor uses "
+                    f"{self.pretrained_model_name_or_path}"
+                )
+                logger.error(error_message)
+                raise ValueError(error_message)
+
+            if self._inference_batcher is not None:
+                self._inference_batcher.close()
+            self._inference_batcher = MicroBatcher(
+                self.load_tokenizer(),
+                manifest["max_length"],
+                max_batch_size,
+                max_latency_ms,
+                is_split_into_words=manifest.get(
+                    "is_split_into_words", self.token_classification
+                ),
+            )
+            return self._inference_batcher
+
+    def _split_indexes(self, sentences: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows of the train and the validation splits.
+
+        Parameters
+        ----------
+        sentences : Any
+            sentences to split.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            - train indexes, shuffled with the random strategy, in order with hash.
+            - validation indexes.
+        """
+        if self.split_strategy == "hash":
+            validation = validation_mask(sentences, self.test_size, self.split_seed)
+            return np.flatnonzero(~validation), np.flatnonzero(validation)
+
+        return train_test_split(
+            np.arange(len(sentences)),
+            random_state=self.split_seed,
+            test_size=self.test_size,
+        )
+
+    def _external_bert_tokenizer(
+        self, rows: Iterable[Tuple[Any, Any]], tokenizer: PreTrainedTokenizerBase
+    ) -> TokenizedTensor:
+        """Shuffle and split the rows out of core, then tokenize each split
+        by chunks streamed from disk.
+
+        Parameters
+        ----------
+        rows : Iterable[Tuple[Any, Any]]
+            sentences and labels to tokenize, consumed once.
+        tokenizer : PreTrainedTokenizerBase
+            tokenizer to process the sentences.
+
+        Returns
+        -------
+        TokenizedTensor
+            tuple of numpy array.
+        """
+        with external_shuffle_split(
+            rows,
+            self.test_size,
+            self.split_seed,
+            self.split_memory_budget,
+        ) as split:
+            lengths = self._token_lengths(
+                (sentence for sentence, _ in chain(split.train(), split.validation())),
+                tokenizer,
+            )
+            max_length = self.get_max_length(lengths, tokenizer)
+            logger.info("Max sentences length %s", max_length)
+
+            spill_path = self._spill_path(
+                sum(split.num_rows.values()), max_length, tokenizer
+            )
+            train_tokenized, train_labels = self._tokenize_rows(
+                split.train(),
+                max_length,
+                tokenizer,
+                split.num_rows["train"],
+                spill_path and spill_path / "train",
+            )
+            val_tokenized, val_labels = self._tokenize_rows(
+                split.validation(),
+                max_length,
+                tokenizer,
+                split.num_rows["validation"],
+                spill_path and spill_path / "validation",
+            )
+
         return TokenizedTensor(
             train_inputs=train_tokenized,
             validation_inputs=val_tokenized,
@@ -181,14 +784,210 @@ class BaseBERTExtractor(ABC):
             validation_labels=val_labels,
         )
 
+    def _tokenize_rows(
+        self,
+        rows: Iterable[Tuple[Any, Any]],
+        max_length: int,
+        tokenizer: PreTrainedTokenizerBase,
+        num_rows: Optional[int] = None,
+        spill_path: Optional[Path] = None,
+    ) -> Tuple[BatchEncoding, np.array]:
+        """Tokenize (sentence, label) rows by chunks of `TOKENIZE_CHUNK_ROWS`.
+
+        Parameters
+        ----------
+        rows : Iterable[Tuple[Any, Any]]
+            sentences and labels to tokenize.
+        max_length : int
+            max length of the encoded sentences.
+        tokenizer : PreTrainedTokenizerBase
+            tokenizer created to process the sentences.
+        num_rows : Optional[int]
+            amount of rows, needed to preallocate the spilled outputs.
+        spill_path : Optional[Path]
+            directory to write the outputs as memory-mapped files, None to
+            concatenate them in memory.
+
+        Returns
+        -------
+        Tuple[BatchEncoding, np.array]
+            - tokenized: tokenized sentences to use with BERT model.
+            - labels : np.array processed labels
+        """
+        tokenized_chunks = []
+        labels_chunks = []
+        arrays: Dict[str, np.ndarray] = {}
+        processed_labels = np.zeros(0)
+        start = 0
+        for chunk in batched(rows, TOKENIZE_CHUNK_ROWS):
+            sentences, labels = zip(*chunk)
+            tokenized, labels = self._tokenize_split(
+                list(sentences), list(labels), max_length, tokenizer
+            )
+            if spill_path is None:
+                tokenized_chunks.append(tokenized)
+                labels_chunks.append(labels)
+                continue
+
+            # Only the chunk is in memory, it is copied to the mapped outputs.
+            if not arrays:
+                arrays, processed_labels = _allocate_outputs(
+                    num_rows, stored_arrays(tokenized), labels, spill_path
+                )
+            stop = start + len(labels)
+            for key, value in stored_arrays(tokenized).items():
+                arrays[key][start:stop] = value
+            processed_labels[start:stop] = labels
+            start = stop
+
+        if arrays:
+            return as_inputs(arrays), processed_labels
+        if not tokenized_chunks:
+            return self._empty_split(max_length, tokenizer)
+
+        chunks = [stored_arrays(chunk) for chunk in tokenized_chunks]
+        return (
+            as_inputs(
+                {
+                    key: np.concatenate([chunk[key] for chunk in chunks])
+                    for key in chunks[0]
+                }
+            ),
+            np.concatenate(labels_chunks),
+        )
+
+    def _empty_split(
+        self, max_length: int, tokenizer: PreTrainedTokenizerBase
+    ) -> Tuple[BatchEncoding, np.array]:
+        """Tokenized inputs and labels of a split without sentences."""
+        labels_shape = (0, max_length) if self.token_classification else (0,)
+        empty = np.zeros((0, max_length), dtype=np.int64)
+        labels = np.zeros(labels_shape, dtype=np.int64)
+        if self.compact_inputs:
+            arrays = {"input_ids": empty, COMPACT_LENGTHS_KEY: np.zeros(0, np.int32)}
+        else:
+            arrays = {key: empty for key in tokenizer.model_input_names}
+        return as_inputs(arrays), labels
+
+    def token_arrays(self, tokenizer: PreTrainedTokenizerBase) -> int:
+        """Amount of token level arrays of the tokenized outputs, all int64 as
+        returned by the tokenizer: the model inputs of the tokenizer (only the
+        input ids when compact), the word ids if kept and the labels of token
+        classification.
+
+        Parameters
+        ----------
+        tokenizer : PreTrainedTokenizerBase
+            tokenizer of the extraction.
+
+        Returns
+        -------
+        int
+            amount of arrays of a value per token.
+        """
+        arrays = 1 if self.compact_inputs else len(tokenizer.model_input_names)
+        arrays += int(self.keep_word_ids)
+        arrays += int(self.token_classification)
+        return arrays
+
+    def _token_lengths(
+        self, sentences: Iterable, tokenizer: PreTrainedTokenizerBase
+    ) -> Iterator[int]:
+        """Length of each encoded sentence, special tokens included.
+        Only the ids are computed, by batches of `tokenize_batch_size` sent to
+        the fast tokenizer from a bounded thread pool.
+
+        Parameters
+        ----------
+        sentences : Iterable
+            sentences to encode, strings or lists of words.
+        tokenizer : PreTrainedTokenizerBase
+            tokenizer to process the sentences.
+
+        Returns
+        -------
+        Iterator[int]
+            length of each sentence, in order.
+        """
+
+        def batch_lengths(batch: List) -> List[int]:
+            encoded = tokenizer(
+                batch,
+                add_special_tokens=True,
+                truncation=False,
+                return_attention_mask=False,
+                return_token_type_ids=False,
+                is_split_into_words=self.token_classification,
+            )
+            return [len(ids) for ids in encoded["input_ids"]]
+
+        with ThreadPoolExecutor(self.tokenize_workers) as executor:
+            for lengths in bounded_map(
+                executor,
+                batch_lengths,
+                batched(sentences, self.tokenize_batch_size),
+                2 * self.tokenize_workers,
+            ):
+                yield from lengths
+
+    def load_tokenizer(self) -> PreTrainedTokenizerBase:
+        """Load the fast tokenizer of the pretrained model, once per extractor,
+        so long running processes keep it resident.
+
+        Returns
+        -------
+        PreTrainedTokenizerBase
+            tokenizer to process the sentences.
+        """
+        if self._tokenizer is not None:
+            return self._tokenizer
+
+        logger.info("Pretrained model name: %s", self.pretrained_model_name_or_path)
+        if self.tokenizers_parallelism is not None:
+            os.environ["TOKENIZERS_PARALLELISM"] = str(
+                self.tokenizers_parallelism
+            ).lower()
+        self._tokenizer = AutoTokenizer.from_pretrained(
+            self.pretrained_model_name_or_path, do_lower_case=True, use_fast=True,
+        )
+        return self._tokenizer
+
+    def get_max_length(
+        self, lengths: Iterable[int], tokenizer: PreTrainedTokenizerBase
+    ) -> int:
+        """Max length to pad the sentences to, given their tokenized lengths.
+        Capped to the model max length and rounded to a multiple of 8.
+
+        Parameters
+        ----------
+        lengths : Iterable[int]
+            tokenized length of each sentence.
+        tokenizer : PreTrainedTokenizerBase
+            tokenizer used to get the lengths.
+
+        Returns
+        -------
+        int
+            max length of the encoded sentences.
+        """
+        if self.token_classification:
+            model_max_length = 512
+        else:
+            model_max_length = tokenizer.model_max_length
+
+        return self._round_nearst_pow(min(max(lengths), model_max_length))
+
     def _tokenize_split(
         self,
         sentences: List[str],
         labels: List,
         max_length: int,
         tokenizer: PreTrainedTokenizerBase,
+        spill_path: Optional[Path] = None,
     ) -> Tuple[BatchEncoding, List]:
         """Helper function to tokenize and align and pad sentences and labels.
+        Sentences go by batches of `tokenize_batch_size` to the fast tokenizer,
+        from a bounded pool of `tokenize_workers` threads.
 
         Parameters
         ----------
@@ -200,15 +999,83 @@ class BaseBERTExtractor(ABC):
             max length of the encoded sentences.
         tokenizer : PreTrainedTokenizerBase
             tokenizer created to process the sentences.
+        spill_path : Optional[Path]
+            directory to write the outputs as memory-mapped files, None to
+            keep them in memory.
 
         Returns
         -------
         Tuple[BatchEncoding, List]
-            - tokenized: tokenized sentences to use with BERT model.
+            - tokenized: tokenized sentences to use with BERT model, a
+              CompactEncoding with `compact_inputs`.
             - labels : np.array processed labels
 
         """
-        tokenized = tokenizer(
+        if len(sentences) == 0:
+            return self._empty_split(max_length, tokenizer)
+
+        def encode(start: int) -> BatchEncoding:
+            return self._encode(
+                sentences[start : start + self.tokenize_batch_size],
+                max_length,
+                tokenizer,
+            )
+
+        # The pool tokenizes the next batches while the labels of the current
+        # one are aligned and its arrays copied into the preallocated output.
+        starts = range(0, len(sentences), self.tokenize_batch_size)
+        arrays: Dict[str, np.ndarray] = {}
+        processed_labels = np.zeros(0)
+        with ThreadPoolExecutor(self.tokenize_workers) as executor:
+            for start, tokenized in zip(
+                starts,
+                bounded_map(executor, encode, starts, 2 * self.tokenize_workers),
+            ):
+                stop = start + len(tokenized["input_ids"])
+                batch_labels = self.process_labels(labels[start:stop], tokenized)
+                # Once labels are aligned the tokenizer encodings are not needed,
+                # keep only the arrays.
+                batch = dict(tokenized)
+                if self.keep_word_ids:
+                    batch["word_ids"] = self._word_ids_matrix(tokenized)
+                else:
+                    batch.pop("word_ids", None)
+                if self.compact_inputs:
+                    batch = compact_batch(batch)
+
+                if not arrays:
+                    arrays, processed_labels = _allocate_outputs(
+                        len(sentences), batch, batch_labels, spill_path
+                    )
+                for key, value in batch.items():
+                    arrays[key][start:stop] = value
+                processed_labels[start:stop] = batch_labels
+
+        return as_inputs(arrays), processed_labels
+
+    def _encode(
+        self, sentences: Any, max_length: int, tokenizer: PreTrainedTokenizerBase
+    ) -> BatchEncoding:
+        """Encode a batch of sentences, padded and truncated to max_length.
+
+        Parameters
+        ----------
+        sentences : Any
+            batch of sentences, a list or a RaggedArray of words.
+        max_length : int
+            max length of the encoded sentences.
+        tokenizer : PreTrainedTokenizerBase
+            tokenizer created to process the sentences.
+
+        Returns
+        -------
+        BatchEncoding
+            numpy model inputs, with the tokenizer encodings.
+        """
+        if not isinstance(sentences, (list, tuple)):
+            # e.g. a RaggedArray of words, the tokenizer needs lists.
+            sentences = list(sentences)
+        return tokenizer(
             sentences,
             add_special_tokens=True,
             max_length=max_length,
@@ -219,9 +1086,72 @@ class BaseBERTExtractor(ABC):
             return_tensors="np",
         )
 
-        labels = self.process_labels(labels, tokenized)
+    def _spill_path(
+        self, rows: int, max_length: int, tokenizer: PreTrainedTokenizerBase
+    ) -> Optional[Path]:
+        """New directory for the memory-mapped outputs of the extraction, if their
+        projected size is over `tokenize_memory_budget`.
+
+        Parameters
+        ----------
+        rows : int
+            amount of sentences of both splits.
+        max_length : int
+            max length of the encoded sentences.
+        tokenizer : PreTrainedTokenizerBase
+            tokenizer created to process the sentences.
+
+        Returns
+        -------
+        Optional[Path]
+            directory of the outputs, None to keep them in memory.
+        """
+        if self.tokenize_memory_budget is None:
+            return None
+
+        arrays = self.token_arrays(tokenizer)
+        projected_bytes = rows * max_length * np.dtype(np.int64).itemsize * arrays
+        if projected_bytes <= self.tokenize_memory_budget:
+            return None
+
+        spill_root = Path(self.cache_path) / SPILL_DIR
+        spill_root.mkdir(parents=True, exist_ok=True)
+        spill_path = Path(tempfile.mkdtemp(dir=spill_root))
+        logger.warning(
+            "Tokenized outputs of %s bytes over the memory budget of %s bytes, "
+            "writing them to %s",
+            projected_bytes,
+            self.tokenize_memory_budget,
+            spill_path,
+        )
+        return spill_path
+
+    def _word_ids_matrix(self, tokenized: BatchEncoding) -> np.ndarray:
+        """Word index of each token, `SPECIAL_TOKEN_WORD_ID` for special tokens.
 
-        return tokenized, labels
+        Parameters
+        ----------
+        tokenized : BatchEncoding
+            tokenized sentences with its encodings, or with the `word_ids`
+            matrix already assembled, see `bert_extractor.word_index`.
+
+        Returns
+        -------
+        np.ndarray
+            words ids matrix, with the shape of the input_ids.
+        """
+        if "word_ids" in tokenized:
+            return tokenized["word_ids"]
+        return np.array(
+            [
+                [
+                    SPECIAL_TOKEN_WORD_ID if idx is None else idx
+                    for idx in tokenized.word_ids(batch_index=index)
+                ]
+                for index in range(len(tokenized["input_ids"]))
+            ],
+            dtype=np.int64,
+        ).reshape(tokenized["input_ids"].shape)
 
     def _round_nearst_pow(self, number: int) -> int:
         """Round max length to a higher power of 8 to power up NVIDIA GPUs.
@@ -0,0 +1,278 @@
+"""Local files Data Extractor"""
+import csv
+import json
+import logging
+import mmap
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from bert_extractor.constants import (
+    LOCAL_FILE_FORMATS,
+    SPLIT_MEMORY_BUDGET,
+    SPLIT_SEED,
+    TOKENIZE_BATCH_SIZE,
+)
+from bert_extractor.extractors.base import BaseBERTExtractor
+
+logger = logging.getLogger(__name__)
+
+
+def _mapped_lines(filepath: Union[str, os.PathLike]) -> Iterator[bytes]:
+    """Yield the lines of a file through a read only memory map,
+    so the OS pages the file in instead of copying it into buffers."""
+    with open(filepath, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield from iter(mapped.readline, b"")
+
+
+class LocalFileExtractor(BaseBERTExtractor):
+    def __init__(
+        self,
+        pretrained_model_name_or_path: Union[str, os.PathLike],
+        sentence_col: str,
+        labels_col: str,
+        auth_username: Optional[str] = None,
+        auth_key: Optional[str] = None,
+        split_test_size: float = 0.1,
+        cache_path: Union[str, os.PathLike] = "/tmp/bert_extractor",
+        read_cache: bool = False,
+        split_strategy: str = "random",
+        split_seed: int = SPLIT_SEED,
+        split_memory_budget: int = SPLIT_MEMORY_BUDGET,
+        keep_word_ids: bool = False,
+        tokenize_batch_size: int = TOKENIZE_BATCH_SIZE,
+        tokenize_workers: Optional[int] = None,
+        tokenizers_parallelism: Optional[bool] = None,
+        pipeline_queue_size: Optional[int] = None,
+        tokenize_memory_budget: Optional[int] = None,
+        compact_inputs: bool = False,
+        file_format: Optional[str] = None,
+        delimiter: str = ",",
+    ):
+        """Local files Extractor.
+        Extract a text column and a label column of a CSV, JSONL or Parquet
+        file for a Text Classification problem, the url is the file path.
+
+        Parameters
+        ----------
+        pretrained_model_name_or_path : Union[str, os.PathLike]
+            pretained BERT name to tokenize the the input.
+        sentence_col : str
+            name of the column of from where it will be the text.
+        labels_col : str
+            name of the column of from where it will be the label.
+        auth_username : Optional, str
+            not used, local files have no authentication.
+        auth_key: Optional, str
+            not used, local files have no authentication.
+        split_test_size : float
+            amount of dataset to use for test, between [0,1].
+        cache_path : Union[str, os.PathLike]
+            path to store cached preprocessed data.
+        read_cache : bool
+            True to read from cache_path
+        split_strategy : str
+            how to split train and validation, one of `SPLIT_STRATEGIES`.
+        split_seed : int
+            random seed of the split.
+        split_memory_budget : int
+            bytes of rows to keep in memory with the external split.
+        keep_word_ids : bool
+            True to keep the word index of each token as a `word_ids` input.
+        tokenize_batch_size : int
+            amount of sentences of each fast tokenizer call.
+        tokenize_workers : Optional[int]
+            threads sending batches to the fast tokenizer.
+        tokenizers_parallelism : Optional[bool]
+            value of `TOKENIZERS_PARALLELISM`, as in the environment if None.
+        pipeline_queue_size : Optional[int]
+            items between the stages of the pipelined extraction, if streamed.
+        tokenize_memory_budget : Optional[int]
+            bytes of tokenized outputs to keep in memory, memory-mapped if over.
+        compact_inputs : bool
+            True to keep only the `input_ids` and the rows lengths, see
+            `bert_extractor.compact.CompactEncoding`.
+        file_format : Optional[str]
+            one of `LOCAL_FILE_FORMATS` values, from the file suffix if None.
+        delimiter : str
+            delimiter of the CSV files.
+
+        Raises
+        ------
+        ValueError
+            if the file format is unknown.
+        """
+        if file_format is not None and file_format not in LOCAL_FILE_FORMATS.values():
+            error_message = (
+                f"Unknown file format, knows {list(LOCAL_FILE_FORMATS.values())}"
+            )
+            logger.error(error_message)
+            raise ValueError(error_message)
+
+        super().__init__(
+            pretrained_model_name_or_path,
+            sentence_col,
+            labels_col,
+            auth_username,
+            auth_key,
+            split_test_size,
+            cache_path,
+            read_cache,
+            split_strategy,
+            split_seed,
+            split_memory_budget,
+            keep_word_ids,
+            tokenize_batch_size,
+            tokenize_workers,
+            tokenizers_parallelism,
+            pipeline_queue_size,
+            tokenize_memory_budget,
+            compact_inputs,
+        )
+        self.file_format = file_format
+        self.delimiter = delimiter
+
+    def _file_format(self, filepath: Path) -> str:
+        """Configured file format or the one of the file suffix."""
+        if self.file_format is not None:
+            return self.file_format
+
+        if filepath.suffix not in LOCAL_FILE_FORMATS:
+            error_message = (
+                f"Unknown file suffix {filepath.suffix}, "
+                f"knows {list(LOCAL_FILE_FORMATS)}"
+            )
+            logger.error(error_message)
+            raise ValueError(error_message)
+
+        return LOCAL_FILE_FORMATS[filepath.suffix]
+
+    def extract_raw(self, url: str) -> Dict[str, List]:
+        """Read the sentence and label columns of a local file.
+
+        Parameters
+        ----------
+        url : str
+            path of the CSV, JSONL or Parquet file.
+
+        Returns
+        -------
+        Dict[str, List]
+            values of the sentence and the label columns.
+        """
+        filepath = Path(url)
+        file_format = self._file_format(filepath)
+        logger.info("Going to read %s file %s", file_format, filepath)
+
+        if file_format == "csv":
+            extracted = self._read_csv(filepath)
+        elif file_format == "jsonl":
+            extracted = self._read_jsonl(filepath)
+        else:
+            extracted = self._read_parquet(filepath)
+
+        logger.info("Extraction successfull, %s rows", len(extracted[self.labels_col]))
+        return extracted
+
+    def _read_csv(self, filepath: Path) -> Dict[str, List]:
+        """Read the columns of a CSV file with header."""
+        lines = (line.decode("utf-8") for line in _mapped_lines(filepath))
+        reader = csv.reader(lines, delimiter=self.delimiter)
+        header = next(reader, [])
+
+        columns = [self.sentence_col, self.labels_col]
+        missing = [column for column in columns if column not in header]
+        if missing:
+            error_message = f"Columns {missing} not in {filepath}"
+            logger.error(error_message)
+            raise ValueError(error_message)
+
+        sentence_index = header.index(self.sentence_col)
+        labels_index = header.index(self.labels_col)
+        extracted: Dict[str, List] = {column: [] for column in columns}
+        for row in reader:
+            if not row:
+                continue
+            extracted[self.sentence_col].append(row[sentence_index])
+            extracted[self.labels_col].append(row[labels_index])
+
+        return extracted
+
+    def _read_jsonl(self, filepath: Path) -> Dict[str, List]:
+        """Read the columns of a JSON lines file."""
+        extracted: Dict[str, List] = {self.sentence_col: [], self.labels_col: []}
+        for line in _mapped_lines(filepath):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            extracted[self.sentence_col].append(row[self.sentence_col])
+            extracted[self.labels_col].append(row[self.labels_col])
+
+        return extracted
+
+    def _read_parquet(self, filepath: Path) -> Dict[str, List]:
+        """Read the columns of a Parquet file, memory mapped by pyarrow."""
+        try:
+            import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+        except ImportError as error:  # pragma: no cover
+            raise ImportError(
+                "Parquet files require `pip install pyarrow` or the arrow extra"
+            ) from error
+
+        table = pq.read_table(
+            filepath, columns=[self.sentence_col, self.labels_col], memory_map=True
+        )
+        return {
+            column: table.column(column).to_pylist()
+            for column in [self.sentence_col, self.labels_col]
+        }
+
+    def preprocess(self, extracted_raw: Dict[str, List]) -> Tuple[List, List]:
+        """Create two lists with the sentences and integer labels, integral
+        labels are kept and other labels, text or fractional numbers, are
+        mapped to the index of the sorted classes, before the split so both
+        splits share the same classes.
+
+        Parameters
+        ----------
+        extracted_raw : Dict[str, List]
+            extracted raw columns.
+
+        Returns
+        -------
+        Tuple[List, List]
+            - list of raw sentences.
+            - list of int labels.
+
+        Raises
+        ------
+        ValueError
+            if a label is missing.
+        """
+        sentences = [str(sentence) for sentence in extracted_raw[self.sentence_col]]
+        labels = np.asarray(extracted_raw[self.labels_col])
+
+        if labels.dtype.kind not in "iu":
+            try:
+                numbers = labels.astype(np.float64)
+            except (TypeError, ValueError):
+                numbers = None
+
+            if numbers is not None and np.isnan(numbers).any():
+                error_message = f"Missing labels in the {self.labels_col} column"
+                logger.error(error_message)
+                raise ValueError(error_message)
+            if numbers is not None and np.all(numbers == np.round(numbers)):
+                labels = numbers
+            else:
+                _, labels = np.unique(
+                    labels if numbers is None else numbers, return_inverse=True
+                )
+
+        logger.info("Preproccessed %s rows", len(sentences))
+        return sentences, labels.astype(np.int64).tolist()
@@ -1,20 +1,63 @@
 """NER Data Extractor"""
+from array import array
+from hashlib import sha256
+import io
+from itertools import chain
+import json
 import logging
 import os
-import shutil
-from typing import Dict, List, Optional, Tuple, Union
+from pathlib import Path, PurePosixPath
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import zipfile
 
 from kaggle.api.kaggle_api_extended import KaggleApi
 import numpy as np
-from transformers.tokenization_utils_base import BatchEncoding
-
-from bert_extractor.constants import NER_LABLES_MAP, SPECIAL_TOKEN_LABEL
-from bert_extractor.extractors.base import BaseBERTExtractor
+from transformers.tokenization_utils_base import BatchEncoding, PreTrainedTokenizerBase
+
+from bert_extractor.cache_store import (
+    atomic_write,
+    file_sha256,
+    record_entry,
+    record_hit,
+)
+from bert_extractor.constants import (
+    KAGGLE_ARCHIVES_DIR,
+    NER_LABEL_STRATEGIES,
+    NER_LABLES_MAP,
+    NER_UNKNOWN_LABEL,
+    SPECIAL_TOKEN_LABEL,
+    SPECIAL_TOKEN_WORD_ID,
+    SPLIT_MEMORY_BUDGET,
+    SPLIT_SEED,
+    TOKENIZE_BATCH_SIZE,
+    TOKENIZE_CHUNK_ROWS,
+    TOKENIZE_ENGINES,
+    WORD_INDEX_DIR,
+)
+from bert_extractor.extractors.base import BaseBERTExtractor, TokenizedTensor
+from bert_extractor.parallel import batched
+from bert_extractor.ragged import RaggedArray, StringBuffer
 from bert_extractor.utils import cache_extract_raw
+from bert_extractor.word_index import WordIndex, tokenizer_key
 
 logger = logging.getLogger(__name__)
 
 
+def _b_to_i_map() -> np.ndarray:
+    """Lookup of the label of each label id for a continuation sub-token,
+    the I- label for B- labels, the same label for the others."""
+    lookup = np.arange(max(NER_LABLES_MAP.values()) + 1)
+    for name, label in NER_LABLES_MAP.items():
+        inside = "I-" + name[2:]
+        if name.startswith("B-") and inside in NER_LABLES_MAP:
+            lookup[label] = NER_LABLES_MAP[inside]
+    return lookup
+
+
+_B_TO_I = _b_to_i_map()
+
+
 class NERExtractor(BaseBERTExtractor):
     def __init__(
         self,
@@ -26,6 +69,18 @@ class NERExtractor(BaseBERTExtractor):
         split_test_size: float = 0.1,
         cache_path: Union[str, os.PathLike] = "/tmp/bert_extractor",
         read_cache: bool = False,
+        split_strategy: str = "random",
+        split_seed: int = SPLIT_SEED,
+        split_memory_budget: int = SPLIT_MEMORY_BUDGET,
+        keep_word_ids: bool = False,
+        tokenize_batch_size: int = TOKENIZE_BATCH_SIZE,
+        tokenize_workers: Optional[int] = None,
+        tokenizers_parallelism: Optional[bool] = None,
+        pipeline_queue_size: Optional[int] = None,
+        tokenize_memory_budget: Optional[int] = None,
+        compact_inputs: bool = False,
+        label_strategy: str = "all",
+        tokenize_engine: str = "tokenizer",
     ):
         """Name Entity Recognition Extractor.
         Extract and preprocess the data for a Token Classification problem,
@@ -49,7 +104,52 @@ class NERExtractor(BaseBERTExtractor):
             path to store cached raw data.
         read_cache : bool
             True to read from cache_path
+        split_strategy : str
+            how to split train and validation, one of `SPLIT_STRATEGIES`.
+        split_seed : int
+            random seed of the split.
+        split_memory_budget : int
+            bytes of rows to keep in memory with the external split.
+        keep_word_ids : bool
+            True to keep the word index of each token as a `word_ids` input.
+        tokenize_batch_size : int
+            amount of sentences of each fast tokenizer call.
+        tokenize_workers : Optional[int]
+            threads sending batches to the fast tokenizer.
+        tokenizers_parallelism : Optional[bool]
+            value of `TOKENIZERS_PARALLELISM`, as in the environment if None.
+        pipeline_queue_size : Optional[int]
+            items between the stages of the pipelined extraction, if streamed.
+        tokenize_memory_budget : Optional[int]
+            bytes of tokenized outputs to keep in memory, memory-mapped if over.
+        compact_inputs : bool
+            True to keep only the `input_ids` and the rows lengths, see
+            `bert_extractor.compact.CompactEncoding`.
+        label_strategy : str
+            label of the sub-tokens after the first one of each word, one of
+            `NER_LABEL_STRATEGIES`: the word label (all), `SPECIAL_TOKEN_LABEL`
+            (first) or the I- label of B- labels (b_to_i).
+        tokenize_engine : str
+            how to encode the sentences, one of `TOKENIZE_ENGINES`:
+            - tokenizer: every sentence with the fast tokenizer.
+            - word_index: each distinct word once, then the sentences are
+              assembled from an index of the word-piece ids of each word, cached
+              in `cache_path` by tokenizer, see `bert_extractor.word_index`.
+
+        Raises
+        ------
+        ValueError
+            if the label strategy or the tokenize engine is unknown.
         """
+        if label_strategy not in NER_LABEL_STRATEGIES:
+            error_message = f"Unknown label strategy, knows {NER_LABEL_STRATEGIES}"
+            logger.error(error_message)
+            raise ValueError(error_message)
+        if tokenize_engine not in TOKENIZE_ENGINES:
+            error_message = f"Unknown tokenize engine, knows {TOKENIZE_ENGINES}"
+            logger.error(error_message)
+            raise ValueError(error_message)
+
         super().__init__(
             pretrained_model_name_or_path,
             sentence_col,
@@ -59,9 +159,24 @@ class NERExtractor(BaseBERTExtractor):
             split_test_size=split_test_size,
             cache_path=cache_path,
             read_cache=read_cache,
+            split_strategy=split_strategy,
+            split_seed=split_seed,
+            split_memory_budget=split_memory_budget,
+            keep_word_ids=keep_word_ids,
+            tokenize_batch_size=tokenize_batch_size,
+            tokenize_workers=tokenize_workers,
+            tokenizers_parallelism=tokenizers_parallelism,
+            pipeline_queue_size=pipeline_queue_size,
+            tokenize_memory_budget=tokenize_memory_budget,
+            compact_inputs=compact_inputs,
         )
         self.api: KaggleApi = None
         self.token_classification = True
+        self.label_strategy = label_strategy
+        self.tokenize_engine = tokenize_engine
+        self._word_index: Optional[WordIndex] = None
+        self._word_index_path: Optional[Path] = None
+        self._indexed_words = 0
 
     def authenticate(self):
         """Authenticate to Kaggle API.
@@ -77,10 +192,8 @@ class NERExtractor(BaseBERTExtractor):
 
     @cache_extract_raw()
     def extract_raw(self, url: str) -> Dict:
-        """Download the CoNLL 2003 files from Kaggle, into a temporary directory.
-        Read them and delete the directory with it content.
-
-        Note:
+        """Get the CoNLL 2003 archive from Kaggle, or from the archives cache,
+        and read its files straight from the zip.
 
         Parameters
         ----------
@@ -90,29 +203,121 @@ class NERExtractor(BaseBERTExtractor):
         Returns
         -------
         Dict
-            sentences_col : List [sentences]
-            labels_col : List [sentences]
+            sentences_col : StringBuffer all the words.
+            labels_col : np.ndarray mapped label of each word.
+
+        Raises
+        ------
+        ValueError
+            if the archive doesn't contain a CoNLL file.
         """
         logger.info("Going to get data from %s", url)
-        download_file = f"/tmp/{url}"
-        self.api.dataset_download_files(
-            url, path=download_file, unzip=True,
-        )
+        archive_path = self._get_archive(url)
+
         dataset_types = ["train", "valid", "test"]
-        words_all = []
-        labels_all = []
-        for d_types in dataset_types:
-            file_path = f"{download_file}/{d_types}.txt"
-            words, labels = self._read_conll_file(file_path=file_path)
-            words_all.extend(words)
-            labels_all.extend(labels)
-
-        shutil.rmtree(download_file)
-        extracted = {self.sentence_col: words_all, self.labels_col: labels_all}
+        words_all: List[StringBuffer] = []
+        labels_all: List[np.ndarray] = []
+        with zipfile.ZipFile(archive_path) as archive:
+            members = {PurePosixPath(name).name: name for name in archive.namelist()}
+            for d_types in dataset_types:
+                member = members.get(f"{d_types}.txt")
+                if member is None:
+                    error = f"File {d_types}.txt don't exists in {url}."
+                    logger.error(error)
+                    raise ValueError(error)
+                with archive.open(member) as file:
+                    words, labels = self._read_conll_lines(
+                        io.TextIOWrapper(file, encoding="utf-8")
+                    )
+                words_all.append(words)
+                labels_all.append(labels)
+
+        extracted = {
+            self.sentence_col: StringBuffer.concatenate(words_all),
+            self.labels_col: np.concatenate(labels_all),
+        }
         logger.info("Extraction successfull")
         return extracted
 
-    def _read_conll_file(self, file_path: Union[os.PathLike, str]) -> Tuple[List, List]:
+    def _get_archive(self, url: str) -> Path:
+        """Path of the dataset zip archive, in a content addressed store under
+        `cache_path/kaggle`, named by its sha256.
+        The archive is downloaded again only if the dataset metadata changed
+        or its checksum doesn't match.
+
+        Parameters
+        ----------
+        url : str
+            Kaggle dataset name.
+
+        Returns
+        -------
+        Path
+            path of the verified archive.
+        """
+        archives_path = Path(self.cache_path) / KAGGLE_ARCHIVES_DIR
+        manifest_path = archives_path / f"{sha256(url.encode()).hexdigest()}.json"
+        fingerprint = self._dataset_fingerprint(url)
+
+        if manifest_path.exists():
+            with open(manifest_path, "r") as file:
+                manifest = json.load(file)
+            archive_path = archives_path / f"{manifest['sha256']}.zip"
+            if manifest["metadata"] != fingerprint:
+                logger.info("Cached archive of %s is stale.", url)
+            elif (
+                not archive_path.exists()
+                or file_sha256(archive_path) != manifest["sha256"]
+            ):
+                logger.warning("Cached archive of %s is corrupted.", url)
+            else:
+                logger.info("Using cached archive: %s.", archive_path)
+                record_hit(archive_path, url, type(self).__name__)
+                return archive_path
+
+        Path.mkdir(archives_path, exist_ok=True, parents=True)
+        with tempfile.TemporaryDirectory(dir=archives_path) as download_path:
+            self.api.dataset_download_files(url, path=download_path, unzip=False)
+            downloaded = next(Path(download_path).glob("*.zip"))
+            checksum = file_sha256(downloaded)
+            archive_path = archives_path / f"{checksum}.zip"
+            os.replace(downloaded, archive_path)
+        record_entry(archive_path, url, type(self).__name__)
+
+        with atomic_write(manifest_path) as file:
+            manifest = {"url": url, "sha256": checksum, "metadata": fingerprint}
+            file.write(json.dumps(manifest).encode())
+        logger.info("Cached archive to: %s.", archive_path)
+
+        return archive_path
+
+    def _dataset_fingerprint(self, url: str) -> str:
+        """Hash of the dataset files metadata, it changes with a new version.
+
+        Parameters
+        ----------
+        url : str
+            Kaggle dataset name.
+
+        Returns
+        -------
+        str
+            hashed files names, sizes and creation dates.
+        """
+        files = self.api.dataset_list_files(url).files
+        metadata = sorted(
+            [
+                str(getattr(file, "name", "")),
+                str(getattr(file, "totalBytes", getattr(file, "size", ""))),
+                str(getattr(file, "creationDate", "")),
+            ]
+            for file in files
+        )
+        return sha256(json.dumps(metadata).encode()).hexdigest()
+
+    def _read_conll_file(
+        self, file_path: Union[os.PathLike, str]
+    ) -> Tuple[StringBuffer, np.ndarray]:
         """Read given file path, supouse to be a CoNLL 2003 file.
 
         Parameters
@@ -122,50 +327,77 @@ class NERExtractor(BaseBERTExtractor):
 
         Returns
         -------
-        Tuple[List, List]
+        Tuple[StringBuffer, np.ndarray]
             - words : read words form file.
-            - labels : read labels form file.
+            - labels : read labels form file, mapped to integers.
 
         Raises
         ------
         ValueError
             if file_path doesn't contain a file.
         """
-        words = []
-        labels = []
-
         if not os.path.isfile(file_path):
             error = f"File {file_path} don't exists."
             logger.error(error)
             raise ValueError(error)
 
         with open(file_path) as file:
-            for line in file:
-                line = line.rstrip()
-                items = line.split(" ")
-                words.append(items[0])
-                labels.append(items[-1])
+            return self._read_conll_lines(file)
+
+    def _read_conll_lines(
+        self, lines: Iterable[str]
+    ) -> Tuple[StringBuffer, np.ndarray]:
+        """Read the lines of a CoNLL 2003 file into a flat utf-8 words buffer
+        and a flat int8 labels array, mapped with `NER_LABLES_MAP`.
+        Empty lines, the sentences separators, are kept as empty words.
+
+        Parameters
+        ----------
+        lines : Iterable[str]
+            lines of the file.
+
+        Returns
+        -------
+        Tuple[StringBuffer, np.ndarray]
+            - words : read words form file.
+            - labels : read labels form file, mapped to integers.
+        """
+        data = bytearray()
+        lengths = array("q")
+        labels = array("b")
 
-        return words, labels
+        for line in lines:
+            line = line.rstrip()
+            items = line.split(" ")
+            word = items[0].strip().encode()
+            data += word
+            lengths.append(len(word))
+            labels.append(NER_LABLES_MAP.get(items[-1], NER_UNKNOWN_LABEL))
 
-    def preprocess(self, extracted_raw: Dict) -> Tuple[List, List]:
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(np.frombuffer(lengths, dtype=np.int64), out=offsets[1:])
+        words = StringBuffer(np.frombuffer(bytes(data), dtype=np.uint8), offsets)
+
+        return words, np.frombuffer(labels, dtype=np.int8).copy()
+
+    def preprocess(self, extracted_raw: Dict) -> Tuple[RaggedArray, RaggedArray]:
         """Create the columns with the sentences and its labels.
-        Concatenate all the sentences and the labels into one line.
-        Use separator as a character that don't appers on the files.
+        Group the words and the labels of each sentence, sentences end on an
+        empty word.
         Map labels to integers set in constants.
         Remove -DOCSTART- words.
 
         Parameters
         ----------
         extracted_raw : Dict
-            self.sentence_col : extracted raw words list.
-            self.labels_col: extracted raw labels list.
+            self.sentence_col : extracted raw words, StringBuffer or list.
+            self.labels_col: extracted raw labels, mapped array or list.
 
         Returns
         -------
-        Tuple[List, List]
-            - sentences: list of list of sentences.
-            - labels: list of list of mapped labels.
+        Tuple[RaggedArray, RaggedArray]
+            - sentences: words of each sentence.
+            - labels: mapped labels of each sentence.
 
         Raises
         ------
@@ -180,65 +412,203 @@ class NERExtractor(BaseBERTExtractor):
             logger.error(error)
             raise ValueError(error)
 
-        sentences = []
-        sentence = []
-        label_list = []
-        labels = []
-        for word, label in zip(words_raw, labels_raw):
-            if word:
-                if word != "-DOCSTART-":
-                    word = word.strip()
-                    sentence.append(word)
-                    label_list.append(NER_LABLES_MAP.get(label))
-            else:
-                if sentence:
-                    sentences.append(sentence)
-                    labels.append(label_list)
-                sentence = []
-                label_list = []
+        # Raw data cached as lists, before the words buffer.
+        if not isinstance(words_raw, StringBuffer):
+            words_raw = StringBuffer.from_strings(word.strip() for word in words_raw)
+            labels_raw = np.array(
+                [NER_LABLES_MAP.get(label, NER_UNKNOWN_LABEL) for label in labels_raw],
+                dtype=np.int8,
+            )
+
+        separators = words_raw.lengths == 0
+        sentence_ids = np.cumsum(separators)
+        # Words of a sentence without an ending separator are dropped.
+        keep = (
+            ~separators
+            & ~words_raw.equals("-DOCSTART-")
+            & (sentence_ids < separators.sum())
+        )
+        positions = np.flatnonzero(keep)
+        _, lengths = np.unique(sentence_ids[positions], return_counts=True)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
 
         logger.info("Preproccessed dataframe")
 
-        return sentences, labels
+        return (
+            RaggedArray(words_raw.take(positions), offsets),
+            RaggedArray(np.asarray(labels_raw)[positions], offsets),
+        )
+
+    def bert_tokenizer(
+        self, sentences: RaggedArray, labels: RaggedArray
+    ) -> TokenizedTensor:
+        """Tokenize and align the labels, see `BaseBERTExtractor.bert_tokenizer`.
+        With the word_index engine, the index is cached if new words grew it.
+
+        Parameters
+        ----------
+        sentences : RaggedArray
+            words of each sentence.
+        labels : RaggedArray
+            labels of each word.
+
+        Returns
+        -------
+            TokenizedTensor tuple of numpy array.
+        """
+        tensor = super().bert_tokenizer(sentences, labels)
+        self._save_word_index()
+        return tensor
+
+    def _external_bert_tokenizer(
+        self, rows: Iterable[Tuple[Any, Any]], tokenizer: PreTrainedTokenizerBase
+    ) -> TokenizedTensor:
+        """See `BaseBERTExtractor._external_bert_tokenizer`, the word index is
+        cached if new words grew it."""
+        tensor = super()._external_bert_tokenizer(rows, tokenizer)
+        self._save_word_index()
+        return tensor
+
+    def _save_word_index(self):
+        """Cache the word index of the word_index engine, if it grew."""
+        index = self._word_index
+        if index is not None and len(index) > self._indexed_words:
+            index.save(self._word_index_path, type(self).__name__)
+            self._indexed_words = len(index)
+
+    def _load_word_index(self, tokenizer: PreTrainedTokenizerBase) -> WordIndex:
+        """Word-piece index of the tokenizer, read from the cache on first use.
+
+        Parameters
+        ----------
+        tokenizer : PreTrainedTokenizerBase
+            tokenizer to process the sentences.
+
+        Returns
+        -------
+        WordIndex
+            the index, empty if not cached.
+        """
+        if self._word_index is not None:
+            return self._word_index
+
+        self._word_index_path = (
+            Path(self.cache_path) / WORD_INDEX_DIR / f"{tokenizer_key(tokenizer)}.npz"
+        )
+        index = None
+        if self._word_index_path.exists():
+            try:
+                index = WordIndex.load(
+                    self._word_index_path, tokenizer, type(self).__name__
+                )
+            except (OSError, KeyError, ValueError) as error:
+                logger.warning("Rebuilding unreadable word index: %r", error)
+        self._word_index = index or WordIndex(tokenizer)
+        self._indexed_words = len(self._word_index)
+        return self._word_index
+
+    def _token_lengths(
+        self, sentences: Iterable, tokenizer: PreTrainedTokenizerBase
+    ) -> Iterator[int]:
+        """Length of each encoded sentence, special tokens included, from the
+        word index with the word_index engine.
+
+        Parameters
+        ----------
+        sentences : Iterable
+            words of each sentence, a RaggedArray or lists of words.
+        tokenizer : PreTrainedTokenizerBase
+            tokenizer to process the sentences.
+
+        Returns
+        -------
+        Iterator[int]
+            length of each sentence, in order.
+        """
+        if self.tokenize_engine == "tokenizer":
+            return super()._token_lengths(sentences, tokenizer)
+
+        index = self._load_word_index(tokenizer)
+        if isinstance(sentences, RaggedArray):
+            return iter(index.lengths(sentences).tolist())
+        return chain.from_iterable(
+            index.lengths(batch).tolist()
+            for batch in batched(sentences, TOKENIZE_CHUNK_ROWS)
+        )
+
+    def _encode(
+        self, sentences: Any, max_length: int, tokenizer: PreTrainedTokenizerBase
+    ) -> BatchEncoding:
+        """Encode a batch of sentences with the tokenizer, or assemble it from the
+        word index with the word_index engine, `word_ids` included.
+
+        Parameters
+        ----------
+        sentences : Any
+            batch of sentences, a list or a RaggedArray of words.
+        max_length : int
+            max length of the encoded sentences.
+        tokenizer : PreTrainedTokenizerBase
+            tokenizer to process the sentences.
+
+        Returns
+        -------
+        BatchEncoding
+            numpy model inputs.
+        """
+        if self.tokenize_engine == "tokenizer":
+            return super()._encode(sentences, max_length, tokenizer)
+        return self._load_word_index(tokenizer).encode(sentences, max_length)
 
     def process_labels(
-        self, labels: List[List], tokenized_sentences: BatchEncoding
+        self, labels: Union[RaggedArray, List[List]], tokenized_sentences: BatchEncoding
     ) -> np.array:
         """Align and pad labels.
         Pad all labels to the same length that tokens, adding -100 for no tokens.
         Add -100 for `[CLS]` and `[SEP]` tokens.
+        The sub-tokens after the first one of a word are labeled following
+        `label_strategy`.
 
         Note: BERT can break a word into several so that is needed words_ids.
-
+        The labels are gathered from the flat labels array with the words ids
+        matrix, in one vectorized pass: a first occurrence mask of the words ids
+        picks, for each token, the word label or its continuation label.
 
         Parameters
         ----------
-        labels : List[List]
+        labels : Union[RaggedArray, List[List]]
             preprocessed labels.
         tokenized_sentences: BatchEncoding
             Tokenized sentences to use words_ids.
 
         Returns
         -------
-        List
+        np.array
             labels to train a model.
         """
-        new_labels = []
-
-        for index, label in enumerate(labels):
-            previous_idx = None
-            new_label = []
-            word_idx = tokenized_sentences.word_ids(batch_index=index)
-            for idx in word_idx:
-                if idx is None:
-                    new_label.append(SPECIAL_TOKEN_LABEL)
-                else:
-                    if previous_idx == idx:
-                        new_label.append(label[idx])
-                    else:
-                        new_label.append(label[idx])
-                previous_idx = idx
-
-            new_labels.append(new_label)
-
-        return np.array(new_labels)
+        if not isinstance(labels, RaggedArray):
+            labels = RaggedArray.from_lists(labels, dtype=np.int8)
+
+        word_ids = self._word_ids_matrix(tokenized_sentences)
+        special = word_ids == SPECIAL_TOKEN_WORD_ID
+        rows = np.arange(len(labels))[:, None]
+        # Special tokens point to a sentinel appended after the flat labels.
+        positions = np.where(
+            special, len(labels.values), labels.flat_index(rows, word_ids)
+        )
+        # Word labels and continuation labels, by flat position.
+        table = np.full((2, len(labels.values) + 1), SPECIAL_TOKEN_LABEL, np.int64)
+        table[0, :-1] = labels.values
+        if self.label_strategy == "all":
+            table[1] = table[0]
+        elif self.label_strategy == "b_to_i":
+            known = (labels.values >= 0) & (labels.values < len(_B_TO_I))
+            table[1, :-1] = np.where(
+                known, _B_TO_I[np.where(known, labels.values, 0)], labels.values
+            )
+
+        continuation = np.zeros_like(special)
+        continuation[:, 1:] = ~special[:, 1:] & (word_ids[:, 1:] == word_ids[:, :-1])
+
+        return table[continuation.astype(np.intp), positions]
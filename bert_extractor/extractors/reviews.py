@@ -1,23 +1,140 @@
 """Reviews Data Extractor"""
 
 from gzip import decompress
+from itertools import chain
 import json
 import logging
-from typing import List, Tuple
+import os
+from typing import Iterator, List, Optional, Tuple, Union
 
 import numpy as np
 import requests
 from transformers.tokenization_utils_base import BatchEncoding
 
+from bert_extractor.constants import (
+    JSON_PARSE_QUEUE_SIZE,
+    SPLIT_MEMORY_BUDGET,
+    SPLIT_SEED,
+    STREAM_CHUNK_BYTES,
+    TOKENIZE_BATCH_SIZE,
+)
 from bert_extractor.extractors.base import BaseBERTExtractor
+from bert_extractor.jsonl import jsonl_gz_stages, read_jsonl_gz, resolve_backend
+from bert_extractor.pipeline import Stage
 from bert_extractor.utils import cache_extract_raw
 
 logger = logging.getLogger(__name__)
 
+# Fields of each review used by `preprocess`, the others are dropped on parsing.
+REVIEWS_COLUMNS = ("overall", "reviewText", "summary")
+
 
 class ReviewsExtractor(BaseBERTExtractor):
     """Extractor for Amazon Reviews"""
 
+    streams_raw = True
+
+    def __init__(
+        self,
+        pretrained_model_name_or_path: Union[str, os.PathLike],
+        sentence_col: str,
+        labels_col: str,
+        auth_username: Optional[str] = None,
+        auth_key: Optional[str] = None,
+        split_test_size: float = 0.1,
+        cache_path: Union[str, os.PathLike] = "/tmp/bert_extractor",
+        read_cache: bool = False,
+        split_strategy: str = "random",
+        split_seed: int = SPLIT_SEED,
+        split_memory_budget: int = SPLIT_MEMORY_BUDGET,
+        keep_word_ids: bool = False,
+        tokenize_batch_size: int = TOKENIZE_BATCH_SIZE,
+        tokenize_workers: Optional[int] = None,
+        tokenizers_parallelism: Optional[bool] = None,
+        pipeline_queue_size: Optional[int] = None,
+        tokenize_memory_budget: Optional[int] = None,
+        compact_inputs: bool = False,
+        parse_workers: Optional[int] = None,
+        json_backend: Optional[str] = None,
+    ):
+        """Amazon Reviews Extractor.
+        Extract the reviews text and rating for a Text Classification problem,
+        the url is a gzip compressed JSON lines dump.
+
+        Parameters
+        ----------
+        pretrained_model_name_or_path : Union[str, os.PathLike]
+            pretained BERT name to tokenize the the input.
+        sentence_col : str
+            name of the column of from where it will be the text.
+        labels_col : str
+            name of the column of from where it will be the label.
+        auth_username : Optional, str
+            not used, the dumps are public.
+        auth_key: Optional, str
+            not used, the dumps are public.
+        split_test_size : float
+            amount of dataset to use for test, between [0,1].
+        cache_path : Union[str, os.PathLike]
+            path to store cached raw and preprocessed data.
+        read_cache : bool
+            True to read from cache_path
+        split_strategy : str
+            how to split train and validation, one of `SPLIT_STRATEGIES`.
+        split_seed : int
+            random seed of the split.
+        split_memory_budget : int
+            bytes of rows to keep in memory with the external split.
+        keep_word_ids : bool
+            True to keep the word index of each token as a `word_ids` input.
+        tokenize_batch_size : int
+            amount of sentences of each fast tokenizer call.
+        tokenize_workers : Optional[int]
+            threads sending batches to the fast tokenizer.
+        tokenizers_parallelism : Optional[bool]
+            value of `TOKENIZERS_PARALLELISM`, as in the environment if None.
+        pipeline_queue_size : Optional[int]
+            items between the stages of the pipelined extraction, if streamed.
+        tokenize_memory_budget : Optional[int]
+            bytes of tokenized outputs to keep in memory, memory-mapped if over.
+        compact_inputs : bool
+            True to keep only the `input_ids` and the rows lengths, see
+            `bert_extractor.compact.CompactEncoding`.
+        parse_workers : Optional[int]
+            processes parsing the JSON lines by batches, while the dump is
+            streamed and decompressed in other threads. If None `extract_raw`
+            decompresses and parses the whole dump at once.
+        json_backend : Optional[str]
+            one of `JSON_BACKENDS`, orjson if installed when None.
+
+        Raises
+        ------
+        ValueError
+            if the JSON backend is unknown.
+        """
+        super().__init__(
+            pretrained_model_name_or_path,
+            sentence_col,
+            labels_col,
+            auth_username,
+            auth_key,
+            split_test_size,
+            cache_path,
+            read_cache,
+            split_strategy,
+            split_seed,
+            split_memory_budget,
+            keep_word_ids,
+            tokenize_batch_size,
+            tokenize_workers,
+            tokenizers_parallelism,
+            pipeline_queue_size,
+            tokenize_memory_budget,
+            compact_inputs,
+        )
+        self.parse_workers = parse_workers
+        self.json_backend = resolve_backend(json_backend)
+
     @cache_extract_raw()
     def extract_raw(self, url: str) -> List:
         """Download the url for Amazon reviews cast to a dict.
@@ -40,6 +157,21 @@ class ReviewsExtractor(BaseBERTExtractor):
             list with all the data extracted.
         """
         logger.info("Going to get data from %s", url)
+        if self.parse_workers:
+            loaded_dict = list(
+                chain.from_iterable(
+                    read_jsonl_gz(
+                        self.stream_raw(url),
+                        REVIEWS_COLUMNS,
+                        self.parse_workers,
+                        self.json_backend,
+                        queue_size=self.pipeline_queue_size or JSON_PARSE_QUEUE_SIZE,
+                    )
+                )
+            )
+            logger.info("Extraction successfull")
+            return loaded_dict
+
         loaded_dict = json.loads(
             "["
             + decompress(requests.get(url).content)
@@ -51,6 +183,31 @@ class ReviewsExtractor(BaseBERTExtractor):
         logger.info("Extraction successfull")
         return loaded_dict
 
+    def stream_raw(self, url: str) -> Iterator[bytes]:
+        """Stream the gzip compressed Amazon reviews by chunks.
+
+        Parameters
+        ----------
+        url : str
+            url from the json.gz data to download.
+
+        Returns
+        -------
+        Iterator[bytes]
+            compressed chunks.
+        """
+        logger.info("Going to stream data from %s", url)
+        response = requests.get(url, stream=True)
+        response.raise_for_status()
+        return response.iter_content(chunk_size=STREAM_CHUNK_BYTES)
+
+    def raw_stages(self) -> List[Stage]:
+        """Decompress the streamed chunks, split them into batches of lines,
+        then parse them into lists of reviews, in `parse_workers` processes."""
+        return jsonl_gz_stages(
+            REVIEWS_COLUMNS, self.parse_workers or 1, self.json_backend
+        )
+
     def preprocess(self, extracted_data: List) -> Tuple[List, List]:
         """Create two lists with the sentences and labels.
 
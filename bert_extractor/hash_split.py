@@ -0,0 +1,111 @@
+"""Deterministic train and validation split by example hash.
+
+Each example goes to validation if the stable hash of its content, salted with
+the split seed, falls under `test_size`. The decision depends only on the
+example, so shards or streams split in parallel, appended data and cached
+runs all agree, and duplicated sentences never leak across the splits.
+"""
+from hashlib import blake2b
+from typing import Any, Iterable, Iterator, Tuple
+
+import numpy as np
+
+_HASH_BYTES = 8
+_HASH_RANGE = 2 ** (8 * _HASH_BYTES)
+# Joins the words of an example split into words, it is not in any word.
+_WORDS_SEPARATOR = b"\x00"
+
+
+def example_hash(example: Any, seed: int) -> int:
+    """Stable 64 bits hash of an example content, or of its ID.
+
+    Parameters
+    ----------
+    example : Any
+        sentence, list of words or ID of the example.
+    seed : int
+        salt of the hash, a different seed gives a different split.
+
+    Returns
+    -------
+    int
+        hash of the example, between [0, 2 ** 64).
+    """
+    if isinstance(example, bytes):
+        content = example
+    elif isinstance(example, str):
+        content = example.encode()
+    elif isinstance(example, (list, tuple)):
+        content = _WORDS_SEPARATOR.join(str(word).encode() for word in example)
+    else:
+        content = str(example).encode()
+
+    digest = blake2b(
+        content, digest_size=_HASH_BYTES, salt=seed.to_bytes(8, "little", signed=True)
+    ).digest()
+    return int.from_bytes(digest, "little")
+
+
+def is_validation(example: Any, test_size: float, seed: int) -> bool:
+    """True if the example goes to validation.
+
+    Parameters
+    ----------
+    example : Any
+        sentence, list of words or ID of the example.
+    test_size : float
+        expected fraction of examples in validation, between [0,1].
+    seed : int
+        salt of the hash.
+
+    Returns
+    -------
+    bool
+        True for validation, False for train.
+    """
+    return example_hash(example, seed) < test_size * _HASH_RANGE
+
+
+def validation_mask(examples: Iterable[Any], test_size: float, seed: int) -> np.ndarray:
+    """Boolean mask of the examples that go to validation.
+
+    Parameters
+    ----------
+    examples : Iterable[Any]
+        sentences, lists of words or IDs of the examples.
+    test_size : float
+        expected fraction of examples in validation, between [0,1].
+    seed : int
+        salt of the hash.
+
+    Returns
+    -------
+    np.ndarray
+        True for validation, False for train, of each example.
+    """
+    return np.fromiter(
+        (is_validation(example, test_size, seed) for example in examples), dtype=bool
+    )
+
+
+def hash_split_rows(
+    rows: Iterable[Tuple[Any, Any]], test_size: float, seed: int
+) -> Iterator[Tuple[bool, Tuple[Any, Any]]]:
+    """Tag streamed (sentence, label) rows with their split, by sentence hash.
+
+    Parameters
+    ----------
+    rows : Iterable[Tuple[Any, Any]]
+        sentences and labels.
+    test_size : float
+        expected fraction of examples in validation, between [0,1].
+    seed : int
+        salt of the hash.
+
+    Returns
+    -------
+    Iterator[Tuple[bool, Tuple[Any, Any]]]
+        True if the row goes to validation, and the row.
+    """
+    for row in rows:
+        yield is_validation(row[0], test_size, seed), row
@@ -0,0 +1,270 @@
+"""Parallel reader of gzip compressed JSON lines, e.g. the Amazon reviews dumps.
+
+The dumps are single gzip members, so decompression can't be split across
+cores: it runs in its own pipeline stage, overlapped with the line splitting
+and the parsing. Lines are cut into batches of complete lines, parsed across
+a process pool, and only the needed columns of each record are sent back.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import json
+import logging
+import multiprocessing
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+import zlib
+
+from bert_extractor.constants import (
+    JSON_BACKENDS,
+    JSON_PARSE_BATCH_BYTES,
+    JSON_PARSE_QUEUE_SIZE,
+    JSON_PARSE_START_METHOD,
+)
+from bert_extractor.parallel import bounded_map
+from bert_extractor.pipeline import Stage, run_pipeline
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# zlib window bits to read the gzip header and trailer.
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """Name of the JSON backend to parse with.
+
+    Parameters
+    ----------
+    backend : Optional[str]
+        one of `JSON_BACKENDS`, orjson if installed and json if not when None.
+
+    Returns
+    -------
+    str
+        name of the backend.
+
+    Raises
+    ------
+    ValueError
+        if the backend is unknown.
+    ImportError
+        if the backend library is not installed.
+    """
+    if backend is None:
+        return "json" if orjson is None else "orjson"
+
+    if backend not in JSON_BACKENDS:
+        error_message = f"Unknown JSON backend {backend}, knows {JSON_BACKENDS}"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    if backend == "orjson" and orjson is None:
+        raise ImportError("orjson backend requires `pip install orjson`")
+    return backend
+
+
+def _json_loads(backend: str) -> Callable[[bytes], Any]:
+    """Loads function of a resolved backend."""
+    return json.loads if backend == "json" else orjson.loads
+
+
+def decompress_gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Decompress gzip chunks, of one or more concatenated gzip members.
+
+    Parameters
+    ----------
+    chunks : Iterable[bytes]
+        compressed chunks, cut anywhere.
+
+    Returns
+    -------
+    Iterator[bytes]
+        decompressed chunks.
+    """
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    for chunk in chunks:
+        while chunk:
+            data = decompressor.decompress(chunk)
+            if data:
+                yield data
+            chunk = b""
+            if decompressor.eof:
+                chunk = decompressor.unused_data
+                decompressor = zlib.decompressobj(GZIP_WBITS)
+
+    data = decompressor.flush()
+    if data:
+        yield data
+
+
+def split_lines(
+    chunks: Iterable[bytes], batch_bytes: int = JSON_PARSE_BATCH_BYTES
+) -> Iterator[bytes]:
+    """Regroup decompressed chunks into batches of complete lines, keeping the
+    line cut at the end of a batch for the next one.
+
+    Parameters
+    ----------
+    chunks : Iterable[bytes]
+        decompressed chunks, cut anywhere.
+    batch_bytes : int
+        min size of each batch, but the last one.
+
+    Returns
+    -------
+    Iterator[bytes]
+        batches of lines.
+    """
+    parts: List[bytes] = []
+    size = 0
+    for chunk in chunks:
+        parts.append(chunk)
+        size += len(chunk)
+        if size < batch_bytes:
+            continue
+
+        data = b"".join(parts)
+        cut = data.rfind(b"\n") + 1
+        if cut:
+            yield data[:cut]
+            data = data[cut:]
+        parts, size = [data], len(data)
+
+    data = b"".join(parts)
+    if data.strip():
+        yield data
+
+
+def parse_lines(
+    batch: bytes, columns: Optional[Sequence[str]] = None, backend: str = "json"
+) -> List[Dict]:
+    """Parse a batch of JSON lines, keeping only the given columns.
+
+    Parameters
+    ----------
+    batch : bytes
+        one JSON record per line, blank lines are skipped.
+    columns : Optional[Sequence[str]]
+        keys to keep of each record, all of them if None.
+    backend : str
+        one of `JSON_BACKENDS`.
+
+    Returns
+    -------
+    List[Dict]
+        parsed records.
+    """
+    loads = _json_loads(backend)
+    records = [loads(line) for line in batch.split(b"\n") if line.strip()]
+    if columns is None:
+        return records
+    return [
+        {key: record[key] for key in columns if key in record} for record in records
+    ]
+
+
+def parse_batches(
+    batches: Iterable[bytes],
+    columns: Optional[Sequence[str]] = None,
+    workers: int = 1,
+    backend: Optional[str] = None,
+) -> Iterator[List[Dict]]:
+    """Parse batches of JSON lines in order, across a process pool if there is
+    more than one worker, with at most two batches per worker in flight.
+    The workers are spawned, not forked, since this runs in a pipeline stage
+    thread and a fork would copy the locks held by the other threads.
+
+    Parameters
+    ----------
+    batches : Iterable[bytes]
+        batches of complete lines.
+    columns : Optional[Sequence[str]]
+        keys to keep of each record, all of them if None.
+    workers : int
+        processes parsing the batches, 1 to parse in this process.
+    backend : Optional[str]
+        one of `JSON_BACKENDS`, see `resolve_backend`.
+
+    Returns
+    -------
+    Iterator[List[Dict]]
+        records of each batch.
+    """
+    parse = partial(parse_lines, columns=columns, backend=resolve_backend(backend))
+    if workers <= 1:
+        yield from map(parse, batches)
+        return
+
+    context = multiprocessing.get_context(JSON_PARSE_START_METHOD)
+    with ProcessPoolExecutor(workers, mp_context=context) as executor:
+        yield from bounded_map(executor, parse, batches, 2 * workers)
+
+
+def jsonl_gz_stages(
+    columns: Optional[Sequence[str]] = None,
+    workers: int = 1,
+    backend: Optional[str] = None,
+    batch_bytes: int = JSON_PARSE_BATCH_BYTES,
+) -> List[Stage]:
+    """Pipeline stages from gzip compressed chunks to lists of records,
+    see `bert_extractor.pipeline.run_pipeline`.
+
+    Parameters
+    ----------
+    columns : Optional[Sequence[str]]
+        keys to keep of each record, all of them if None.
+    workers : int
+        processes parsing the batches, 1 to parse in the stage thread.
+    backend : Optional[str]
+        one of `JSON_BACKENDS`, see `resolve_backend`.
+    batch_bytes : int
+        decompressed bytes of each parsed batch.
+
+    Returns
+    -------
+    List[Stage]
+        decompress, split lines and parse stages.
+    """
+    return [
+        decompress_gzip,
+        partial(split_lines, batch_bytes=batch_bytes),
+        partial(parse_batches, columns=columns, workers=workers, backend=backend),
+    ]
+
+
+def read_jsonl_gz(
+    chunks: Iterable[bytes],
+    columns: Optional[Sequence[str]] = None,
+    workers: int = 1,
+    backend: Optional[str] = None,
+    batch_bytes: int = JSON_PARSE_BATCH_BYTES,
+    queue_size: int = JSON_PARSE_QUEUE_SIZE,
+) -> Iterator[List[Dict]]:
+    """Decompress, split and parse gzip compressed JSON lines concurrently.
+
+    Parameters
+    ----------
+    chunks : Iterable[bytes]
+        compressed chunks, e.g. a download stream.
+    columns : Optional[Sequence[str]]
+        keys to keep of each record, all of them if None.
+    workers : int
+        processes parsing the batches, 1 to parse in the stage thread.
+    backend : Optional[str]
+        one of `JSON_BACKENDS`, see `resolve_backend`.
+    batch_bytes : int
+        decompressed bytes of each parsed batch.
+    queue_size : int
+        max amount of items waiting between two stages.
+
+    Returns
+    -------
+    Iterator[List[Dict]]
+        records of each batch, in the file order.
+    """
+    return run_pipeline(
+        chunks, jsonl_gz_stages(columns, workers, backend, batch_bytes), queue_size
+    )
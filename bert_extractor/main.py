@@ -1,13 +1,56 @@
 """Main file CLI for use this package, and usage example."""
 
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
 import click
 
+from bert_extractor import registry
 from bert_extractor.configs import read_config
-from bert_extractor.constants import NER_KAGGLE_DATASET, REVIEWS_DATASET
-from bert_extractor.extractors import BaseBERTExtractor, NERExtractor, ReviewsExtractor
+from bert_extractor.constants import COMPRESSION_CODECS
+from bert_extractor.extractors.base import BaseBERTExtractor
 from bert_extractor.utils import store_tensor
 
 
+def build_extractor(configs: Dict) -> Tuple[BaseBERTExtractor, str]:
+    """Instantiate the extractor set in the configuration,
+    looked up in the extractors registry.
+
+    Parameters
+    ----------
+    configs : Dict
+        validated configuration.
+
+    Returns
+    -------
+    Tuple[BaseBERTExtractor, str]
+        - extractor: configured extractor.
+        - url: url of the dataset to extract.
+    """
+    extractor_class = registry.get_extractor_class(configs["extractor_type"])
+    extractor = extractor_class(**configs["extractor_config"])
+    url = registry.resolve_url(configs["extractor_type"], configs["extractor_url"])
+
+    return extractor, url
+
+
+def store_name(configs: Dict) -> str:
+    """Name of the stored output, the extractor type and the dataset name
+    or the local file name, since urls and paths have slashes.
+
+    Parameters
+    ----------
+    configs : Dict
+        validated configuration.
+
+    Returns
+    -------
+    str
+        prefix of the stored files names.
+    """
+    return configs["extractor_type"] + "_" + Path(configs["extractor_url"]).name
+
+
 @click.command()
 @click.option(
     "--config_path",
@@ -18,7 +61,28 @@ from bert_extractor.utils import store_tensor
 @click.option(
     "--output_path", type=click.STRING, default="./data/", help="Path to output file"
 )
-def main(config_path: str, output_path: str):
+@click.option(
+    "--codec",
+    type=click.Choice(COMPRESSION_CODECS),
+    default=None,
+    help="Compress the output with this codec, pickle it if not set",
+)
+@click.option(
+    "--level", type=click.INT, default=None, help="Compression level of the codec"
+)
+@click.option(
+    "--num_shards",
+    type=click.INT,
+    default=None,
+    help="Store each split in this amount of shards plus an index file",
+)
+def main(
+    config_path: str,
+    output_path: str,
+    codec: Optional[str],
+    level: Optional[int],
+    num_shards: Optional[int],
+):
     """Main function to implement Bert Extractors.
 
     Parameters
@@ -27,23 +91,27 @@ def main(config_path: str, output_path: str):
         path to the configuration file.
     output_path : str
         path to where store the output.
+    codec : Optional[str]
+        compression codec for the output.
+    level : Optional[int]
+        compression level of the codec.
+    num_shards : Optional[int]
+        amount of shards of each split of the output.
     """
-    extractor: BaseBERTExtractor
     configs = read_config(config_path)
-    url = ""
-
-    if configs["extractor_type"] == "reviews":
-        extractor = ReviewsExtractor(**configs["extractor_config"])
-        url = REVIEWS_DATASET.get(configs["extractor_url"])
-
-    elif configs["extractor_type"] == "ner":
-        extractor = NERExtractor(**configs["extractor_config"])
-        url = NER_KAGGLE_DATASET.get(configs["extractor_url"])
+    extractor, url = build_extractor(configs)
 
     tensor = extractor.extract_preprocess(url)
 
-    store_name = configs["extractor_type"] + "_" + url
-    store_tensor(tensor, output_path, store_name)
+    store_tensor(
+        tensor,
+        output_path,
+        store_name(configs),
+        codec=codec,
+        level=level,
+        num_shards=num_shards,
+        manifest=extractor.extraction_manifest(tensor),
+    )
 
 
 if __name__ == "__main__":
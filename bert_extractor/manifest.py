@@ -0,0 +1,74 @@
+"""Extraction manifest, the tokenizer settings of a stored extraction, so the
+texts scored later are tokenized exactly as the training data."""
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Union
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = "_bert_extraction_manifest.json"
+
+
+def write_manifest(
+    manifest: Dict, output_path: Union[str, os.PathLike], name: str
+) -> Path:
+    """Write the manifest of an extraction next to its output.
+
+    Parameters
+    ----------
+    manifest : Dict
+        settings of the extraction, from `BaseBERTExtractor.extraction_manifest`.
+    output_path : Union[str, os.PathLike]
+        directory of the stored output.
+    name : str
+        prefix of the stored files names.
+
+    Returns
+    -------
+    Path
+        path of the manifest file.
+    """
+    filepath = Path(output_path) / f"{name}{MANIFEST_SUFFIX}"
+    with open(filepath, "w") as file:
+        json.dump({"version": MANIFEST_VERSION, **manifest}, file, indent=2)
+
+    logger.info("Stored extraction manifest in: %s", filepath)
+    return filepath
+
+
+def read_manifest(manifest: Union[str, os.PathLike, Dict]) -> Dict:
+    """Read an extraction manifest.
+
+    Parameters
+    ----------
+    manifest : Union[str, os.PathLike, Dict]
+        path of the manifest file, or the manifest itself.
+
+    Returns
+    -------
+    Dict
+        settings of the extraction.
+
+    Raises
+    ------
+    ValueError
+        if the manifest version is unknown or it has no max_length.
+    """
+    if not isinstance(manifest, dict):
+        with open(manifest, "r") as file:
+            manifest = json.load(file)
+
+    if manifest.get("version", MANIFEST_VERSION) > MANIFEST_VERSION:
+        error_message = f"Unknown manifest version {manifest['version']}"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    if "max_length" not in manifest:
+        error_message = "The manifest has no max_length"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    return manifest
@@ -0,0 +1,71 @@
+"""Helpers to run work in a bounded thread pool, keeping the memory of the
+work in flight bounded, e.g. tokenizer batches that release the GIL."""
+from collections import deque
+from concurrent.futures import Executor
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List
+
+
+def batched(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield lists of `size` items of the iterable, the last one can be shorter.
+
+    Parameters
+    ----------
+    iterable : Iterable[Any]
+        items to batch.
+    size : int
+        amount of items of each batch.
+
+    Returns
+    -------
+    Iterator[List[Any]]
+        batches of items.
+    """
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+def bounded_map(
+    executor: Executor,
+    function: Callable[[Any], Any],
+    iterable: Iterable[Any],
+    max_in_flight: int,
+) -> Iterator[Any]:
+    """Like `executor.map` but lazy: it submits at most `max_in_flight` items
+    ahead of the one being consumed, so the iterable is not read all at once.
+    Results are yielded in order, overlapping the work on the next items with
+    the consumer of the current one.
+
+    Parameters
+    ----------
+    executor : Executor
+        pool to run the function in.
+    function : Callable[[Any], Any]
+        function to call on each item.
+    iterable : Iterable[Any]
+        items to process.
+    max_in_flight : int
+        max amount of submitted items not consumed yet.
+
+    Returns
+    -------
+    Iterator[Any]
+        result of each item.
+    """
+    iterator = iter(iterable)
+    futures = deque(
+        executor.submit(function, item)
+        for item in islice(iterator, max(max_in_flight, 1))
+    )
+    try:
+        while futures:
+            result = futures.popleft().result()
+            for item in islice(iterator, 1):
+                futures.append(executor.submit(function, item))
+            yield result
+    finally:
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,117 @@
+"""Staged pipeline, each stage in its own thread connected by bounded queues.
+
+A stage is a function from an iterator of items to an iterable of items, e.g.
+a generator that decompresses chunks or parses lines. Stages run concurrently,
+so network, decompression and parsing overlap, and the bounded queues apply
+backpressure: a fast stage blocks once its output queue is full instead of
+buffering the whole dataset in memory.
+"""
+import logging
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+from typing import Any, Callable, Iterable, Iterator, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+Stage = Callable[[Iterator[Any]], Iterable[Any]]
+
+_DONE = object()
+_POLL_SECONDS = 0.1
+
+
+class _StageError:
+    """Error raised in a stage, sent downstream to be raised by the consumer."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class _Pipeline:
+    """Threads and queues of a running pipeline."""
+
+    def __init__(self, queue_size: int, stages: int):
+        self.stop = Event()
+        self.queues: List[Queue] = [Queue(queue_size) for _ in range(stages)]
+
+    def put(self, queue: Queue, item: Any) -> bool:
+        """Put an item, waiting while the queue is full, False if stopped."""
+        while not self.stop.is_set():
+            try:
+                queue.put(item, timeout=_POLL_SECONDS)
+                return True
+            except Full:
+                continue
+        return False
+
+    def drain(self, queue: Queue) -> Iterator[Any]:
+        """Yield the items of a queue up to the end of its stage."""
+        while not self.stop.is_set():
+            try:
+                item = queue.get(timeout=_POLL_SECONDS)
+            except Empty:
+                continue
+            if item is _DONE:
+                return
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+
+    def run(self, stage: Stage, inputs: Iterator[Any], output: Queue):
+        """Run a stage, sending its items, or its error, to the output queue."""
+        try:
+            for item in stage(inputs):
+                if not self.put(output, item):
+                    return
+        except BaseException as error:  # pylint: disable=broad-except
+            self.put(output, _StageError(error))
+            return
+        self.put(output, _DONE)
+
+
+def run_pipeline(
+    source: Iterable[Any], stages: Sequence[Stage], queue_size: int
+) -> Iterator[Any]:
+    """Run the stages concurrently over the source items.
+    The source is iterated in its own thread too, e.g. a download stream.
+
+    Parameters
+    ----------
+    source : Iterable[Any]
+        items of the first stage.
+    stages : Sequence[Stage]
+        functions from an iterator of items to an iterable of items.
+    queue_size : int
+        max amount of items waiting between two stages.
+
+    Returns
+    -------
+    Iterator[Any]
+        items of the last stage, in order.
+
+    Raises
+    ------
+    Exception
+        the first error raised by any stage.
+    """
+    pipeline = _Pipeline(queue_size, len(stages) + 1)
+    threads = [
+        Thread(target=pipeline.run, args=(iter, source, pipeline.queues[0]))
+    ]
+    for stage, inputs, output in zip(stages, pipeline.queues, pipeline.queues[1:]):
+        threads.append(
+            Thread(target=pipeline.run, args=(stage, pipeline.drain(inputs), output))
+        )
+
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    try:
+        yield from pipeline.drain(pipeline.queues[-1])
+    finally:
+        # Unblock the stages if the consumer stopped early or a stage failed.
+        pipeline.stop.set()
+
+    for thread in threads:
+        thread.join()
+    logger.debug("Pipeline of %s stages done", len(stages))
@@ -0,0 +1,233 @@
+"""Profile a corpus before committing to a full extraction.
+
+Usage:
+    $ python -m bert_extractor.profiling --config_path=config/config_sample_ner.json
+"""
+from collections import Counter
+from itertools import chain
+import logging
+import math
+from time import perf_counter
+from typing import Dict, NamedTuple, Optional
+
+import click
+import numpy as np
+
+from bert_extractor.configs import read_config
+from bert_extractor.constants import (
+    PROFILE_PADDING_POLICIES,
+    PROFILE_PERCENTILES,
+    PROFILE_TRAINING_BATCH_SIZE,
+)
+from bert_extractor.extractors.base import BaseBERTExtractor
+from bert_extractor.main import build_extractor
+from bert_extractor.ragged import RaggedArray
+
+logger = logging.getLogger(__name__)
+
+_DTYPE_BYTES = np.dtype(np.int64).itemsize
+
+
+class CorpusProfile(NamedTuple):
+    """Statistics of a corpus."""
+
+    rows: int
+    sampled_rows: int
+    max_length: int
+    length_percentiles: Dict[int, float]
+    label_counts: Dict
+    padded_bytes: Dict[str, int]
+    tokenize_seconds: float
+    projected_seconds: float
+
+
+def padded_bytes(
+    lengths: np.ndarray,
+    rows: int,
+    max_length: int,
+    token_arrays: int,
+    token_classification: bool,
+    training_batch_size: int = PROFILE_TRAINING_BATCH_SIZE,
+    seed: int = 2020,
+) -> Dict[str, int]:
+    """Estimate the bytes of the tokenized tensor for each padding policy.
+
+    Policies:
+        - max_length: every sentence padded to the corpus max length, as today.
+        - p99_truncation: truncated and padded to the 99th percentile length.
+        - batch_longest: padded to the longest sentence of each training batch.
+        - no_padding: the tokens only.
+
+    Parameters
+    ----------
+    lengths : np.ndarray
+        sampled length of the sentences.
+    rows : int
+        amount of sentences of the whole corpus.
+    max_length : int
+        padded length of the `max_length` policy.
+    token_arrays : int
+        amount of arrays of a value per token, see
+        `BaseBERTExtractor.token_arrays`.
+    token_classification : bool
+        True if there is a label per token, counted in `token_arrays`, else
+        a label per sentence.
+    training_batch_size : int
+        batch size of the `batch_longest` policy.
+    seed : int
+        random seed to shuffle the training batches.
+
+    Returns
+    -------
+    Dict[str, int]
+        estimated bytes of each policy, 0 without sentences.
+    """
+    if len(lengths) == 0:
+        return {policy: 0 for policy in PROFILE_PADDING_POLICIES}
+
+    scale = rows / len(lengths)
+    p99_length = min((int(np.percentile(lengths, 99)) + 7) & -8, max_length)
+    shuffled = np.random.default_rng(seed).permutation(lengths)
+    batch_starts = np.arange(0, len(shuffled), training_batch_size)
+    batch_max = np.maximum.reduceat(shuffled, batch_starts)
+    batch_rows = np.diff(np.append(batch_starts, len(shuffled)))
+
+    tokens = {
+        "max_length": len(lengths) * max_length,
+        "p99_truncation": len(lengths) * p99_length,
+        "batch_longest": int(np.sum(batch_max * batch_rows)),
+        "no_padding": int(np.sum(np.minimum(lengths, max_length))),
+    }
+    labels_bytes = 0 if token_classification else rows * _DTYPE_BYTES
+
+    return {
+        policy: int(amount * scale * token_arrays * _DTYPE_BYTES) + labels_bytes
+        for policy, amount in tokens.items()
+    }
+
+
+def profile_corpus(
+    extractor: BaseBERTExtractor,
+    url: str,
+    sample_size: Optional[int] = None,
+    seed: int = 2020,
+) -> CorpusProfile:
+    """Profile the token length distribution, label balance, output size
+    and run time of a corpus, tokenizing lengths only of a sample.
+    The preprocessed text is read from the cache if the extractor reads it,
+    and the lengths are computed as in the extraction, by batches from the
+    tokenizer thread pool of the extractor.
+
+    Parameters
+    ----------
+    extractor : BaseBERTExtractor
+        extractor of the corpus.
+    url : str
+        url to extract data from.
+    sample_size : Optional[int]
+        amount of sentences to tokenize, all of them if None.
+    seed : int
+        random seed of the sample.
+
+    Returns
+    -------
+    CorpusProfile
+        statistics of the corpus.
+    """
+    sentences, labels = extractor.extract_preprocessed(url)
+    rows = len(sentences)
+
+    if isinstance(labels, RaggedArray):
+        label_counts = Counter(labels.values.tolist())
+    elif extractor.token_classification:
+        label_counts = Counter(chain.from_iterable(labels))
+    else:
+        label_counts = Counter(extractor.process_labels(labels, None).tolist())
+
+    if sample_size is not None and sample_size < rows:
+        indexes = np.random.default_rng(seed).choice(rows, sample_size, replace=False)
+        sentences = [sentences[index] for index in indexes]
+
+    tokenizer = extractor.load_tokenizer()
+    start = perf_counter()
+    lengths = np.fromiter(
+        extractor._token_lengths(sentences, tokenizer),
+        dtype=np.int64,
+        count=len(sentences),
+    )
+    tokenize_seconds = perf_counter() - start
+    logger.info("Profiled %s of %s sentences", len(sentences), rows)
+
+    if len(lengths) == 0:
+        logger.warning("Empty corpus: %s", url)
+        max_length = 0
+        length_percentiles = {percentile: 0.0 for percentile in PROFILE_PERCENTILES}
+    else:
+        max_length = extractor.get_max_length(lengths, tokenizer)
+        length_percentiles = {
+            percentile: float(np.percentile(lengths, percentile))
+            for percentile in PROFILE_PERCENTILES
+        }
+
+    return CorpusProfile(
+        rows=rows,
+        sampled_rows=len(sentences),
+        max_length=max_length,
+        length_percentiles=length_percentiles,
+        label_counts=dict(label_counts.most_common()),
+        padded_bytes=padded_bytes(
+            lengths,
+            rows,
+            max_length,
+            extractor.token_arrays(tokenizer),
+            extractor.token_classification,
+            seed=seed,
+        ),
+        tokenize_seconds=tokenize_seconds,
+        # bert_tokenizer encodes each sentence twice, to get the max length
+        # and to tokenize it.
+        projected_seconds=2 * tokenize_seconds * rows / max(len(sentences), 1),
+    )
+
+
+@click.command()
+@click.option(
+    "--config_path",
+    type=click.STRING,
+    help="Path to config file",
+    default="./config/config_sample_reviews.json",
+)
+@click.option(
+    "--sample_size",
+    type=click.INT,
+    default=None,
+    help="Amount of sentences to tokenize, all if not set",
+)
+def main(config_path: str, sample_size: Optional[int]):
+    """Print the profile of the corpus set in the configuration.
+
+    Parameters
+    ----------
+    config_path : str
+        path to the configuration file.
+    sample_size : Optional[int]
+        amount of sentences to tokenize.
+    """
+    extractor, url = build_extractor(read_config(config_path))
+    profile = profile_corpus(extractor, url, sample_size)
+
+    click.echo(f"Sentences: {profile.rows} (sampled {profile.sampled_rows})")
+    click.echo(f"Max length: {profile.max_length}")
+    for percentile, length in profile.length_percentiles.items():
+        click.echo(f"  p{percentile} length: {length:.0f}")
+    click.echo("Labels:")
+    for label, count in profile.label_counts.items():
+        click.echo(f"  {label}: {count}")
+    click.echo("Estimated padded tensor size:")
+    for policy, size in profile.padded_bytes.items():
+        click.echo(f"  {policy}: {size / 2 ** 20:.1f} MB")
+    click.echo(f"Projected tokenization time: {math.ceil(profile.projected_seconds)} s")
+
+
+if __name__ == "__main__":
+    main()
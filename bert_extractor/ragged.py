@@ -0,0 +1,206 @@
+"""Ragged arrays, flat values plus offsets, to hold variable length rows
+such as the words and labels of each sentence without a Python object per item.
+"""
+from typing import Any, Iterable, Iterator, List, Sequence, Union
+
+import numpy as np
+
+
+def _offsets_from_lengths(lengths: Iterable[int]) -> np.ndarray:
+    """Offsets of rows, given their lengths."""
+    lengths = np.fromiter(lengths, dtype=np.int64)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def _take_positions(offsets: np.ndarray, indexes: np.ndarray):
+    """Positions in the flat values of the rows at the given indexes,
+    and the offsets of those rows once taken."""
+    indexes = np.asarray(indexes, dtype=np.int64)
+    starts = offsets[indexes]
+    lengths = offsets[indexes + 1] - starts
+    new_offsets = _offsets_from_lengths(lengths)
+    positions = np.repeat(starts - new_offsets[:-1], lengths)
+    return positions + np.arange(new_offsets[-1]), new_offsets
+
+
+class StringBuffer:
+    """Strings stored as a flat utf-8 buffer plus int64 offsets."""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        """
+        Parameters
+        ----------
+        data : np.ndarray
+            uint8 concatenated utf-8 encoded strings.
+        offsets : np.ndarray
+            int64 start of each string in data, plus the end of the last one.
+        """
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings: Iterable[str]) -> "StringBuffer":
+        """Encode strings into a buffer."""
+        encoded = [string.encode() for string in strings]
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(data, _offsets_from_lengths(len(string) for string in encoded))
+
+    @classmethod
+    def concatenate(cls, buffers: Sequence["StringBuffer"]) -> "StringBuffer":
+        """Join buffers one after the other."""
+        data = np.concatenate([buffer.data for buffer in buffers])
+        lengths = np.concatenate([buffer.lengths for buffer in buffers])
+        return cls(data, _offsets_from_lengths(lengths))
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """Bytes of each string."""
+        return np.diff(self.offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            start, stop, _ = index.indices(len(self))
+            stop = max(start, stop)
+            offsets = (self.offsets[start : stop + 1] - self.offsets[start]).tolist()
+            data = self.data[self.offsets[start] : self.offsets[stop]].tobytes()
+            return [
+                data[begin:end].decode() for begin, end in zip(offsets, offsets[1:])
+            ]
+        start, stop = self.offsets[index], self.offsets[index + 1]
+        return self.data[start:stop].tobytes().decode()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self[:])
+
+    def equals(self, string: str) -> np.ndarray:
+        """Boolean mask of the strings equal to the given one, comparing the
+        bytes of all the strings of the same length at once."""
+        encoded = np.frombuffer(string.encode(), dtype=np.uint8)
+        mask = self.lengths == len(encoded)
+        candidates = np.flatnonzero(mask)
+        positions = self.offsets[candidates, None] + np.arange(len(encoded))
+        mask[candidates] = np.all(self.data[positions] == encoded, axis=1)
+        return mask
+
+    def take(self, indexes: np.ndarray) -> "StringBuffer":
+        """Strings at the given indexes, as a new buffer."""
+        positions, offsets = _take_positions(self.offsets, indexes)
+        return StringBuffer(self.data[positions], offsets)
+
+    def tolist(self) -> List[str]:
+        """Decoded strings."""
+        return self[:]
+
+
+Values = Union[np.ndarray, StringBuffer]
+
+
+class RaggedArray:
+    """Rows of variable length, stored as flat values plus int64 offsets.
+    Each row is a cheap view: a numpy slice, or a list of strings if the
+    values are a StringBuffer, ready for `is_split_into_words` tokenization.
+    """
+
+    def __init__(self, values: Values, offsets: np.ndarray):
+        """
+        Parameters
+        ----------
+        values : Union[np.ndarray, StringBuffer]
+            concatenated values of all the rows.
+        offsets : np.ndarray
+            int64 start of each row in values, plus the end of the last one.
+        """
+        self.values = values
+        self.offsets = offsets
+
+    @classmethod
+    def from_lists(cls, rows: Sequence[Sequence], dtype: Any) -> "RaggedArray":
+        """Build it from a list of lists, of strings or numbers.
+
+        Parameters
+        ----------
+        rows : Sequence[Sequence]
+            rows to store.
+        dtype : Any
+            numpy dtype of the values, `str` to store strings in a
+            StringBuffer. Explicit, as the rows may have no values to infer
+            it from.
+
+        Returns
+        -------
+        RaggedArray
+            ragged rows.
+        """
+        offsets = _offsets_from_lengths(len(row) for row in rows)
+        flat = [item for row in rows for item in row]
+        if dtype is str:
+            return cls(StringBuffer.from_strings(flat), offsets)
+        return cls(np.asarray(flat, dtype=dtype), offsets)
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """Length of each row."""
+        return np.diff(self.offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[np.ndarray, List[str], "RaggedArray"]:
+        if isinstance(index, slice):
+            return self.take(np.arange(*index.indices(len(self))))
+        return self.values[self.offsets[index] : self.offsets[index + 1]]
+
+    def __iter__(self) -> Iterator:
+        for start, stop in zip(self.offsets[:-1].tolist(), self.offsets[1:].tolist()):
+            yield self.values[start:stop]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, RaggedArray):
+            return NotImplemented
+        return self.tolist() == other.tolist()
+
+    def take(self, indexes: np.ndarray) -> "RaggedArray":
+        """Rows at the given indexes, as a new ragged array.
+
+        Parameters
+        ----------
+        indexes : np.ndarray
+            indexes of the rows to take.
+
+        Returns
+        -------
+        RaggedArray
+            selected rows.
+        """
+        positions, offsets = _take_positions(self.offsets, indexes)
+        if isinstance(self.values, StringBuffer):
+            return RaggedArray(self.values.take(positions), offsets)
+        return RaggedArray(self.values[positions], offsets)
+
+    def flat_index(self, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        """Position in values of the item at each (row, column).
+
+        Parameters
+        ----------
+        rows : np.ndarray
+            rows indexes.
+        columns : np.ndarray
+            columns indexes inside each row, broadcast against rows.
+
+        Returns
+        -------
+        np.ndarray
+            indexes of the values.
+        """
+        return self.offsets[rows] + columns
+
+    def tolist(self) -> List[List]:
+        """Rows as Python lists."""
+        return [row if isinstance(row, list) else row.tolist() for row in self]
@@ -0,0 +1,186 @@
+"""Registry of the extractors and their dataset sources.
+
+Extractor classes and dataset tables are found by name, from the built-in ones
+or from the entry points other packages declare, e.g. in a `pyproject.toml`:
+
+    [tool.poetry.plugins."bert_extractor.extractors"]
+    "my_source" = "my_package.extractors:MySourceExtractor"
+
+    [tool.poetry.plugins."bert_extractor.datasets"]
+    "my_source" = "my_package.constants:MY_SOURCE_DATASETS"
+
+A dataset entry point loads a dictionary of dataset name to url. Extractor
+types without datasets take the `extractor_url` as is, e.g. a local path.
+"""
+from functools import lru_cache
+from importlib import import_module
+from importlib.metadata import entry_points
+import logging
+from typing import Any, Dict, List, Type
+
+from bert_extractor.constants import (
+    DATASETS_ENTRY_POINTS,
+    EXTRACTORS_ENTRY_POINTS,
+    LOCAL_CONFIG_TYPE,
+    NER_CONFIG_TYPE,
+    REVIEWS_CONFIG_TYPE,
+)
+
+logger = logging.getLogger(__name__)
+
+BUILTIN_EXTRACTORS = {
+    REVIEWS_CONFIG_TYPE: "bert_extractor.extractors.reviews:ReviewsExtractor",
+    NER_CONFIG_TYPE: "bert_extractor.extractors.ner:NERExtractor",
+    LOCAL_CONFIG_TYPE: "bert_extractor.extractors.local:LocalFileExtractor",
+}
+BUILTIN_DATASETS = {
+    REVIEWS_CONFIG_TYPE: "bert_extractor.constants:REVIEWS_DATASET",
+    NER_CONFIG_TYPE: "bert_extractor.constants:NER_KAGGLE_DATASET",
+}
+
+_registered_extractors: Dict[str, Any] = {}
+_registered_datasets: Dict[str, Dict[str, str]] = {}
+
+
+def _load_reference(reference: str) -> Any:
+    """Import the object of a `module:attribute` reference."""
+    module_name, _, attribute = reference.partition(":")
+    return getattr(import_module(module_name), attribute)
+
+
+@lru_cache(maxsize=None)
+def _entry_points(group: str) -> Dict[str, Any]:
+    """Installed entry points of a group, by name, loaded once."""
+    discovered = entry_points()
+    if hasattr(discovered, "select"):
+        group_entry_points = discovered.select(group=group)
+    else:  # pragma: no cover, python < 3.10
+        group_entry_points = discovered.get(group, [])
+
+    return {entry_point.name: entry_point for entry_point in group_entry_points}
+
+
+def register_extractor(name: str, extractor_class: Type):
+    """Register an extractor class, overriding any other with the same name.
+
+    Parameters
+    ----------
+    name : str
+        extractor type, as in the `extractor_type` configuration.
+    extractor_class : Type
+        BaseBERTExtractor sub class.
+    """
+    _registered_extractors[name] = extractor_class
+
+
+def register_datasets(extractor_type: str, datasets: Dict[str, str]):
+    """Register the datasets of an extractor type, adding to the known ones.
+
+    Parameters
+    ----------
+    extractor_type : str
+        extractor type of the datasets.
+    datasets : Dict[str, str]
+        dataset name to its url.
+    """
+    _registered_datasets.setdefault(extractor_type, {}).update(datasets)
+
+
+def extractor_types() -> List[str]:
+    """Names of all the known extractor types."""
+    names = dict.fromkeys(BUILTIN_EXTRACTORS)
+    names.update(dict.fromkeys(_entry_points(EXTRACTORS_ENTRY_POINTS)))
+    names.update(dict.fromkeys(_registered_extractors))
+    return list(names)
+
+
+def get_extractor_class(name: str) -> Type:
+    """Extractor class of an extractor type.
+    The registered classes go first, then the entry points and the built-ins.
+
+    Parameters
+    ----------
+    name : str
+        extractor type.
+
+    Returns
+    -------
+    Type
+        BaseBERTExtractor sub class.
+
+    Raises
+    ------
+    ValueError
+        if the extractor type is unknown.
+    """
+    if name in _registered_extractors:
+        return _registered_extractors[name]
+
+    installed = _entry_points(EXTRACTORS_ENTRY_POINTS)
+    if name in installed:
+        return installed[name].load()
+
+    if name in BUILTIN_EXTRACTORS:
+        return _load_reference(BUILTIN_EXTRACTORS[name])
+
+    error_message = f"Unknown extractor type, knows {extractor_types()}"
+    logger.error(error_message)
+    raise ValueError(error_message)
+
+
+def get_datasets(extractor_type: str) -> Dict[str, str]:
+    """Known datasets of an extractor type, from the built-ins,
+    the entry points and the registered ones.
+
+    Parameters
+    ----------
+    extractor_type : str
+        extractor type.
+
+    Returns
+    -------
+    Dict[str, str]
+        dataset name to its url, empty if the type has no datasets.
+    """
+    datasets: Dict[str, str] = {}
+    if extractor_type in BUILTIN_DATASETS:
+        datasets.update(_load_reference(BUILTIN_DATASETS[extractor_type]))
+
+    installed = _entry_points(DATASETS_ENTRY_POINTS)
+    if extractor_type in installed:
+        datasets.update(installed[extractor_type].load())
+
+    datasets.update(_registered_datasets.get(extractor_type, {}))
+    return datasets
+
+
+def resolve_url(extractor_type: str, extractor_url: str) -> str:
+    """Url to extract the data from, given the configured `extractor_url`.
+
+    Parameters
+    ----------
+    extractor_type : str
+        extractor type.
+    extractor_url : str
+        dataset name, or the url itself for the types without datasets.
+
+    Returns
+    -------
+    str
+        url of the data.
+
+    Raises
+    ------
+    ValueError
+        if the extractor type has datasets and the name is not one of them.
+    """
+    datasets = get_datasets(extractor_type)
+    if not datasets:
+        return extractor_url
+
+    if extractor_url not in datasets:
+        error_message = f"Unknown extractor url, knows {list(datasets)}"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+    return datasets[extractor_url]
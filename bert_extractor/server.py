@@ -0,0 +1,392 @@
+"""Long running extraction server, keeping extractors and tokenizers loaded.
+
+Endpoints:
+    - GET /health: server status.
+    - POST /tokenize: `{"sentences": [...], "config_path": optional}`, the
+      tokenized arrays with the layout of `TokenizedTensor` inputs, as JSON or
+      as npz bytes if the `Accept` header is `application/x-npz`, padded to the
+      `max_length` of the configuration manifest in `output_path` if stored.
+    - POST /extract: `{"config_path": optional, "output_path": "./data/",
+      "codec": optional, "level": optional, "num_shards": optional}`, runs the
+      extraction and returns the stored file path.
+
+Sentences of concurrent /tokenize requests are micro-batched into one
+tokenizer call, waiting at most `max_latency_ms` for the batch to fill.
+
+Invalid bodies and configurations get a 400, failures while tokenizing or
+extracting a 500, both with a JSON `error`.
+
+Usage:
+    $ python -m bert_extractor.server --config_path=config/config_sample_reviews.json
+"""
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import json
+import logging
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import click
+import numpy as np
+
+from bert_extractor.batching import MicroBatcher
+from bert_extractor.configs import read_config
+from bert_extractor.constants import (
+    COMPRESSION_CODECS,
+    MICRO_BATCH_MAX_LATENCY_MS,
+    MICRO_BATCH_MAX_SIZE,
+    NPZ_CONTENT_TYPE,
+    SERVER_HOST,
+    SERVER_MAX_LENGTH,
+    SERVER_OUTPUT_PATH,
+    SERVER_PORT,
+)
+from bert_extractor.extractors.base import BaseBERTExtractor
+from bert_extractor.main import build_extractor, store_name
+from bert_extractor.manifest import MANIFEST_SUFFIX, read_manifest
+from bert_extractor.utils import store_tensor
+
+logger = logging.getLogger(__name__)
+
+
+class LoadedConfig(NamedTuple):
+    """Resident objects of a configuration.
+    Extraction jobs and micro-batches use their own extractor, so they don't
+    share a tokenizer, and the jobs of a configuration run one at a time."""
+
+    configs: Dict
+    url: str
+    extractor: BaseBERTExtractor
+    batcher: MicroBatcher
+    extract_lock: Lock
+
+
+class ExtractionServer(ThreadingHTTPServer):
+    """HTTP server keeping the extractors, tokenizers and micro-batchers
+    of each configuration loaded."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        config_path: str,
+        max_length: int = SERVER_MAX_LENGTH,
+        max_batch_size: int = MICRO_BATCH_MAX_SIZE,
+        max_latency_ms: float = MICRO_BATCH_MAX_LATENCY_MS,
+        output_path: str = SERVER_OUTPUT_PATH,
+    ):
+        """
+        Parameters
+        ----------
+        address : Tuple[str, int]
+            host and port to listen to, port 0 for any free port.
+        config_path : str
+            default configuration, loaded on start.
+        max_length : int
+            padded length of the /tokenize sentences, for the configurations
+            without a stored extraction manifest.
+        max_batch_size : int
+            amount of sentences of a micro-batch.
+        max_latency_ms : float
+            milliseconds a micro-batch waits for more requests.
+        output_path : str
+            default output path of the /extract jobs, where the extraction
+            manifests of the configurations are looked up.
+        """
+        super().__init__(address, ExtractionRequestHandler)
+        self.config_path = config_path
+        self.max_length = max_length
+        self.max_batch_size = max_batch_size
+        self.max_latency_ms = max_latency_ms
+        self.output_path = output_path
+        self._loaded: Dict[str, LoadedConfig] = {}
+        self._load_lock = Lock()
+        self.load(config_path)
+
+    def load(self, config_path: Optional[str] = None) -> LoadedConfig:
+        """Extractors and micro-batcher of a configuration file,
+        loaded on the first use.
+
+        Parameters
+        ----------
+        config_path : Optional[str]
+            configuration file, the default one if None.
+
+        Returns
+        -------
+        LoadedConfig
+            resident objects of the configuration.
+        """
+        config_path = config_path or self.config_path
+        with self._load_lock:
+            if config_path not in self._loaded:
+                configs = read_config(config_path)
+                extractor, url = build_extractor(configs)
+                extractor.load_tokenizer()
+                batch_extractor, _ = build_extractor(configs)
+                batcher = MicroBatcher(
+                    batch_extractor.load_tokenizer(),
+                    self.manifest_max_length(configs, self.output_path),
+                    self.max_batch_size,
+                    self.max_latency_ms,
+                    batch_extractor.token_classification,
+                )
+                self._loaded[config_path] = LoadedConfig(
+                    configs, url, extractor, batcher, Lock()
+                )
+                logger.info("Loaded extractor of %s", config_path)
+
+        return self._loaded[config_path]
+
+    def manifest_max_length(self, configs: Dict, output_path: str) -> int:
+        """Padded length of the extraction of a configuration stored in
+        `output_path`, the server `max_length` if there is no manifest.
+
+        Parameters
+        ----------
+        configs : Dict
+            validated configuration.
+        output_path : str
+            path of the stored extraction.
+
+        Returns
+        -------
+        int
+            padded length of the /tokenize sentences.
+        """
+        manifest_path = Path(output_path) / f"{store_name(configs)}{MANIFEST_SUFFIX}"
+        if not manifest_path.exists():
+            return self.max_length
+
+        return read_manifest(manifest_path)["max_length"]
+
+    def server_close(self):
+        super().server_close()
+        for loaded in self._loaded.values():
+            loaded.batcher.close()
+
+    def extract(self, job: Dict) -> Path:
+        """Run an extraction job with a loaded extractor.
+
+        Parameters
+        ----------
+        job : Dict
+            `config_path`, `output_path`, `codec`, `level` and `num_shards`.
+
+        Returns
+        -------
+        Path
+            path of the stored tensor.
+        """
+        loaded = self.load(job.get("config_path"))
+        output_path = job.get("output_path", self.output_path)
+        with loaded.extract_lock:
+            tensor = loaded.extractor.extract_preprocess(loaded.url)
+
+        filepath = store_tensor(
+            tensor,
+            output_path,
+            store_name(loaded.configs),
+            codec=job.get("codec"),
+            level=job.get("level"),
+            num_shards=job.get("num_shards"),
+            manifest=loaded.extractor.extraction_manifest(tensor),
+        )
+        if Path(output_path) == Path(self.output_path):
+            loaded.batcher.max_length = self.manifest_max_length(
+                loaded.configs, output_path
+            )
+
+        return filepath
+
+
+def check_sentences(sentences: Any, is_split_into_words: bool = False):
+    """Check the sentences of a /tokenize request are a non empty list of
+    strings, or of lists of words for token classification.
+
+    Parameters
+    ----------
+    sentences : Any
+        `sentences` of the request body.
+    is_split_into_words : bool
+        True if each sentence is a list of words.
+
+    Raises
+    ------
+    ValueError
+        if the sentences are not a list of strings or of lists of words, or
+        there are none.
+    """
+
+    def is_sentence(sentence: Any) -> bool:
+        if is_split_into_words:
+            return isinstance(sentence, list) and all(
+                isinstance(word, str) for word in sentence
+            )
+        return isinstance(sentence, str)
+
+    if not isinstance(sentences, list) or not all(map(is_sentence, sentences)):
+        kind = "lists of words" if is_split_into_words else "strings"
+        error_message = f"sentences must be a list of {kind}"
+        logger.error(error_message)
+        raise ValueError(error_message)
+    if not sentences:
+        error_message = "sentences must not be empty"
+        logger.error(error_message)
+        raise ValueError(error_message)
+
+
+class ExtractionRequestHandler(BaseHTTPRequestHandler):
+    """Handle the requests of an `ExtractionServer`."""
+
+    server: ExtractionServer
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        if self.path == "/health":
+            self._send_json({"status": "ok"})
+        else:
+            self._send_json({"error": "not found"}, HTTPStatus.NOT_FOUND)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        try:
+            if self.path not in ("/tokenize", "/extract"):
+                self._send_json({"error": "not found"}, HTTPStatus.NOT_FOUND)
+                return
+            try:
+                body, loaded = self._read_request()
+            except (FileNotFoundError, KeyError, TypeError, ValueError) as error:
+                self._send_json({"error": repr(error)}, HTTPStatus.BAD_REQUEST)
+                return
+
+            if self.path == "/tokenize":
+                self._send_arrays(loaded.batcher.tokenize(body["sentences"]))
+            else:
+                self._send_json({"path": str(self.server.extract(body))})
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Failed request to %s", self.path)
+            self._send_json(
+                {"error": "internal server error"}, HTTPStatus.INTERNAL_SERVER_ERROR
+            )
+
+    def _read_request(self) -> Tuple[Dict, LoadedConfig]:
+        """Body of a request and its loaded configuration, checked before
+        running the request, so their errors are the client ones.
+
+        Returns
+        -------
+        Tuple[Dict, LoadedConfig]
+            - body: JSON body of the request.
+            - loaded: resident objects of its configuration.
+
+        Raises
+        ------
+        ValueError
+            if the body, its sentences or its codec are invalid.
+        """
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if not isinstance(body, dict):
+            error_message = "The body must be a JSON object"
+            logger.error(error_message)
+            raise ValueError(error_message)
+
+        loaded = self.server.load(body.get("config_path"))
+        if self.path == "/tokenize":
+            check_sentences(body["sentences"], loaded.batcher.is_split_into_words)
+        elif body.get("codec") not in [None, *COMPRESSION_CODECS]:
+            error_message = f"Unknown codec {body['codec']}, knows {COMPRESSION_CODECS}"
+            logger.error(error_message)
+            raise ValueError(error_message)
+
+        return body, loaded
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        logger.debug(format, *args)
+
+    def _send_arrays(self, arrays: Dict[str, np.ndarray]):
+        """Send the arrays as npz if accepted, as JSON if not."""
+        if self.headers.get("Accept") != NPZ_CONTENT_TYPE:
+            self._send_json({key: value.tolist() for key, value in arrays.items()})
+            return
+
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        self._send(buffer.getvalue(), NPZ_CONTENT_TYPE)
+
+    def _send_json(self, content: Dict, status: HTTPStatus = HTTPStatus.OK):
+        self._send(json.dumps(content).encode(), "application/json", status)
+
+    def _send(
+        self, body: bytes, content_type: str, status: HTTPStatus = HTTPStatus.OK
+    ):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@click.command()
+@click.option(
+    "--config_path",
+    type=click.STRING,
+    help="Path to the default config file",
+    default="./config/config_sample_reviews.json",
+)
+@click.option("--host", type=click.STRING, default=SERVER_HOST, help="Host")
+@click.option("--port", type=click.INT, default=SERVER_PORT, help="Port")
+@click.option(
+    "--output_path",
+    type=click.STRING,
+    default=SERVER_OUTPUT_PATH,
+    help="Default path of the extract jobs, with the manifests of the tokenize jobs",
+)
+@click.option(
+    "--max_length",
+    type=click.INT,
+    default=SERVER_MAX_LENGTH,
+    help="Padded length of the tokenized sentences",
+)
+@click.option(
+    "--max_batch_size",
+    type=click.INT,
+    default=MICRO_BATCH_MAX_SIZE,
+    help="Sentences of a micro-batch",
+)
+@click.option(
+    "--max_latency_ms",
+    type=click.FLOAT,
+    default=MICRO_BATCH_MAX_LATENCY_MS,
+    help="Milliseconds a micro-batch waits for more requests",
+)
+def main(
+    config_path: str,
+    host: str,
+    port: int,
+    output_path: str,
+    max_length: int,
+    max_batch_size: int,
+    max_latency_ms: float,
+):
+    """Serve tokenize and extract jobs until interrupted."""
+    server = ExtractionServer(
+        (host, port),
+        config_path,
+        max_length,
+        max_batch_size,
+        max_latency_ms,
+        output_path,
+    )
+    click.echo(f"Serving on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
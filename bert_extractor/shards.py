@@ -0,0 +1,228 @@
+"""Sharded storage of tokenized tensors for distributed training readers.
+
+Each split is written into fixed-size shards, every shard is a self-describing
+`bert_extractor.compression` file with the arrays `input_ids`,
+`attention_mask`, ..., and `labels`, the `lengths` instead of the rebuilt
+inputs for compact tensors. An index file keeps the rows and offset of each
+shard, so a worker can open only its shards or any global row.
+"""
+import json
+import logging
+import math
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+import numpy as np
+
+from bert_extractor.compact import expand_arrays, stored_arrays
+from bert_extractor.compression import CompressedTensorReader, write_compressed
+from bert_extractor.extractors.base import TokenizedTensor
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+LABELS_KEY = "labels"
+SPLITS = {
+    "train": ("train_inputs", "train_labels"),
+    "validation": ("validation_inputs", "validation_labels"),
+}
+
+
+def write_shards(
+    tensor: TokenizedTensor,
+    output_path: Union[str, os.PathLike],
+    name: str,
+    num_shards: int,
+    codec: str = "none",
+    level: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> Path:
+    """Write each split of the tensor into `num_shards` fixed-size shards
+    and an index file with the rows and offsets of each shard.
+
+    Parameters
+    ----------
+    tensor : TokenizedTensor
+        Tensor processed and ready to use with BERT.
+    output_path : Union[str, os.PathLike]
+        directory to store the shards and the index.
+    name : str
+        prefix of the stored files names.
+    num_shards : int
+        amount of shards of each split.
+    codec : str
+        compression codec of the shards, one of `COMPRESSION_CODECS`.
+    level : Optional[int]
+        compression level, the codec default if None.
+    workers : Optional[int]
+        amount of threads to compress with, all the cores if None.
+
+    Returns
+    -------
+    Path
+        path of the index file.
+
+    Raises
+    ------
+    ValueError
+        if num_shards is not positive.
+    """
+    if num_shards < 1:
+        error = f"num_shards has to be positive, got {num_shards}"
+        logger.error(error)
+        raise ValueError(error)
+
+    output_path = Path(output_path)
+    Path.mkdir(output_path, exist_ok=True, parents=True)
+    index: Dict = {"version": INDEX_VERSION, "codec": codec, "splits": {}}
+
+    for split, (inputs_field, labels_field) in SPLITS.items():
+        arrays = {
+            key: np.asarray(value)
+            for key, value in stored_arrays(getattr(tensor, inputs_field)).items()
+        }
+        arrays[LABELS_KEY] = np.asarray(getattr(tensor, labels_field))
+        rows = len(arrays[LABELS_KEY])
+        shard_rows = max(math.ceil(rows / num_shards), 1)
+
+        shards = []
+        for shard in range(num_shards):
+            offset = min(shard * shard_rows, rows)
+            stop = min(offset + shard_rows, rows)
+            filename = f"{name}_{split}_{shard:05d}-of-{num_shards:05d}.{codec}"
+            write_compressed(
+                {key: array[offset:stop] for key, array in arrays.items()},
+                output_path / filename,
+                codec=codec,
+                level=level,
+                workers=workers,
+            )
+            shards.append({"file": filename, "rows": stop - offset, "offset": offset})
+
+        index["splits"][split] = {
+            "rows": rows,
+            "shard_rows": shard_rows,
+            "keys": list(arrays),
+            "shards": shards,
+        }
+
+    index_filepath = output_path / f"{name}_bert_extraction_index.json"
+    with open(index_filepath, "w") as file:
+        json.dump(index, file, indent=2)
+
+    logger.info("Stored %s shards per split, index in: %s", num_shards, index_filepath)
+    return index_filepath
+
+
+class ShardedTensorReader:
+    """Read shards written by `write_shards` through its index file."""
+
+    def __init__(self, index_path: Union[str, os.PathLike]):
+        """
+        Parameters
+        ----------
+        index_path : Union[str, os.PathLike]
+            path of the index file.
+        """
+        self.index_path = Path(index_path)
+        with open(self.index_path, "r") as file:
+            self.index = json.load(file)
+        self._readers: Dict[str, CompressedTensorReader] = {}
+
+    def __enter__(self) -> "ShardedTensorReader":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Release the opened shards."""
+        for reader in self._readers.values():
+            reader.close()
+        self._readers = {}
+
+    @property
+    def splits(self) -> List[str]:
+        """Names of the stored splits."""
+        return list(self.index["splits"])
+
+    def num_rows(self, split: str) -> int:
+        """Amount of rows of the split."""
+        return self.index["splits"][split]["rows"]
+
+    def num_shards(self, split: str) -> int:
+        """Amount of shards of the split."""
+        return len(self.index["splits"][split]["shards"])
+
+    def shards_for(self, split: str, rank: int, world_size: int) -> List[int]:
+        """Shards a worker has to read, assigned round robin.
+
+        Parameters
+        ----------
+        split : str
+            split name, `train` or `validation`.
+        rank : int
+            rank of the worker.
+        world_size : int
+            amount of workers.
+
+        Returns
+        -------
+        List[int]
+            shards indexes of the worker.
+        """
+        return list(range(rank, self.num_shards(split), world_size))
+
+    def _reader(self, split: str, shard: int) -> CompressedTensorReader:
+        """Open a shard only once."""
+        filename = self.index["splits"][split]["shards"][shard]["file"]
+        if filename not in self._readers:
+            self._readers[filename] = CompressedTensorReader(
+                self.index_path.parent / filename
+            )
+        return self._readers[filename]
+
+    def read_shard(self, split: str, shard: int) -> Dict[str, np.ndarray]:
+        """Read all the arrays of a shard, with the compacted inputs rebuilt."""
+        return expand_arrays(self._reader(split, shard).to_arrays())
+
+    def iter_rank(
+        self, split: str, rank: int, world_size: int
+    ) -> Iterator[Dict[str, np.ndarray]]:
+        """Yield the arrays of each shard of a worker."""
+        for shard in self.shards_for(split, rank, world_size):
+            yield self.read_shard(split, shard)
+
+    def row(self, split: str, global_row: int) -> Dict[str, np.ndarray]:
+        """Read any row of the split, only decompressing its chunk.
+
+        Parameters
+        ----------
+        split : str
+            split name, `train` or `validation`.
+        global_row : int
+            row number in the whole split.
+
+        Returns
+        -------
+        Dict[str, np.ndarray]
+            arrays of the row.
+
+        Raises
+        ------
+        IndexError
+            if the row is out of the split.
+        """
+        meta = self.index["splits"][split]
+        if not 0 <= global_row < meta["rows"]:
+            raise IndexError(f"Row {global_row} out of split {split}")
+
+        shard = global_row // meta["shard_rows"]
+        local_row = global_row - meta["shards"][shard]["offset"]
+        reader = self._reader(split, shard)
+
+        arrays = expand_arrays(
+            {key: reader.read(key, local_row, local_row + 1) for key in meta["keys"]}
+        )
+        return {key: array[0] for key, array in arrays.items()}
@@ -1,12 +1,16 @@
 """Utils"""
-from functools import wraps
-from hashlib import sha256
+from functools import partial, wraps
 import logging
 from pathlib import Path
 import pickle
-from typing import Any, Union
+from typing import Any, Dict, Optional, Union
 
+from bert_extractor.cache import raw_entry_path
+from bert_extractor.cache_store import read_entry, write_entry
+from bert_extractor.compression import tensor_to_arrays, write_compressed
 from bert_extractor.extractors.base import TokenizedTensor
+from bert_extractor.manifest import write_manifest
+from bert_extractor.shards import write_shards
 
 logger = logging.getLogger(__name__)
 
@@ -21,18 +25,21 @@ def cache_extract_raw():
 
         @wraps(function)
         def wrapper(*args):
-            cache_path = args[0].cache_path
             cache_read = args[0].read_cache
-            hashed_name = sha256((args[1]).encode()).hexdigest()
-            filepath = Path(cache_path) / f"{hashed_name}.pkl"
+            filepath = raw_entry_path(args[0], args[1])
+            extractor_name = type(args[0]).__name__
 
             if cache_read and filepath.exists():
-                result = from_pickle(filepath)
+                result = read_entry(filepath, pickle.load, args[1], extractor_name)
                 logger.info("Using cached model: %s.", filepath)
             else:
                 result = function(*args)
-                Path.mkdir(Path(cache_path), exist_ok=True, parents=True)
-                to_pickle(filepath, result)
+                write_entry(
+                    filepath,
+                    partial(pickle.dump, result, protocol=pickle.HIGHEST_PROTOCOL),
+                    args[1],
+                    extractor_name,
+                )
                 logger.info("Cached model to: %s.", filepath)
             return result
 
@@ -56,8 +63,21 @@ def from_pickle(filepath: Union[str, Path]):
     return result
 
 
-def store_tensor(tensor: TokenizedTensor, output_path: str, name: str):
+def store_tensor(
+    tensor: TokenizedTensor,
+    output_path: str,
+    name: str,
+    codec: Optional[str] = None,
+    level: Optional[int] = None,
+    workers: Optional[int] = None,
+    num_shards: Optional[int] = None,
+    manifest: Optional[Dict] = None,
+) -> Path:
     """Store the output into a pickle object in the given path.
+    If a codec is given store it as a chunked compressed file instead,
+    read it back with `bert_extractor.compression.CompressedTensorReader`.
+    If num_shards is given store each split in shards plus an index file,
+    read them back with `bert_extractor.shards.ShardedTensorReader`.
 
     Parameters
     ----------
@@ -65,8 +85,50 @@ def store_tensor(tensor: TokenizedTensor, output_path: str, name: str):
         Tensor processed and ready to use with BERT.
     output_path : str
         path to store the pickled object.
+    name : str
+        prefix of the stored file name.
+    codec : Optional[str]
+        compression codec, one of `COMPRESSION_CODECS`, None to pickle.
+    level : Optional[int]
+        compression level, the codec default if None.
+    workers : Optional[int]
+        amount of threads to compress with, all the cores if None.
+    num_shards : Optional[int]
+        amount of shards of each split, None to store a single file.
+    manifest : Optional[Dict]
+        extraction manifest to store next to the output, with its file name.
+
+    Returns
+    -------
+    Path
+        path of the stored file, the index file if sharded.
     """
     Path.mkdir(Path(output_path), exist_ok=True, parents=True)
 
-    output_filepath = Path(output_path) / f"{name}_bert_extraction_tensor.pkl"
-    to_pickle(output_filepath, tensor)
+    if num_shards is not None:
+        output_filepath = write_shards(
+            tensor,
+            output_path,
+            name,
+            num_shards,
+            codec=codec or "none",
+            level=level,
+            workers=workers,
+        )
+    elif codec is None:
+        output_filepath = Path(output_path) / f"{name}_bert_extraction_tensor.pkl"
+        to_pickle(output_filepath, tensor)
+    else:
+        output_filepath = Path(output_path) / f"{name}_bert_extraction_tensor.{codec}"
+        write_compressed(
+            tensor_to_arrays(tensor),
+            output_filepath,
+            codec=codec,
+            level=level,
+            workers=workers,
+        )
+
+    if manifest is not None:
+        write_manifest({**manifest, "output": output_filepath.name}, output_path, name)
+
+    return output_filepath
@@ -0,0 +1,296 @@
+"""Word-piece index of the distinct words of a pre-split corpus, to encode
+token classification sentences without sending every word to the tokenizer.
+
+CoNLL like corpora repeat a small vocabulary: each distinct word is tokenized
+once, and the encoded sentences are assembled from the word-piece ids of their
+words with offsets arithmetic. It gives the same outputs as the tokenizer with
+`is_split_into_words`, for tokenizers that pre-tokenize each word on its own,
+such as the WordPiece (BERT) and byte level BPE (RoBERTa) ones.
+"""
+from hashlib import sha256
+import logging
+import os
+from pathlib import Path
+from threading import Lock
+from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from transformers.tokenization_utils_base import BatchEncoding, PreTrainedTokenizerBase
+
+from bert_extractor.cache_store import read_entry, write_entry
+from bert_extractor.constants import SPECIAL_TOKEN_WORD_ID
+from bert_extractor.ragged import RaggedArray, StringBuffer
+
+logger = logging.getLogger(__name__)
+
+
+def tokenizer_key(tokenizer: PreTrainedTokenizerBase) -> str:
+    """Hash of the tokenizer vocabulary and configuration, the word-piece ids
+    of a word change with any of them.
+
+    Parameters
+    ----------
+    tokenizer : PreTrainedTokenizerBase
+        tokenizer of the index.
+
+    Returns
+    -------
+    str
+        hex digest.
+    """
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is not None:
+        description = backend.to_str()
+    else:
+        description = repr(sorted(tokenizer.get_vocab().items()))
+    description += repr((type(tokenizer).__name__, tokenizer.all_special_ids))
+    return sha256(description.encode()).hexdigest()
+
+
+def _as_ragged(sentences: Union[RaggedArray, Sequence[Sequence[str]]]) -> RaggedArray:
+    """Sentences as a ragged array of words."""
+    if isinstance(sentences, RaggedArray):
+        return sentences
+    return RaggedArray.from_lists(sentences, dtype=str)
+
+
+class WordIndex:
+    """Word-piece ids of each distinct word, grown with the unknown words of
+    each encoded batch."""
+
+    def __init__(
+        self,
+        tokenizer: PreTrainedTokenizerBase,
+        words: Sequence[str] = (),
+        pieces: Optional[RaggedArray] = None,
+    ):
+        """
+        Parameters
+        ----------
+        tokenizer : PreTrainedTokenizerBase
+            tokenizer to encode like, padding and truncating on the right.
+        words : Sequence[str]
+            distinct words already indexed.
+        pieces : Optional[RaggedArray]
+            word-piece ids of each word, without special tokens.
+
+        Raises
+        ------
+        ValueError
+            if the tokenizer pads or truncates on the left.
+        """
+        if tokenizer.padding_side != "right" or tokenizer.truncation_side != "right":
+            error_message = "The word index only pads and truncates on the right"
+            logger.error(error_message)
+            raise ValueError(error_message)
+
+        self.tokenizer = tokenizer
+        self.words: List[str] = list(words)
+        self.lookup: Dict[str, int] = {word: i for i, word in enumerate(self.words)}
+        if pieces is None:
+            pieces = RaggedArray(np.zeros(0, np.int64), np.zeros(1, np.int64))
+        self.pieces = pieces
+        self.prefix, self.suffix = self._special_tokens()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def _special_tokens(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Special tokens ids added before and after the words of a sentence."""
+        encoded = self.tokenizer([["a"]], is_split_into_words=True)
+        ids = encoded["input_ids"][0]
+        word_ids = encoded.word_ids(0)
+        first = next(i for i, word_id in enumerate(word_ids) if word_id is not None)
+        last = max(i for i, word_id in enumerate(word_ids) if word_id is not None)
+        return np.array(ids[:first], np.int64), np.array(ids[last + 1 :], np.int64)
+
+    def add(self, words: Sequence[str]):
+        """Tokenize and index the words not in the index yet.
+
+        Parameters
+        ----------
+        words : Sequence[str]
+            words to index, possibly repeated.
+        """
+        with self._lock:
+            new_words = list(dict.fromkeys(w for w in words if w not in self.lookup))
+            if not new_words:
+                return
+
+            encoded = self.tokenizer(
+                [[word] for word in new_words],
+                add_special_tokens=False,
+                return_attention_mask=False,
+                return_token_type_ids=False,
+                is_split_into_words=True,
+            )["input_ids"]
+            new_pieces = RaggedArray.from_lists(encoded, dtype=np.int64)
+            offsets = np.concatenate(
+                [self.pieces.offsets, self.pieces.offsets[-1] + new_pieces.offsets[1:]]
+            )
+            values = np.concatenate([self.pieces.values, new_pieces.values])
+            for word in new_words:
+                self.lookup[word] = len(self.words)
+                self.words.append(word)
+            self.pieces = RaggedArray(values.astype(np.int64), offsets)
+
+    def _word_pieces(self, words: Sequence[str]) -> Tuple[np.ndarray, RaggedArray]:
+        """Index of each word, and the pieces they index."""
+        self.add(words)
+        with self._lock:
+            lookup, pieces = self.lookup, self.pieces
+            indexes = np.fromiter(
+                (lookup[word] for word in words), dtype=np.int64, count=len(words)
+            )
+        return indexes, pieces
+
+    def lengths(
+        self, sentences: Union[RaggedArray, Sequence[Sequence[str]]]
+    ) -> np.ndarray:
+        """Length of each encoded sentence, special tokens included, untruncated.
+
+        Parameters
+        ----------
+        sentences : Union[RaggedArray, Sequence[Sequence[str]]]
+            words of each sentence.
+
+        Returns
+        -------
+        np.ndarray
+            int64 lengths.
+        """
+        sentences = _as_ragged(sentences)
+        indexes, pieces = self._word_pieces(sentences.values.tolist())
+        counts = np.zeros(len(indexes) + 1, dtype=np.int64)
+        np.cumsum(pieces.lengths[indexes], out=counts[1:])
+        return np.diff(counts[sentences.offsets]) + len(self.prefix) + len(self.suffix)
+
+    def encode(
+        self, sentences: Union[RaggedArray, Sequence[Sequence[str]]], max_length: int
+    ) -> BatchEncoding:
+        """Encode sentences like the tokenizer with `is_split_into_words`,
+        `padding="max_length"`, `truncation=True` and numpy tensors.
+
+        Parameters
+        ----------
+        sentences : Union[RaggedArray, Sequence[Sequence[str]]]
+            words of each sentence.
+        max_length : int
+            length to pad and truncate the sentences to.
+
+        Returns
+        -------
+        BatchEncoding
+            the tokenizer model inputs, plus the `word_ids` matrix,
+            `SPECIAL_TOKEN_WORD_ID` for special and padding tokens.
+        """
+        sentences = _as_ragged(sentences)
+        rows = len(sentences)
+        indexes, pieces = self._word_pieces(sentences.values.tolist())
+
+        # Tokens of each word occurrence, and their start in the flat tokens.
+        counts = pieces.lengths[indexes]
+        token_offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=token_offsets[1:])
+        total = token_offsets[-1]
+        flat_ids = pieces.values[
+            np.repeat(pieces.offsets[indexes] - token_offsets[:-1], counts)
+            + np.arange(total)
+        ]
+        word_positions = np.arange(len(indexes)) - np.repeat(
+            sentences.offsets[:-1], sentences.lengths
+        )
+        flat_word_ids = np.repeat(word_positions, counts)
+
+        # Row and column of each token, truncated to the room left by the
+        # special tokens.
+        sentence_offsets = token_offsets[sentences.offsets]
+        lengths = np.diff(sentence_offsets)
+        token_rows = np.repeat(np.arange(rows), lengths)
+        columns = np.arange(total) - np.repeat(sentence_offsets[:-1], lengths)
+        room = max(max_length - len(self.prefix) - len(self.suffix), 0)
+        keep = columns < room
+        token_rows, columns = token_rows[keep], columns[keep] + len(self.prefix)
+        kept = np.minimum(lengths, room)
+
+        input_ids = np.full((rows, max_length), self.tokenizer.pad_token_id, np.int64)
+        word_ids = np.full((rows, max_length), SPECIAL_TOKEN_WORD_ID, np.int64)
+        input_ids[:, : len(self.prefix)] = self.prefix
+        input_ids[token_rows, columns] = flat_ids[keep]
+        word_ids[token_rows, columns] = flat_word_ids[keep]
+        suffix_columns = len(self.prefix) + kept[:, None] + np.arange(len(self.suffix))
+        input_ids[np.arange(rows)[:, None], suffix_columns] = self.suffix
+
+        sizes = len(self.prefix) + kept + len(self.suffix)
+        attention_mask = (np.arange(max_length) < sizes[:, None]).astype(np.int64)
+        encoded = {"input_ids": input_ids}
+        if "token_type_ids" in self.tokenizer.model_input_names:
+            encoded["token_type_ids"] = np.where(
+                attention_mask, 0, self.tokenizer.pad_token_type_id
+            )
+        if "attention_mask" in self.tokenizer.model_input_names:
+            encoded["attention_mask"] = attention_mask
+        encoded["word_ids"] = word_ids
+        return BatchEncoding(encoded)
+
+    def save(self, filepath: Union[str, os.PathLike], extractor: Optional[str] = None):
+        """Write the index as a npz cache entry.
+
+        Parameters
+        ----------
+        filepath : Union[str, os.PathLike]
+            path of the entry.
+        extractor : Optional[str]
+            name of the extractor that wrote it.
+        """
+        words = StringBuffer.from_strings(self.words)
+        with self._lock:
+            pieces = self.pieces
+
+        def write(file: BinaryIO):
+            np.savez(
+                file,
+                words_data=words.data,
+                words_offsets=words.offsets,
+                pieces_values=pieces.values,
+                pieces_offsets=pieces.offsets,
+            )
+
+        Path(filepath).parent.mkdir(parents=True, exist_ok=True)
+        write_entry(filepath, write, extractor=extractor)
+        logger.info("Saved the index of %s words to %s", len(words), filepath)
+
+    @classmethod
+    def load(
+        cls,
+        filepath: Union[str, os.PathLike],
+        tokenizer: PreTrainedTokenizerBase,
+        extractor: Optional[str] = None,
+    ) -> "WordIndex":
+        """Read an index written by `save`.
+
+        Parameters
+        ----------
+        filepath : Union[str, os.PathLike]
+            path of the entry.
+        tokenizer : PreTrainedTokenizerBase
+            tokenizer the index was built with.
+        extractor : Optional[str]
+            name of the extractor reading it.
+
+        Returns
+        -------
+        WordIndex
+            the index.
+        """
+
+        def read(file: BinaryIO) -> Dict[str, np.ndarray]:
+            with np.load(file) as arrays:
+                return dict(arrays)
+
+        arrays = read_entry(filepath, read, extractor=extractor)
+        words = StringBuffer(arrays["words_data"], arrays["words_offsets"])
+        pieces = RaggedArray(arrays["pieces_values"], arrays["pieces_offsets"])
+        logger.info("Loaded the index of %s words from %s", len(words), filepath)
+        return cls(tokenizer, words.tolist(), pieces)
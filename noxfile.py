@@ -16,6 +16,17 @@ def tests(session):
     session.run(*cmd)
 
 
+@nox.session(reuse_venv=True, python="3.8")
+def performance(session):
+    """Run the performance tests against the stored baselines, one at a time."""
+    session.install("poetry")
+    session.run("poetry", "install")
+
+    cmd = ["poetry", "run", "pytest", "tests/performance", "-p", "no:xdist"]
+    cmd.extend(session.posargs)
+    session.run(*cmd, env={"BERT_EXTRACTOR_PERFORMANCE": "check"})
+
+
 @nox.session(reuse_venv=True, python="3.8")
 def lint(session):
     """Run all pre-commit hooks."""
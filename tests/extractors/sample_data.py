@@ -1,5 +1,9 @@
 """Bert Data Extractor"""
 
+from pathlib import Path
+from types import SimpleNamespace
+import zipfile
+
 import pytest
 
 
@@ -125,3 +129,82 @@ JAPAN NNP B-NP B-LOC
 WIN NNP I-NP O
 , , O O"""
     return text
+
+
+@pytest.fixture(scope="session")
+def bert_vocab_path(tmp_path_factory):
+    """Local BERT tokenizer, so tests don't need to download one."""
+    path = tmp_path_factory.mktemp("bert_vocab")
+    vocab = [
+        "[PAD]",
+        "[UNK]",
+        "[CLS]",
+        "[SEP]",
+        "[MASK]",
+        "soccer",
+        "japan",
+        "win",
+        ",",
+        ".",
+        ":",
+        "five",
+        "stars",
+        "as",
+        "advert",
+        "##ised",
+        "good",
+        "for",
+        "the",
+        "face",
+        "i",
+        "have",
+        "dry",
+        "skin",
+        "ja",
+        "##pan",
+    ]
+    (path / "vocab.txt").write_text("\n".join(vocab))
+    (path / "tokenizer_config.json").write_text(
+        '{"tokenizer_class": "BertTokenizer", "do_lower_case": true, '
+        '"model_max_length": 512}'
+    )
+    return str(path)
+
+
+@pytest.fixture
+def local_extractor_configs(extractor_configs, bert_vocab_path):
+    return {**extractor_configs, "pretrained_model_name_or_path": bert_vocab_path}
+
+
+class FakeKaggleApi:
+    """Local fake of the KaggleApi client, serving a zip of CoNLL files."""
+
+    def __init__(self, text):
+        self.text = text
+        self.downloads = 0
+        self.creation_date = "2020-01-01"
+
+    def authenticate(self):
+        pass
+
+    def dataset_list_files(self, dataset):
+        files = [
+            SimpleNamespace(
+                name="archive.zip",
+                totalBytes=len(self.text),
+                creationDate=self.creation_date,
+            )
+        ]
+        return SimpleNamespace(files=files)
+
+    def dataset_download_files(self, dataset, path=None, unzip=False):
+        self.downloads += 1
+        zip_path = Path(path) / f"{dataset.split('/')[-1]}.zip"
+        with zipfile.ZipFile(zip_path, "w") as archive:
+            for split in ["train", "valid", "test"]:
+                archive.writestr(f"conll/{split}.txt", self.text)
+
+
+@pytest.fixture
+def fake_kaggle_api(ner_txt_sample):
+    return FakeKaggleApi(ner_txt_sample)
@@ -1,10 +1,17 @@
 """BaseBERTExtractor tests"""
 
+import gc
+
 import numpy as np
 import pytest
 
 from bert_extractor.extractors.base import BaseBERTExtractor
-from tests.extractors.sample_data import extractor_configs, sample_preprocessed
+from tests.extractors.sample_data import (
+    bert_vocab_path,
+    extractor_configs,
+    local_extractor_configs,
+    sample_preprocessed,
+)
 
 
 def test_bert_tokenizer_output(extractor_configs, sample_preprocessed):
@@ -38,3 +45,214 @@ def test_bert_tokenizer_model_name(extractor_configs, sample_preprocessed):
 
     with pytest.raises(OSError):
         _ = base.bert_tokenizer(*sample_preprocessed)
+
+
+def test_bert_tokenizer_external_split(local_extractor_configs, sample_preprocessed):
+    """Test the external split tokenize every sentence with the same length."""
+    base = BaseBERTExtractor(
+        **local_extractor_configs, split_strategy="external", split_test_size=0.5
+    )
+    tensor = base.bert_tokenizer(*sample_preprocessed)
+
+    rows = len(tensor.train_labels) + len(tensor.validation_labels)
+    assert rows == len(sample_preprocessed[0])
+    assert (
+        tensor.train_inputs["input_ids"].shape[1]
+        == tensor.validation_inputs["input_ids"].shape[1]
+    )
+
+
+def test_tokenize_split_batches(local_extractor_configs, sample_preprocessed):
+    """Test tokenizing by small batches in a thread pool gives the same arrays
+    as one tokenizer call over all the sentences."""
+    base = BaseBERTExtractor(
+        **local_extractor_configs, tokenize_batch_size=1, tokenize_workers=3
+    )
+    tokenizer = base.load_tokenizer()
+    sentences, labels = sample_preprocessed
+    lengths = base._token_lengths(sentences, tokenizer)
+    max_length = base.get_max_length(lengths, tokenizer)
+
+    tokenized, processed_labels = base._tokenize_split(
+        sentences, labels, max_length, tokenizer
+    )
+    expected = tokenizer(
+        sentences, max_length=max_length, padding="max_length", return_tensors="np"
+    )
+
+    assert list(base._token_lengths(sentences, tokenizer)) == [
+        len(tokenizer.encode(sentence)) for sentence in sentences
+    ]
+    for key, value in expected.items():
+        assert np.array_equal(tokenized[key], value)
+    assert np.array_equal(processed_labels, np.array(labels))
+
+
+def test_bert_tokenizer_hash_split(local_extractor_configs, sample_preprocessed):
+    """Test the hash split keeps each sentence in its split when rows are added."""
+    sentences, labels = sample_preprocessed
+    base = BaseBERTExtractor(
+        **local_extractor_configs, split_strategy="hash", split_test_size=0.5
+    )
+    tensor = base.bert_tokenizer(sentences, labels)
+    train_index, val_index = base._split_indexes(sentences)
+    appended_train, appended_val = base._split_indexes(sentences + ["new review"])
+
+    assert len(tensor.train_labels) == len(train_index)
+    assert len(tensor.validation_labels) == len(val_index)
+    assert set(train_index) <= set(appended_train)
+    assert set(val_index) <= set(appended_val)
+
+
+@pytest.mark.parametrize("split_strategy", ["random", "external"])
+def test_bert_tokenizer_spills_over_budget(
+    local_extractor_configs, sample_preprocessed, split_strategy, tmp_path
+):
+    """Test the outputs over the memory budget are memory-mapped files
+    with the same arrays as the in-memory outputs, removed by split once
+    their arrays are garbage collected."""
+    configs = {
+        **local_extractor_configs,
+        "split_strategy": split_strategy,
+        "split_test_size": 0.5,
+        "cache_path": tmp_path,
+    }
+    sentences, labels = sample_preprocessed
+    sentences, labels = sentences * 8, labels * 8
+    expected = BaseBERTExtractor(**configs).bert_tokenizer(sentences, labels)
+    tensor = BaseBERTExtractor(**configs, tokenize_memory_budget=1).bert_tokenizer(
+        sentences, labels
+    )
+
+    assert isinstance(tensor.train_inputs["input_ids"], np.memmap)
+    assert isinstance(tensor.validation_labels, np.memmap)
+    assert len(list((tmp_path / "spill").glob("*/*/*.npy"))) == 8
+    for split in ("train_inputs", "validation_inputs"):
+        for key, value in getattr(expected, split).items():
+            assert np.array_equal(getattr(tensor, split)[key], value)
+    assert np.array_equal(tensor.train_labels, expected.train_labels)
+
+    labels = tensor.train_labels[1:]
+    del tensor
+    gc.collect()
+    assert len(list((tmp_path / "spill").glob("*/*/*.npy"))) == 4
+    del labels
+    gc.collect()
+    assert list((tmp_path / "spill").iterdir()) == []
+
+
+def test_bert_tokenizer_under_budget(local_extractor_configs, sample_preprocessed):
+    """Test the outputs under the memory budget stay in memory."""
+    base = BaseBERTExtractor(**local_extractor_configs, tokenize_memory_budget=2 ** 30)
+    tensor = base.bert_tokenizer(*sample_preprocessed)
+
+    assert not isinstance(tensor.train_inputs["input_ids"], np.memmap)
+
+
+@pytest.mark.parametrize(
+    "split_strategy, tokenize_memory_budget",
+    [("random", None), ("external", None), ("random", 1)],
+)
+def test_bert_tokenizer_compact_inputs(
+    local_extractor_configs,
+    sample_preprocessed,
+    split_strategy,
+    tokenize_memory_budget,
+    tmp_path,
+):
+    """Test the compact inputs keep only the input ids and the lengths, and
+    rebuild the same inputs as the full ones."""
+    configs = {
+        **local_extractor_configs,
+        "split_strategy": split_strategy,
+        "split_test_size": 0.5,
+        "cache_path": tmp_path,
+        "keep_word_ids": True,
+    }
+    sentences, labels = sample_preprocessed
+    sentences, labels = sentences * 8, labels * 8
+    expected = BaseBERTExtractor(**configs).bert_tokenizer(sentences, labels)
+    tensor = BaseBERTExtractor(
+        **configs, compact_inputs=True, tokenize_memory_budget=tokenize_memory_budget
+    ).bert_tokenizer(sentences, labels)
+
+    assert set(tensor.train_inputs.arrays) == {"input_ids", "word_ids", "lengths"}
+    for split in ("train_inputs", "validation_inputs"):
+        inputs = getattr(tensor, split)
+        assert list(inputs.keys()) == list(getattr(expected, split).keys())
+        for key, value in getattr(expected, split).items():
+            assert np.array_equal(inputs[key], value), key
+    assert np.array_equal(tensor.train_labels, expected.train_labels)
+
+
+def test_unknown_split_strategy(extractor_configs):
+    """Test an unknown split strategy raises."""
+    with pytest.raises(ValueError):
+        BaseBERTExtractor(**extractor_configs, split_strategy="unknown")
+
+
+def test_bert_tokenizer_drops_encodings(local_extractor_configs, sample_preprocessed):
+    """Test the inputs are contiguous arrays without the tokenizer encodings,
+    and the word ids are kept if asked."""
+    base = BaseBERTExtractor(**local_extractor_configs, keep_word_ids=True)
+    tensor = base.bert_tokenizer(*sample_preprocessed)
+
+    assert tensor.train_inputs.encodings is None
+    assert tensor.train_inputs["input_ids"].flags["C_CONTIGUOUS"]
+    word_ids = tensor.train_inputs["word_ids"]
+    assert word_ids.shape == tensor.train_inputs["input_ids"].shape
+    assert word_ids[0, 0] == -1
+
+
+def test_tensor_to_arrow(local_extractor_configs, sample_preprocessed):
+    """Test each split is converted to a record batch with a column per array."""
+    pytest.importorskip("pyarrow")
+    base = BaseBERTExtractor(**local_extractor_configs, split_test_size=0.5)
+    tensor = base.bert_tokenizer(*sample_preprocessed)
+
+    batches = tensor.to_arrow()
+
+    assert batches["train"].num_rows == len(tensor.train_labels)
+    assert set(batches["validation"].schema.names) == {
+        *tensor.validation_inputs.keys(),
+        "labels",
+    }
+    np.testing.assert_array_equal(
+        np.stack(batches["train"]["input_ids"].to_numpy(zero_copy_only=False)),
+        tensor.train_inputs["input_ids"],
+    )
+
+
+def test_tensor_to_unknown_framework(local_extractor_configs, sample_preprocessed):
+    """Test an unknown framework raises."""
+    base = BaseBERTExtractor(**local_extractor_configs)
+    tensor = base.bert_tokenizer(*sample_preprocessed)
+
+    with pytest.raises(ValueError):
+        tensor.to_framework("mxnet")
+
+
+def test_tokenize_for_inference(local_extractor_configs, sample_preprocessed):
+    """Test texts are tokenized with the max length of the extraction manifest,
+    single texts or batches."""
+    base = BaseBERTExtractor(**local_extractor_configs)
+    tensor = base.bert_tokenizer(*sample_preprocessed)
+    manifest = base.extraction_manifest(tensor)
+    max_length = tensor.train_inputs["input_ids"].shape[1]
+
+    with pytest.raises(ValueError):
+        base.tokenize_for_inference("soccer")
+
+    single = base.tokenize_for_inference("soccer japan", manifest)
+    batch = base.tokenize_for_inference(["soccer japan", "win"])
+
+    assert manifest["max_length"] == max_length
+    assert single["input_ids"].shape == (1, max_length)
+    assert batch["attention_mask"].shape == (2, max_length)
+    assert np.array_equal(single["input_ids"][0], batch["input_ids"][0])
+
+    other = BaseBERTExtractor(
+        **{**local_extractor_configs, "pretrained_model_name_or_path": "other"}
+    )
+    with pytest.raises(ValueError):
+        other.tokenize_for_inference("soccer", manifest)
@@ -0,0 +1,117 @@
+"""Local files Data Extractor tests"""
+
+import json
+
+import numpy as np
+import pytest
+
+from bert_extractor.extractors.local import LocalFileExtractor
+from tests.extractors.sample_data import (
+    bert_vocab_path,
+    extractor_configs,
+    local_extractor_configs,
+)
+
+ROWS = [
+    {"text": "soccer japan win", "label": "sports"},
+    {"text": "a quoted, multi\nline review", "label": "reviews"},
+    {"text": "japan", "label": "sports"},
+]
+
+
+def test_read_csv(tmp_path, extractor_configs):
+    """Test the CSV columns are read, with quoted delimiters and new lines."""
+    filepath = tmp_path / "sample.csv"
+    lines = ['id,text,label', '1,soccer japan win,sports']
+    lines += ['2,"a quoted, multi\nline review",reviews', "3,japan,sports", ""]
+    filepath.write_text("\n".join(lines))
+
+    extracted = LocalFileExtractor(**extractor_configs).extract_raw(str(filepath))
+
+    assert extracted == {
+        "text": [row["text"] for row in ROWS],
+        "label": [row["label"] for row in ROWS],
+    }
+
+
+def test_read_jsonl(tmp_path, extractor_configs):
+    """Test the JSON lines columns are read, skipping blank lines."""
+    filepath = tmp_path / "sample.jsonl"
+    filepath.write_text("\n".join(json.dumps(row) for row in ROWS) + "\n\n")
+
+    extracted = LocalFileExtractor(**extractor_configs).extract_raw(str(filepath))
+
+    assert extracted["text"] == [row["text"] for row in ROWS]
+
+
+def test_read_parquet(tmp_path, extractor_configs):
+    """Test the Parquet columns are read."""
+    pyarrow = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    filepath = tmp_path / "sample.parquet"
+    pq.write_table(pyarrow.Table.from_pylist(ROWS), filepath)
+
+    extracted = LocalFileExtractor(**extractor_configs).extract_raw(str(filepath))
+
+    assert extracted["label"] == [row["label"] for row in ROWS]
+
+
+def test_unknown_format(tmp_path, extractor_configs):
+    """Test unknown formats and missing columns raise."""
+    with pytest.raises(ValueError):
+        LocalFileExtractor(**extractor_configs, file_format="xml")
+
+    with pytest.raises(ValueError):
+        LocalFileExtractor(**extractor_configs).extract_raw(str(tmp_path / "a.xml"))
+
+    filepath = tmp_path / "sample.csv"
+    filepath.write_text("id,text\n1,japan\n")
+    with pytest.raises(ValueError):
+        LocalFileExtractor(**extractor_configs).extract_raw(str(filepath))
+
+
+def test_extract_preprocess(tmp_path, local_extractor_configs):
+    """Test a local file goes through the tokenization, text labels mapped
+    to the sorted classes indexes."""
+    filepath = tmp_path / "sample.jsonl"
+    filepath.write_text("\n".join(json.dumps(row) for row in ROWS * 4))
+    extractor = LocalFileExtractor(
+        **local_extractor_configs, cache_path=str(tmp_path), split_test_size=0.25
+    )
+
+    sentences, labels = extractor.preprocess(extractor.extract_raw(str(filepath)))
+    tensor = extractor.extract_preprocess(str(filepath))
+
+    assert labels[:3] == [1, 0, 1]
+    assert len(tensor.train_labels) == 9
+    assert len(tensor.validation_labels) == 3
+    assert set(np.concatenate([tensor.train_labels, tensor.validation_labels])) == {
+        0,
+        1,
+    }
+
+
+@pytest.mark.parametrize(
+    "raw_labels, expected",
+    [
+        ([1, 3, 1], [1, 3, 1]),
+        (["2", "1.0", "2"], [2, 1, 2]),
+        ([1.5, 0.5, 1.5], [1, 0, 1]),
+        (["sports", "reviews", "sports"], [1, 0, 1]),
+    ],
+)
+def test_preprocess_labels(extractor_configs, raw_labels, expected):
+    """Test integral labels are kept and the other ones mapped to classes."""
+    extracted = {"text": [row["text"] for row in ROWS], "label": raw_labels}
+
+    _, labels = LocalFileExtractor(**extractor_configs).preprocess(extracted)
+
+    assert labels == expected
+
+
+def test_preprocess_missing_labels(extractor_configs):
+    """Test missing labels raise instead of becoming a class."""
+    extracted = {"text": [row["text"] for row in ROWS], "label": [1.0, None, 2.0]}
+
+    with pytest.raises(ValueError):
+        LocalFileExtractor(**extractor_configs).preprocess(extracted)
@@ -1,13 +1,24 @@
 """Reviews Data Extractor tests"""
 
 import os
-from pathlib import Path
-import shutil
 from unittest.mock import patch
 
+import numpy as np
+import pytest
+
+from bert_extractor.cache_store import file_sha256
+from bert_extractor.constants import (
+    NER_LABLES_MAP,
+    NER_UNKNOWN_LABEL,
+    SPECIAL_TOKEN_LABEL,
+    WORD_INDEX_DIR,
+)
 from bert_extractor.extractors.ner import NERExtractor
+from bert_extractor.ragged import RaggedArray
 from tests.extractors.sample_data import (
+    bert_vocab_path,
     extractor_configs,
+    fake_kaggle_api,
     ner_extractor_configs,
     ner_sample_preprocessed,
     ner_sample_raw,
@@ -30,48 +41,57 @@ def tests_authentication(ner_extractor_configs,):
 
 
 def test_raw_extraction_read_concat(
-    ner_extractor_configs, ner_txt_sample, ner_sample_raw
+    tmp_path, ner_extractor_configs, fake_kaggle_api, ner_sample_raw
 ):
-    """For given file test that extraction read them and return wanted df."""
-    with patch("bert_extractor.extractors.ner.KaggleApi"):
+    """For given zip archive test that extraction read them and return wanted df."""
+    ner_extractor = NERExtractor(**ner_extractor_configs, cache_path=str(tmp_path))
+    ner_extractor.api = fake_kaggle_api
+    extracted_raw = ner_extractor.extract_raw("owner/test_raw_extraction_read_concat")
 
-        url = "test_raw_extraction_read_concat"
-        download_file_path = Path(f"/tmp/{url}")
-        download_file_path.mkdir()
-        splits = ["train", "valid", "test"]
-        for split in splits:
-            file_path = download_file_path / f"{split}.txt"
-            file_path.write_text(ner_txt_sample)
+    assert extracted_raw["text"].tolist() == ner_sample_raw["text"]
+    assert extracted_raw["label"].tolist() == [
+        NER_LABLES_MAP.get(label, NER_UNKNOWN_LABEL)
+        for label in ner_sample_raw["label"]
+    ]
 
-        ner_extractor = NERExtractor(**ner_extractor_configs)
-        ner_extractor.authenticate()
-        extracted_raw = ner_extractor.extract_raw(url)
-        shutil.rmtree(download_file_path, ignore_errors=True)
 
-        assert extracted_raw == ner_sample_raw
-
-
-def test_raw_extraction_tmp_dir(ner_extractor_configs,):
-    """Test that a dir not exist after and before the extraction call"""
-    with patch("bert_extractor.extractors.ner.KaggleApi"), patch(
-        "bert_extractor.extractors.ner.NERExtractor._read_conll_file"
-    ) as file_reader:
-        try:
-            file_reader.return_value = ([], [])
-            url = "test_raw_extraction_tmp_dir"
-            download_file_path = f"/tmp/{url}"
-            download_file_path = Path(f"/tmp/{url}")
+def test_raw_extraction_archive_cache(
+    tmp_path, ner_extractor_configs, fake_kaggle_api
+):
+    """Test the archive is downloaded once into the cache, not into /tmp."""
+    url = "owner/test_raw_extraction_archive_cache"
+    ner_extractor = NERExtractor(**ner_extractor_configs, cache_path=str(tmp_path))
+    ner_extractor.api = fake_kaggle_api
+    first = ner_extractor.extract_raw(url)
+    second = ner_extractor.extract_raw(url)
+
+    assert fake_kaggle_api.downloads == 1
+    assert first["text"].tolist() == second["text"].tolist()
+    assert np.array_equal(first["label"], second["label"])
+    assert not os.path.exists(f"/tmp/{url}")
+    archives = list((tmp_path / "kaggle").glob("*.zip"))
+    assert len(archives) == 1
+    assert archives[0].stem == file_sha256(archives[0])
+
+
+def test_raw_extraction_archive_stale(
+    tmp_path, ner_extractor_configs, fake_kaggle_api
+):
+    """Test the archive is downloaded again if the dataset metadata changed
+    or the cached archive is corrupted."""
+    url = "owner/test_raw_extraction_archive_stale"
+    ner_extractor = NERExtractor(**ner_extractor_configs, cache_path=str(tmp_path))
+    ner_extractor.api = fake_kaggle_api
+    ner_extractor.extract_raw(url)
 
-            assert not os.path.isdir(download_file_path)
-            download_file_path.mkdir()
-            ner_extractor = NERExtractor(**ner_extractor_configs)
-            ner_extractor.authenticate()
-            _ = ner_extractor.extract_raw(url)
-            assert not os.path.isdir(download_file_path)
+    fake_kaggle_api.creation_date = "2021-01-01"
+    ner_extractor.extract_raw(url)
+    assert fake_kaggle_api.downloads == 2
 
-        finally:
-            if os.path.isdir(download_file_path):
-                shutil.rmtree(download_file_path)
+    archive = next((tmp_path / "kaggle").glob("*.zip"))
+    archive.write_bytes(b"corrupted")
+    ner_extractor.extract_raw(url)
+    assert fake_kaggle_api.downloads == 3
 
 
 def test_preprocess(ner_extractor_configs, ner_sample_raw, ner_sample_preprocessed):
@@ -80,4 +100,83 @@ def test_preprocess(ner_extractor_configs, ner_sample_raw, ner_sample_preprocess
     preprocessed_data = ner_extractor.preprocess(ner_sample_raw)
 
     assert len(preprocessed_data) == 2
-    assert preprocessed_data == ner_sample_preprocessed
+    assert [rows.tolist() for rows in preprocessed_data] == list(
+        ner_sample_preprocessed
+    )
+
+
+@pytest.mark.parametrize(
+    "label_strategy, continuation",
+    [("all", 1), ("first", SPECIAL_TOKEN_LABEL), ("b_to_i", 4)],
+)
+def test_process_labels(
+    ner_extractor_configs, ner_sample_preprocessed, label_strategy, continuation
+):
+    """Test the word labels are aligned to the tokens, the sub-tokens after the
+    first one of a word get the label of the strategy and the special tokens
+    the special label."""
+    ner_extractor = NERExtractor(**ner_extractor_configs, label_strategy=label_strategy)
+    labels = RaggedArray.from_lists(ner_sample_preprocessed[1], dtype=np.int8)
+    word_ids = np.array(
+        [[-1, 0, 1, 1, 2, 3, -1, -1], [-1, 0, 1, 2, 3, -1, -1, -1]], dtype=np.int64
+    )
+    with patch.object(NERExtractor, "_word_ids_matrix", return_value=word_ids):
+        processed = ner_extractor.process_labels(labels, None)
+
+    expected = np.array(
+        [
+            [SPECIAL_TOKEN_LABEL, 9, 1, continuation, 9, 9] + [SPECIAL_TOKEN_LABEL] * 2,
+            [SPECIAL_TOKEN_LABEL, 9, 1, 9, 9] + [SPECIAL_TOKEN_LABEL] * 3,
+        ]
+    )
+    assert np.array_equal(processed, expected)
+
+
+def test_unknown_label_strategy(ner_extractor_configs):
+    """Test an unknown label strategy raises."""
+    with pytest.raises(ValueError):
+        NERExtractor(**ner_extractor_configs, label_strategy="last")
+
+
+@pytest.mark.parametrize("split_strategy", ["random", "external"])
+def test_word_index_engine(
+    tmp_path, ner_extractor_configs, bert_vocab_path, split_strategy
+):
+    """Test the word index engine extracts the same tensors as the tokenizer,
+    and caches its index for the next extractors."""
+    sentences = RaggedArray.from_lists(
+        [["SOCCER", "JAPAN", "WIN", ","], ["Japan", "advertised", "Dry", "skin"]] * 8,
+        dtype=str,
+    )
+    labels = RaggedArray.from_lists([[9, 1, 9, 9], [1, 9, 9, 9]] * 8, dtype=np.int8)
+    configs = {
+        **ner_extractor_configs,
+        "pretrained_model_name_or_path": bert_vocab_path,
+        "cache_path": str(tmp_path),
+        "split_strategy": split_strategy,
+        "split_test_size": 0.25,
+        "keep_word_ids": True,
+        "tokenize_batch_size": 3,
+    }
+    expected = NERExtractor(**configs).bert_tokenizer(sentences, labels)
+    indexed = NERExtractor(**configs, tokenize_engine="word_index")
+    tensor = indexed.bert_tokenizer(sentences, labels)
+
+    for inputs, expected_inputs in zip(tensor[:2], expected[:2]):
+        assert inputs.keys() == expected_inputs.keys()
+        for key, value in expected_inputs.items():
+            assert np.array_equal(inputs[key], value), key
+    for processed, expected_labels in zip(tensor[2:], expected[2:]):
+        assert np.array_equal(processed, expected_labels)
+
+    assert [path.name for path in (tmp_path / WORD_INDEX_DIR).glob("*.npz")] == [
+        indexed._word_index_path.name
+    ]
+    cached = NERExtractor(**configs, tokenize_engine="word_index")
+    assert len(cached._load_word_index(cached.load_tokenizer())) == 8
+
+
+def test_unknown_tokenize_engine(ner_extractor_configs):
+    """Test an unknown tokenize engine raises."""
+    with pytest.raises(ValueError):
+        NERExtractor(**ner_extractor_configs, tokenize_engine="regex")
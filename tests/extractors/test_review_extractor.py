@@ -1,9 +1,18 @@
 """Reviews Data Extractor tests"""
 
+import gzip
+import json
+import pickle
 from unittest.mock import patch
 
-from bert_extractor.extractors.reviews import ReviewsExtractor
+import numpy as np
+import pytest
+
+from bert_extractor.cache import PREPROCESSED_DIR, raw_entry_path
+from bert_extractor.cache_store import write_entry
+from bert_extractor.extractors.reviews import REVIEWS_COLUMNS, ReviewsExtractor
 from tests.extractors.sample_data import (
+    bert_vocab_path,
     extractor_configs,
     sample_extracted,
     sample_preprocessed,
@@ -51,3 +60,101 @@ def test_preprocess(extractor_configs, sample_extracted, sample_preprocessed):
 
     assert len(preprocessed_data) == 2
     assert preprocessed_data == sample_preprocessed
+
+
+def test_pipelined_extraction(tmp_path, extractor_configs, sample_extracted):
+    """Test the streamed and pipelined extraction gives the same sentences and
+    labels, with lines and gzip members cut across chunks."""
+    lines = "\n".join(json.dumps(review) for review in sample_extracted)
+    middle = len(lines) // 2
+    compressed = gzip.compress(lines[:middle].encode()) + gzip.compress(
+        lines[middle:].encode()
+    )
+    chunks = [compressed[start : start + 7] for start in range(0, len(compressed), 7)]
+
+    with patch("requests.get") as requests:
+        requests.return_value.iter_content.return_value = chunks
+        reviews_extractor = ReviewsExtractor(
+            **extractor_configs, cache_path=str(tmp_path), pipeline_queue_size=2
+        )
+        preprocessed = reviews_extractor.extract_preprocessed("url")
+
+        requests.assert_called_once_with("url", stream=True)
+        assert preprocessed == reviews_extractor.preprocess(sample_extracted)
+
+
+def test_pipelined_extraction_raw_cache(
+    tmp_path, extractor_configs, sample_extracted
+):
+    """Test the pipelined extraction reads the raw data cache if present."""
+    reviews_extractor = ReviewsExtractor(
+        **extractor_configs,
+        cache_path=str(tmp_path),
+        read_cache=True,
+        pipeline_queue_size=2,
+    )
+    write_entry(
+        raw_entry_path(reviews_extractor, "url"),
+        lambda file: pickle.dump(sample_extracted, file),
+    )
+
+    with patch("requests.get") as requests:
+        preprocessed = reviews_extractor.extract_preprocessed("url")
+
+        requests.assert_not_called()
+        assert preprocessed == reviews_extractor.preprocess(sample_extracted)
+
+
+def test_parallel_raw_extraction(tmp_path, extractor_configs, sample_extracted):
+    """Test the parallel reader extracts the reviews with the needed fields."""
+    lines = "\n".join(json.dumps(review) for review in sample_extracted)
+    compressed = gzip.compress(lines.encode())
+
+    with patch("requests.get") as requests:
+        requests.return_value.iter_content.return_value = [compressed]
+        reviews_extractor = ReviewsExtractor(
+            **extractor_configs, cache_path=str(tmp_path), parse_workers=2
+        )
+        extracted = reviews_extractor.extract_raw("url")
+
+        requests.assert_called_once_with("url", stream=True)
+        assert reviews_extractor.preprocess(extracted) == reviews_extractor.preprocess(
+            sample_extracted
+        )
+        assert set(extracted[0]) == set(REVIEWS_COLUMNS)
+
+
+@pytest.mark.parametrize("pipeline_queue_size", [None, 2])
+def test_external_split_streams(
+    tmp_path, extractor_configs, bert_vocab_path, sample_extracted, pipeline_queue_size
+):
+    """Test the external split is fed with the streamed batches, without the
+    preprocessed lists of the whole corpus, and gives the same tensor."""
+    reviews = sample_extracted * 20
+    lines = "\n".join(json.dumps(review) for review in reviews)
+    compressed = gzip.compress(lines.encode())
+    chunks = [compressed[start : start + 64] for start in range(0, len(compressed), 64)]
+    configs = {
+        **extractor_configs,
+        "pretrained_model_name_or_path": bert_vocab_path,
+        "cache_path": str(tmp_path),
+        "split_strategy": "external",
+        "pipeline_queue_size": pipeline_queue_size,
+    }
+
+    with patch("requests.get") as requests:
+        requests.return_value.iter_content.return_value = chunks
+        extractor = ReviewsExtractor(**configs)
+        with patch.object(ReviewsExtractor, "extract_preprocessed") as preprocessed:
+            tensor = extractor.extract_preprocess("url")
+
+        requests.assert_called_once_with("url", stream=True)
+        preprocessed.assert_not_called()
+    assert not (tmp_path / PREPROCESSED_DIR).exists()
+
+    expected = ReviewsExtractor(**configs).bert_tokenizer(
+        *extractor.preprocess(reviews)
+    )
+    for key, value in expected.train_inputs.items():
+        assert np.array_equal(tensor.train_inputs[key], value)
+    assert np.array_equal(tensor.validation_labels, expected.validation_labels)
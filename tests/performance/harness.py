@@ -0,0 +1,231 @@
+"""Performance regression harness: throughput and peak memory of the extraction
+stages on scaled up versions of the `tests/extractors` fixtures, compared
+against the baselines stored in `baselines.json`.
+
+Throughputs are normalized by the time of a fixed reference workload, so the
+baselines of a machine hold on another one. Peak memory is the one traced by
+`tracemalloc`: numpy and Python allocations, not the tokenizer Rust ones.
+
+Run the gate, or record new baselines after an intended change, with:
+    $ BERT_EXTRACTOR_PERFORMANCE=check pytest tests/performance -p no:xdist
+    $ BERT_EXTRACTOR_PERFORMANCE=update pytest tests/performance -p no:xdist
+"""
+import json
+import os
+from pathlib import Path
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from benchmarks.utils import synthetic_sentences, timeit
+
+BASELINES_PATH = Path(__file__).with_name("baselines.json")
+PERFORMANCE_ENV = "BERT_EXTRACTOR_PERFORMANCE"
+PERFORMANCE_MODES = ["check", "update"]
+# Allowed relative throughput drop and peak memory growth.
+THROUGHPUT_TOLERANCE = 0.3
+MEMORY_TOLERANCE = 0.2
+# Peak memory growth always allowed, for the small stages.
+MEMORY_SLACK_MIB = 1.0
+# Short stages are timed until this total, their best run kept.
+MIN_MEASURE_SECONDS = 2.0
+# Measures of a stage over its budget, the best one kept, before failing.
+CHECK_ATTEMPTS = 3
+
+
+class Measure(NamedTuple):
+    """Normalized throughput, rows per reference second, and peak MiB."""
+
+    rows_per_second: float
+    peak_mib: float
+
+
+def performance_mode() -> Optional[str]:
+    """Mode of the performance tests from the environment, None to skip them."""
+    mode = os.environ.get(PERFORMANCE_ENV)
+    return mode if mode in PERFORMANCE_MODES else None
+
+
+def _reference_workload():
+    """Fixed mix of numpy and pure Python work, the unit of the throughputs."""
+    rng = np.random.default_rng(2020)
+    np.sort(rng.random(1_000_000))
+    counts: Dict[str, int] = {}
+    for index in range(300_000):
+        word = f"w{index % 5000}"
+        counts[word] = counts.get(word, 0) + 1
+
+
+def measure(function: Callable, rows: int, repeat: int = 3) -> Measure:
+    """Measure a stage, the best of `repeat` timed runs, more for the short
+    stages, then a traced run. The reference workload is timed right before,
+    as the machine load changes.
+
+    Parameters
+    ----------
+    function : Callable
+        stage to run, without arguments.
+    rows : int
+        amount of rows processed by each call.
+    repeat : int
+        amount of timed runs.
+
+    Returns
+    -------
+    Measure
+        normalized throughput and peak memory.
+    """
+    reference_seconds = timeit(_reference_workload, repeat)
+    seconds = timeit(function, repeat)
+    if seconds * repeat < MIN_MEASURE_SECONDS:
+        seconds = timeit(function, int(MIN_MEASURE_SECONDS / max(seconds, 1e-6)))
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return Measure(rows * reference_seconds / seconds, peak / 2 ** 20)
+
+
+def best_measure(first: Measure, second: Measure) -> Measure:
+    """Highest throughput and lowest peak memory of two measures."""
+    return Measure(
+        max(first.rows_per_second, second.rows_per_second),
+        min(first.peak_mib, second.peak_mib),
+    )
+
+
+def read_baselines(filepath: Path = BASELINES_PATH) -> Dict[str, Measure]:
+    """Stored baselines of each stage, empty if there are none."""
+    if not filepath.exists():
+        return {}
+    with open(filepath) as file:
+        return {name: Measure(**value) for name, value in json.load(file).items()}
+
+
+def write_baseline(name: str, measured: Measure, filepath: Path = BASELINES_PATH):
+    """Store the baseline of a stage, keeping the other ones."""
+    baselines = read_baselines(filepath)
+    baselines[name] = measured
+    with open(filepath, "w") as file:
+        json.dump(
+            {
+                key: {field: round(value, 2) for field, value in base._asdict().items()}
+                for key, base in sorted(baselines.items())
+            },
+            file,
+            indent=2,
+        )
+        file.write("\n")
+
+
+def budget_problems(
+    measured: Measure,
+    baseline: Measure,
+    throughput_tolerance: float = THROUGHPUT_TOLERANCE,
+    memory_tolerance: float = MEMORY_TOLERANCE,
+) -> List[str]:
+    """Regressions of a measure against its baseline.
+
+    Parameters
+    ----------
+    measured : Measure
+        measure of the current code.
+    baseline : Measure
+        stored measure.
+    throughput_tolerance : float
+        allowed relative throughput drop.
+    memory_tolerance : float
+        allowed relative peak memory growth, plus `MEMORY_SLACK_MIB`.
+
+    Returns
+    -------
+    List[str]
+        description of each regression, empty if within budget.
+    """
+    problems = []
+    min_throughput = baseline.rows_per_second * (1 - throughput_tolerance)
+    if measured.rows_per_second < min_throughput:
+        problems.append(
+            f"throughput {measured.rows_per_second:.0f} rows/s under the budget of "
+            f"{min_throughput:.0f}, baseline {baseline.rows_per_second:.0f}"
+        )
+    max_peak = baseline.peak_mib * (1 + memory_tolerance) + MEMORY_SLACK_MIB
+    if measured.peak_mib > max_peak:
+        problems.append(
+            f"peak memory {measured.peak_mib:.1f} MiB over the budget of "
+            f"{max_peak:.1f}, baseline {baseline.peak_mib:.1f}"
+        )
+    return problems
+
+
+def scale_reviews(sample: List[Dict], rows: int, seed: int = 2020) -> List[Dict]:
+    """Reviews like the sample ones, with texts and summaries of their words.
+
+    Parameters
+    ----------
+    sample : List[Dict]
+        sample reviews, as extracted.
+    rows : int
+        amount of reviews.
+    seed : int
+        random seed.
+
+    Returns
+    -------
+    List[Dict]
+        reviews.
+    """
+    words = " ".join(
+        f"{review['summary']} {review['reviewText']}" for review in sample
+    ).split()
+    texts = synthetic_sentences(rows, words, mean_words=60, seed=seed)
+    summaries = synthetic_sentences(rows, words, mean_words=4, seed=seed + 1)
+    overall = np.random.default_rng(seed).integers(1, 6, rows)
+
+    return [
+        {
+            **sample[index % len(sample)],
+            "overall": float(overall[index]),
+            "reviewText": texts[index],
+            "summary": summaries[index],
+        }
+        for index in range(rows)
+    ]
+
+
+def scale_conll(sample: str, sentences: int, seed: int = 2020) -> str:
+    """CoNLL 2003 text with sentences of the sample word lines.
+
+    Parameters
+    ----------
+    sample : str
+        sample CoNLL file content.
+    sentences : int
+        amount of sentences.
+    seed : int
+        random seed.
+
+    Returns
+    -------
+    str
+        CoNLL file content, starting with a -DOCSTART- line.
+    """
+    lines = [
+        line
+        for line in sample.splitlines()
+        if line.strip() and not line.startswith("-DOCSTART-")
+    ]
+    rng = np.random.default_rng(seed)
+    lengths = rng.geometric(1 / 14, sentences)
+    picks = rng.integers(0, len(lines), int(lengths.sum()))
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+    blocks = ["-DOCSTART- -X- -X- O\n"]
+    for start, stop in zip(offsets[:-1], offsets[1:]):
+        blocks.append("\n".join(lines[pick] for pick in picks[start:stop]) + "\n")
+    # A blank line ends the last sentence too.
+    return "\n".join(blocks) + "\n"
@@ -0,0 +1,167 @@
+"""Performance regression tests, skipped unless BERT_EXTRACTOR_PERFORMANCE is set,
+see `tests.performance.harness`."""
+
+import gzip
+import json
+from typing import Callable, Dict, Tuple
+from unittest.mock import patch
+
+import pytest
+
+from bert_extractor.extractors.ner import NERExtractor
+from bert_extractor.extractors.reviews import ReviewsExtractor
+from bert_extractor.utils import store_tensor
+from tests.extractors.sample_data import (
+    FakeKaggleApi,
+    bert_vocab_path,
+    extractor_configs,
+    ner_extractor_configs,
+    ner_txt_sample,
+    sample_extracted,
+)
+from tests.performance.harness import (
+    CHECK_ATTEMPTS,
+    PERFORMANCE_ENV,
+    Measure,
+    best_measure,
+    budget_problems,
+    measure,
+    performance_mode,
+    read_baselines,
+    scale_conll,
+    scale_reviews,
+    write_baseline,
+)
+
+REVIEWS_ROWS = 1000
+# Sentences of each of the train, valid and test files.
+NER_SENTENCES = 1000
+
+performance = pytest.mark.skipif(
+    performance_mode() is None, reason=f"set {PERFORMANCE_ENV} to check or update"
+)
+
+
+def check_budget(name: str, stage: Callable, rows: int):
+    """Record the measure of the stage as baseline, or fail if it regressed
+    from it. A stage over budget is measured again, up to `CHECK_ATTEMPTS`
+    times, so a busy runner doesn't fail it."""
+    measured = measure(stage, rows)
+    if performance_mode() == "update":
+        write_baseline(name, measured)
+        return
+
+    baseline = read_baselines().get(name)
+    assert baseline is not None, f"No baseline, record it with {PERFORMANCE_ENV}=update"
+    problems = budget_problems(measured, baseline)
+    for _ in range(CHECK_ATTEMPTS - 1):
+        if not problems:
+            break
+        measured = best_measure(measured, measure(stage, rows))
+        problems = budget_problems(measured, baseline)
+    assert not problems, f"{name} regressed: " + "; ".join(problems)
+
+
+def reviews_stages(
+    tmp_path, extractor_configs, bert_vocab_path, sample_extracted
+) -> Tuple[Dict[str, Callable], int]:
+    """Stages of the reviews extraction, offline, on the scaled sample,
+    and the amount of rows."""
+    reviews = scale_reviews(sample_extracted, REVIEWS_ROWS)
+    content = gzip.compress("\n".join(map(json.dumps, reviews)).encode())
+    extractor = ReviewsExtractor(
+        **{**extractor_configs, "pretrained_model_name_or_path": bert_vocab_path},
+        cache_path=str(tmp_path / "cache"),
+        tokenize_workers=1,
+        tokenizers_parallelism=False,
+    )
+    extractor.load_tokenizer()
+    sentences, labels = extractor.preprocess(reviews)
+    tensor = extractor.bert_tokenizer(sentences, labels)
+
+    def extract_preprocess():
+        with patch("requests.get") as requests:
+            requests.return_value.content = content
+            return extractor.extract_preprocess("url")
+
+    stages = {
+        "extract_preprocess": extract_preprocess,
+        "bert_tokenizer": lambda: extractor.bert_tokenizer(sentences, labels),
+        "store_tensor": lambda: store_tensor(tensor, str(tmp_path / "out"), "reviews"),
+    }
+    return stages, len(sentences)
+
+
+def ner_stages(
+    tmp_path, ner_extractor_configs, bert_vocab_path, ner_txt_sample
+) -> Tuple[Dict[str, Callable], int]:
+    """Stages of the NER extraction, offline, on the scaled sample,
+    and the amount of sentences."""
+    extractor = NERExtractor(
+        **{**ner_extractor_configs, "pretrained_model_name_or_path": bert_vocab_path},
+        cache_path=str(tmp_path / "cache"),
+        tokenize_workers=1,
+        tokenizers_parallelism=False,
+    )
+    extractor.api = FakeKaggleApi(scale_conll(ner_txt_sample, NER_SENTENCES))
+    tokenizer = extractor.load_tokenizer()
+    sentences, labels = extractor.preprocess(extractor.extract_raw("owner/conll"))
+    max_length = extractor.get_max_length(
+        extractor._token_lengths(sentences, tokenizer), tokenizer
+    )
+    tokenized = extractor._encode(sentences, max_length, tokenizer)
+    tensor = extractor.bert_tokenizer(sentences, labels)
+
+    def extract_preprocess():
+        with patch.object(NERExtractor, "authenticate"):
+            return extractor.extract_preprocess("owner/conll")
+
+    stages = {
+        "extract_preprocess": extract_preprocess,
+        "bert_tokenizer": lambda: extractor.bert_tokenizer(sentences, labels),
+        "process_labels": lambda: extractor.process_labels(labels, tokenized),
+        "store_tensor": lambda: store_tensor(tensor, str(tmp_path / "out"), "ner"),
+    }
+    return stages, len(sentences)
+
+
+@performance
+@pytest.mark.parametrize(
+    "stage", ["extract_preprocess", "bert_tokenizer", "store_tensor"]
+)
+def test_reviews_throughput(
+    tmp_path, extractor_configs, bert_vocab_path, sample_extracted, stage
+):
+    """Test the reviews stages keep their throughput and peak memory."""
+    stages, rows = reviews_stages(
+        tmp_path, extractor_configs, bert_vocab_path, sample_extracted
+    )
+    check_budget(f"reviews/{stage}", stages[stage], rows)
+
+
+@performance
+@pytest.mark.parametrize(
+    "stage", ["extract_preprocess", "bert_tokenizer", "process_labels", "store_tensor"]
+)
+def test_ner_throughput(
+    tmp_path, ner_extractor_configs, bert_vocab_path, ner_txt_sample, stage
+):
+    """Test the NER stages keep their throughput and peak memory."""
+    stages, rows = ner_stages(
+        tmp_path, ner_extractor_configs, bert_vocab_path, ner_txt_sample
+    )
+    check_budget(f"ner/{stage}", stages[stage], rows)
+
+
+def test_budget_problems():
+    """Test slower or bigger measures than the tolerances are regressions."""
+    baseline = Measure(rows_per_second=1000.0, peak_mib=100.0)
+
+    assert budget_problems(Measure(800.0, 110.0), baseline) == []
+    assert budget_problems(Measure(1500.0, 10.0), baseline) == []
+    slower, bigger = budget_problems(Measure(500.0, 200.0), baseline)
+    assert slower.startswith("throughput 500 rows/s")
+    assert bigger.startswith("peak memory 200.0 MiB")
+    assert best_measure(Measure(500.0, 90.0), Measure(800.0, 200.0)) == Measure(
+        800.0, 90.0
+    )
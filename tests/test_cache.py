@@ -0,0 +1,85 @@
+"""Preprocessed cache tests"""
+
+import pickle
+from unittest.mock import patch
+
+from bert_extractor.cache import columns_to_texts, raw_entry_path, texts_to_columns
+from bert_extractor.cache_store import write_entry
+from bert_extractor.extractors.ner import NERExtractor
+from bert_extractor.extractors.reviews import ReviewsExtractor
+from tests.extractors.sample_data import (
+    extractor_configs,
+    ner_extractor_configs,
+    ner_sample_preprocessed,
+    ner_sample_raw,
+    sample_extracted,
+    sample_preprocessed,
+)
+
+
+def test_columns_roundtrip(sample_preprocessed, ner_sample_preprocessed):
+    """Test sentences and words lists are the same after the columnar form."""
+    sentences, labels = columns_to_texts(texts_to_columns(*sample_preprocessed))
+    assert sentences == sample_preprocessed[0]
+    assert labels == sample_preprocessed[1]
+
+    words, word_labels = columns_to_texts(texts_to_columns(*ner_sample_preprocessed))
+    assert words.tolist() == ner_sample_preprocessed[0]
+    assert word_labels.tolist() == ner_sample_preprocessed[1]
+
+
+def test_preprocessed_cache(tmp_path, extractor_configs, sample_extracted):
+    """Test the preprocessed data is read from cache, skipping the extraction."""
+    extractor_configs["cache_path"] = str(tmp_path)
+    with patch(
+        "bert_extractor.extractors.reviews.ReviewsExtractor.extract_raw"
+    ) as extract_raw:
+        extract_raw.return_value = sample_extracted
+        first = ReviewsExtractor(**extractor_configs).extract_preprocessed("url")
+        cached = ReviewsExtractor(
+            **extractor_configs, read_cache=True
+        ).extract_preprocessed("url")
+
+        assert extract_raw.call_count == 1
+        assert cached == first
+
+
+def test_preprocessed_cache_version(
+    tmp_path, ner_extractor_configs, ner_sample_raw, ner_sample_preprocessed
+):
+    """Test a new preprocess version doesn't read the old cache."""
+    ner_extractor_configs["cache_path"] = str(tmp_path)
+    with patch("bert_extractor.extractors.ner.NERExtractor.authenticate"), patch(
+        "bert_extractor.extractors.ner.NERExtractor.extract_raw"
+    ) as extract_raw:
+        extract_raw.return_value = ner_sample_raw
+        ner_extractor = NERExtractor(**ner_extractor_configs, read_cache=True)
+        ner_extractor.extract_preprocessed("url")
+        ner_extractor.preprocess_version += 1
+        preprocessed = ner_extractor.extract_preprocessed("url")
+
+        assert extract_raw.call_count == 2
+        assert [rows.tolist() for rows in preprocessed] == list(
+            ner_sample_preprocessed
+        )
+
+
+def test_preprocessed_cache_raw_rewritten(
+    tmp_path, extractor_configs, sample_extracted
+):
+    """Test a rewritten raw data entry doesn't read the old preprocessed cache."""
+    extractor_configs["cache_path"] = str(tmp_path)
+    extractor = ReviewsExtractor(**extractor_configs, read_cache=True)
+    raw_path = raw_entry_path(extractor, "url")
+    with patch(
+        "bert_extractor.extractors.reviews.ReviewsExtractor.extract_raw"
+    ) as extract_raw:
+        extract_raw.return_value = sample_extracted
+        write_entry(raw_path, lambda file: pickle.dump(sample_extracted, file))
+        extractor.extract_preprocessed("url")
+        extractor.extract_preprocessed("url")
+        assert extract_raw.call_count == 1
+
+        write_entry(raw_path, lambda file: pickle.dump(sample_extracted[:1], file))
+        extractor.extract_preprocessed("url")
+        assert extract_raw.call_count == 2
@@ -0,0 +1,61 @@
+"""Cache manager CLI tests"""
+
+import json
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from bert_extractor import registry
+from bert_extractor.cache_manager import main, prewarm
+from bert_extractor.cache_store import list_entries
+
+
+def write_dataset(tmp_path):
+    filepath = tmp_path / "sample.jsonl"
+    rows = [{"text": "soccer japan win", "label": 1}, {"text": "japan", "label": 0}]
+    filepath.write_text("\n".join(json.dumps(row) for row in rows))
+    return str(filepath)
+
+
+def test_prewarm(tmp_path):
+    """Test every known dataset is extracted into the cache, in parallel,
+    and the failing ones are reported."""
+    datasets = {
+        "sample": write_dataset(tmp_path),
+        "missing": str(tmp_path / "missing.jsonl"),
+    }
+    cache_path = tmp_path / "cache"
+    with patch.object(registry, "get_datasets", return_value=datasets):
+        results = prewarm(cache_path, ["local"], workers=2)
+
+    assert results[("local", "sample")] is None
+    assert "FileNotFoundError" in results[("local", "missing")]
+    [entry] = list_entries(cache_path)
+    assert entry.path.parent.name == "preprocessed"
+    assert entry.url == datasets["sample"]
+    assert entry.extractor == "LocalFileExtractor"
+
+
+def test_cli(tmp_path):
+    """Test the list, verify and prune commands."""
+    datasets = {"sample": write_dataset(tmp_path)}
+    cache_path = str(tmp_path / "cache")
+    runner = CliRunner()
+    with patch.object(registry, "get_datasets", return_value=datasets):
+        warmed = runner.invoke(
+            main, ["prewarm", "--cache_path", cache_path, "--extractor_type", "local"]
+        )
+
+    listed = runner.invoke(main, ["list", "--cache_path", cache_path])
+    verified = runner.invoke(main, ["verify", "--cache_path", cache_path])
+    pruned = runner.invoke(
+        main, ["prune", "--cache_path", cache_path, "--max_size_mb", "0"]
+    )
+
+    assert warmed.exit_code == 0, warmed.output
+    assert "1 entries" in listed.output
+    assert datasets["sample"] in listed.output
+    assert verified.exit_code == 0
+    assert "0 problems" in verified.output
+    assert "removed" in pruned.output
+    assert list_entries(cache_path) == []
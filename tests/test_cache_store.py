@@ -0,0 +1,127 @@
+"""Cache entries tests"""
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import pickle
+
+import pytest
+
+from bert_extractor.cache_store import (
+    atomic_write,
+    file_sha256,
+    list_entries,
+    prune_entries,
+    read_entry,
+    read_metadata,
+    verify_entries,
+    write_entry,
+)
+
+
+def write_pickle(filepath, obj, url="url"):
+    return write_entry(filepath, lambda file: pickle.dump(obj, file), url, "Extractor")
+
+
+def test_write_read_entry(tmp_path):
+    """Test the sidecar records the entry and counts its hits."""
+    filepath = tmp_path / "entry.pkl"
+    entry = write_pickle(filepath, list(range(10)))
+
+    assert read_entry(filepath, pickle.load) == list(range(10))
+    assert read_entry(filepath, pickle.load) == list(range(10))
+    metadata = read_metadata(filepath)
+    assert metadata.url == "url"
+    assert metadata.extractor == "Extractor"
+    assert metadata.size == filepath.stat().st_size
+    assert metadata.sha256 == file_sha256(filepath) == entry.sha256
+    assert metadata.hits == 2
+    assert metadata.last_access >= entry.created
+
+
+def test_atomic_write_error(tmp_path):
+    """Test an interrupted write leaves neither the entry nor a temporary file."""
+    filepath = tmp_path / "entry.pkl"
+    with pytest.raises(RuntimeError):
+        with atomic_write(filepath) as file:
+            file.write(b"partial")
+            raise RuntimeError("interrupted")
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def _write_concurrently(filepath, index):
+    write_pickle(filepath, [index] * 100_000)
+    return index
+
+
+def test_concurrent_writes(tmp_path):
+    """Test processes writing the same entry leave a complete one."""
+    filepath = tmp_path / "entry.pkl"
+    with ProcessPoolExecutor(4) as executor:
+        list(executor.map(_write_concurrently, [filepath] * 8, range(8)))
+
+    with open(filepath, "rb") as file:
+        content = pickle.load(file)
+    assert len(set(content)) == 1
+    assert verify_entries(tmp_path) == {}
+
+
+def test_verify_entries(tmp_path):
+    """Test corrupted entries, entries without metadata and orphan sidecars
+    are found."""
+    write_pickle(tmp_path / "ok.pkl", 1)
+    write_pickle(tmp_path / "corrupted.pkl", 2)
+    write_pickle(tmp_path / "removed.pkl", 3)
+    with open(tmp_path / "corrupted.pkl", "r+b") as file:
+        file.write(b"\x00")
+    os.remove(tmp_path / "removed.pkl")
+    (tmp_path / "preprocessed").mkdir()
+    (tmp_path / "preprocessed" / "legacy.npz").write_bytes(b"legacy")
+
+    problems = verify_entries(tmp_path)
+
+    assert problems == {
+        tmp_path / "corrupted.pkl": "checksum mismatch",
+        tmp_path / "preprocessed" / "legacy.npz": "no metadata",
+        tmp_path / "removed.pkl.meta.json": "metadata without entry",
+    }
+    assert [entry.path.name for entry in list_entries(tmp_path)] == [
+        "corrupted.pkl",
+        "ok.pkl",
+        "legacy.npz",
+    ]
+
+
+@pytest.mark.parametrize(
+    "policy, kept", [("lru", {"a.pkl", "b.pkl"}), ("size", {"b.pkl", "c.pkl"})]
+)
+def test_prune_entries_size(tmp_path, policy, kept):
+    """Test entries are evicted in the policy order until the cache fits."""
+    write_pickle(tmp_path / "a.pkl", b"a" * 2000)
+    write_pickle(tmp_path / "b.pkl", b"b" * 1000)
+    write_pickle(tmp_path / "c.pkl", b"c" * 1000)
+    read_entry(tmp_path / "a.pkl", pickle.load)
+    read_entry(tmp_path / "b.pkl", pickle.load)
+    max_bytes = sum(entry.size for entry in list_entries(tmp_path)) - 1
+
+    dry_run = prune_entries(tmp_path, max_bytes=max_bytes, policy=policy, dry_run=True)
+    removed = prune_entries(tmp_path, max_bytes=max_bytes, policy=policy)
+
+    assert dry_run == removed
+    assert {entry.path.name for entry in list_entries(tmp_path)} == kept
+
+
+def test_prune_entries_age(tmp_path):
+    """Test entries older than the max age are removed with their sidecar."""
+    write_pickle(tmp_path / "old.pkl", 1)
+
+    assert prune_entries(tmp_path, max_age=3600) == []
+    assert len(prune_entries(tmp_path, max_age=-1)) == 1
+    assert not (tmp_path / "old.pkl").exists()
+    assert not (tmp_path / "old.pkl.meta.json").exists()
+
+
+def test_unknown_prune_policy(tmp_path):
+    """Test an unknown policy raises."""
+    with pytest.raises(ValueError):
+        prune_entries(tmp_path, max_bytes=0, policy="random")
@@ -0,0 +1,114 @@
+"""Compact inputs tests"""
+
+import numpy as np
+import pytest
+
+from bert_extractor.compact import CompactEncoding, compact_batch, expand_arrays
+from bert_extractor.compression import CompressedTensorReader
+from bert_extractor.extractors.base import TokenizedTensor
+from bert_extractor.shards import ShardedTensorReader
+from bert_extractor.utils import from_pickle, store_tensor
+
+
+@pytest.fixture
+def sample_batch():
+    lengths = np.array([3, 6, 1, 0, 4])
+    attention_mask = (np.arange(6) < lengths[:, None]).astype(np.int64)
+    return {
+        "input_ids": np.arange(1, 31).reshape(5, 6) * attention_mask,
+        "token_type_ids": np.zeros((5, 6), dtype=np.int64),
+        "attention_mask": attention_mask,
+        "word_ids": np.arange(30).reshape(5, 6),
+    }
+
+
+@pytest.fixture
+def sample_tensor(sample_batch):
+    inputs = CompactEncoding(compact_batch(sample_batch))
+    return TokenizedTensor(
+        train_inputs=inputs,
+        validation_inputs=CompactEncoding(inputs.batch(0, 2)),
+        train_labels=np.arange(5),
+        validation_labels=np.arange(2),
+    )
+
+
+def test_compact_encoding(sample_batch):
+    """Test only the input ids, the lengths and the extra arrays are kept,
+    and the same inputs are rebuilt, whole or by batches."""
+    compacted = compact_batch(sample_batch)
+    inputs = CompactEncoding(compacted)
+
+    assert set(compacted) == {"input_ids", "word_ids", "lengths"}
+    assert inputs.lengths.tolist() == [3, 6, 1, 0, 4]
+    assert list(inputs) == list(sample_batch)
+    assert len(inputs) == 4
+    assert "lengths" not in inputs
+    assert np.array_equal(inputs.attention_mask, sample_batch["attention_mask"])
+    assert set(inputs.data) == set(sample_batch)
+    with pytest.raises(AttributeError):
+        inputs.labels  # pylint: disable=pointless-statement
+    for key, value in sample_batch.items():
+        assert inputs[key].dtype == value.dtype
+        assert np.array_equal(inputs[key], value), key
+
+    batches = list(inputs.iter_batches(2))
+    assert [len(batch["input_ids"]) for batch in batches] == [2, 2, 1]
+    for key, value in sample_batch.items():
+        rebuilt = np.concatenate([batch[key] for batch in batches])
+        assert np.array_equal(rebuilt, value), key
+    expanded = expand_arrays(compacted)
+    assert np.array_equal(expanded["attention_mask"], inputs["attention_mask"])
+
+
+def test_compact_rejects(sample_batch):
+    """Test left padded, pairs of sentences and missing inputs are rejected."""
+    attention_mask = sample_batch["attention_mask"]
+    left_padded = {**sample_batch, "attention_mask": attention_mask[:, ::-1]}
+    pairs = {**sample_batch, "token_type_ids": attention_mask}
+    no_types = {
+        key: value for key, value in sample_batch.items() if key != "token_type_ids"
+    }
+
+    for batch in [left_padded, pairs, no_types]:
+        with pytest.raises(ValueError):
+            compact_batch(batch)
+
+
+@pytest.mark.parametrize("store", ["pickle", "gzip", "shards"])
+def test_compact_store_roundtrip(tmp_path, sample_tensor, store):
+    """Test compact tensors are stored compacted and read back with the same
+    inputs."""
+    if store == "pickle":
+        tensor = from_pickle(store_tensor(sample_tensor, tmp_path, "test"))
+        arrays = tensor.train_inputs.arrays
+        inputs = tensor.train_inputs
+    elif store == "gzip":
+        filepath = store_tensor(sample_tensor, tmp_path, "test", codec="gzip")
+        with CompressedTensorReader(filepath) as reader:
+            arrays = {
+                name.partition(".")[2]: reader[name]
+                for name in reader.keys()
+                if name.startswith("train_inputs.")
+            }
+            inputs = reader.to_tensor().train_inputs
+    else:
+        filepath = store_tensor(sample_tensor, tmp_path, "test", num_shards=2)
+        with ShardedTensorReader(filepath) as reader:
+            arrays = {key: None for key in reader.index["splits"]["train"]["keys"]}
+            shards = [reader.read_shard("train", shard) for shard in range(2)]
+            inputs = {
+                key: np.concatenate([shard[key] for shard in shards])
+                for key in shards[0]
+                if key != "labels"
+            }
+            assert np.array_equal(
+                reader.row("train", 3)["attention_mask"],
+                sample_tensor.train_inputs["attention_mask"][3],
+            )
+
+    assert "attention_mask" not in arrays
+    assert "lengths" in arrays
+    for key, value in sample_tensor.train_inputs.items():
+        assert np.array_equal(inputs[key], value), key
+
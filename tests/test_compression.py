@@ -0,0 +1,76 @@
+"""Compressed storage tests"""
+
+import numpy as np
+import pytest
+from transformers.tokenization_utils_base import BatchEncoding
+
+from bert_extractor.compression import (
+    CompressedTensorReader,
+    get_codec,
+    write_compressed,
+)
+from bert_extractor.extractors.base import TokenizedTensor
+from bert_extractor.utils import store_tensor
+
+
+@pytest.fixture
+def sample_tensor():
+    input_ids = np.arange(60).reshape(10, 6)
+    inputs = BatchEncoding(
+        {"input_ids": input_ids, "attention_mask": np.ones_like(input_ids)}
+    )
+    return TokenizedTensor(
+        train_inputs=inputs,
+        validation_inputs=BatchEncoding({k: v[:3] for k, v in inputs.items()}),
+        train_labels=np.arange(10),
+        validation_labels=np.arange(3),
+    )
+
+
+@pytest.mark.parametrize("codec", ["none", "gzip", "zstd", "lz4"])
+def test_store_read_roundtrip(tmp_path, sample_tensor, codec):
+    """Test each codec stores and reads back the same arrays."""
+    if codec == "zstd":
+        pytest.importorskip("zstandard")
+    elif codec == "lz4":
+        pytest.importorskip("lz4.frame")
+    filepath = store_tensor(sample_tensor, tmp_path, "test", codec=codec)
+
+    assert filepath.name == f"test_bert_extraction_tensor.{codec}"
+    with CompressedTensorReader(filepath) as reader:
+        tensor = reader.to_tensor()
+
+    for field in ["train_inputs", "validation_inputs"]:
+        for key, value in getattr(sample_tensor, field).items():
+            np.testing.assert_array_equal(getattr(tensor, field)[key], value)
+    np.testing.assert_array_equal(tensor.train_labels, sample_tensor.train_labels)
+
+
+def test_read_rows_across_chunks(tmp_path):
+    """Test reading a range of rows only returns those rows."""
+    array = np.arange(100).reshape(50, 2)
+    store = {"train_inputs.input_ids": array}
+    filepath = write_compressed(store, tmp_path / "rows", codec="gzip", chunk_rows=7)
+    with CompressedTensorReader(filepath) as reader:
+        np.testing.assert_array_equal(
+            reader.read("train_inputs.input_ids", 5, 23), array[5:23]
+        )
+        assert reader.shape("train_inputs.input_ids") == (50, 2)
+
+
+def test_read_empty_rows(tmp_path):
+    """Test an empty range of rows, also past the last chunk, reads no rows."""
+    array = np.arange(28, dtype=np.int32).reshape(14, 2)
+    store = {"train_inputs.input_ids": array}
+    filepath = write_compressed(store, tmp_path / "rows", codec="gzip", chunk_rows=7)
+    with CompressedTensorReader(filepath) as reader:
+        for start, stop in [(14, None), (7, 7), (10, 3)]:
+            rows = reader.read("train_inputs.input_ids", start, stop)
+            assert rows.shape == (0, 2)
+            assert rows.dtype == np.int32
+
+
+def test_unknown_codec():
+    """Test an unknown codec raises."""
+    with pytest.raises(ValueError):
+        get_codec("snappy")
@@ -0,0 +1,31 @@
+"""External shuffle and split tests"""
+
+from bert_extractor.external import external_shuffle_split
+
+
+def test_external_split_covers_rows():
+    """Test every row goes to one split only, spilling many runs."""
+    rows = [(f"sentence {index}", index) for index in range(1000)]
+
+    with external_shuffle_split(rows, 0.2, seed=1, memory_budget=512) as split:
+        train = list(split.train())
+        validation = list(split.validation())
+
+        assert len(split._runs["train"]) > 1
+        assert split.num_rows == {"train": len(train), "validation": len(validation)}
+    assert sorted(train + validation) == sorted(rows)
+    assert train != sorted(train)
+    assert 100 < len(validation) < 300
+
+
+def test_external_split_reproducible():
+    """Test the same seed gives the same split whatever the budget,
+    and another seed a different one."""
+    rows = [(f"sentence {index}", index) for index in range(500)]
+
+    with external_shuffle_split(rows, 0.1, 7, 256) as first, external_shuffle_split(
+        rows, 0.1, 7, 10 ** 6
+    ) as second, external_shuffle_split(rows, 0.1, 8, 256) as other:
+        assert list(first.train()) == list(second.train())
+        assert list(first.validation()) == list(second.validation())
+        assert list(first.train()) != list(other.train())
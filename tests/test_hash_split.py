@@ -0,0 +1,48 @@
+"""Hash split tests"""
+
+import numpy as np
+
+from bert_extractor.hash_split import (
+    example_hash,
+    hash_split_rows,
+    is_validation,
+    validation_mask,
+)
+
+
+def test_validation_fraction():
+    """Test the fraction of validation examples is close to test_size."""
+    examples = [f"review number {index}" for index in range(20000)]
+    mask = validation_mask(examples, 0.1, 2020)
+
+    assert abs(mask.mean() - 0.1) < 0.01
+    assert not validation_mask(examples[:100], 0, 2020).any()
+    assert validation_mask(examples[:100], 1, 2020).all()
+
+
+def test_stable_split():
+    """Test the split of each example doesn't depend on the other ones,
+    only on its content and the seed."""
+    examples = [f"review number {index}" for index in range(1000)]
+    mask = validation_mask(examples, 0.2, 2020)
+    appended = validation_mask(examples + ["new review"] * 10, 0.2, 2020)
+    shards = np.concatenate(
+        [
+            validation_mask(examples[start : start + 100], 0.2, 2020)
+            for start in range(0, 1000, 100)
+        ]
+    )
+
+    assert np.array_equal(appended[:1000], mask)
+    assert np.array_equal(shards, mask)
+    assert not np.array_equal(validation_mask(examples, 0.2, 1), mask)
+    assert [
+        split for split, _ in hash_split_rows(zip(examples, examples), 0.2, 2020)
+    ] == mask.tolist()
+
+
+def test_words_hash():
+    """Test sentences split into words hash by their words."""
+    assert example_hash(["SOCCER", "JAPAN"], 0) == example_hash(("SOCCER", "JAPAN"), 0)
+    assert example_hash(["SOCCER", "JAPAN"], 0) != example_hash(["SOCCERJAPAN"], 0)
+    assert is_validation(["SOCCER", "JAPAN"], 1, 0)
@@ -0,0 +1,62 @@
+"""Parallel JSON lines reader tests"""
+
+import gzip
+import json
+
+import pytest
+
+from bert_extractor.jsonl import (
+    parse_lines,
+    read_jsonl_gz,
+    resolve_backend,
+    split_lines,
+)
+from tests.extractors.sample_data import sample_extracted
+
+
+def test_split_lines():
+    """Test batches hold complete lines, whatever the chunks cut."""
+    lines = b"".join(b'{"id": %d}\n' % index for index in range(100))
+    chunks = [lines[start : start + 7] for start in range(0, len(lines), 7)]
+
+    batches = list(split_lines(chunks, batch_bytes=64))
+
+    assert len(batches) > 1
+    assert all(batch.endswith(b"\n") for batch in batches)
+    assert b"".join(batches) == lines
+
+
+@pytest.mark.parametrize("backend", ["json", "orjson"])
+def test_parse_lines_columns(sample_extracted, backend):
+    """Test only the asked columns are kept, with any backend."""
+    if backend == "orjson":
+        pytest.importorskip("orjson")
+    batch = "\n\n".join(json.dumps(review) for review in sample_extracted).encode()
+
+    records = parse_lines(batch, ("overall", "summary"), backend)
+
+    assert records == [
+        {"overall": review["overall"], "summary": review["summary"]}
+        for review in sample_extracted
+    ]
+
+
+def test_unknown_backend():
+    """Test an unknown backend raises."""
+    with pytest.raises(ValueError):
+        resolve_backend("simdjson")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_read_jsonl_gz(sample_extracted, workers):
+    """Test the records are read in order, across gzip members and workers."""
+    reviews = sample_extracted * 50
+    lines = "\n".join(json.dumps(review) for review in reviews).encode()
+    middle = len(lines) // 2
+    compressed = gzip.compress(lines[:middle]) + gzip.compress(lines[middle:])
+    chunks = [compressed[start : start + 97] for start in range(0, len(compressed), 97)]
+
+    batches = list(read_jsonl_gz(chunks, workers=workers, batch_bytes=1024))
+
+    assert len(batches) > 1
+    assert [record for batch in batches for record in batch] == reviews
@@ -0,0 +1,30 @@
+"""Bounded thread pool helpers tests"""
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from bert_extractor.parallel import batched, bounded_map
+
+
+def test_batched():
+    """Test the items are batched in order, the last batch shorter."""
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(batched([], 2)) == []
+
+
+def test_bounded_map():
+    """Test the results are in order and the items are read lazily."""
+    read = []
+    lock = Lock()
+
+    def items():
+        for item in range(100):
+            with lock:
+                read.append(item)
+            yield item
+
+    with ThreadPoolExecutor(4) as executor:
+        results = bounded_map(executor, lambda item: item * 2, items(), 3)
+        assert next(results) == 0
+        assert len(read) <= 4
+        assert list(results) == [item * 2 for item in range(1, 100)]
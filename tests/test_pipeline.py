@@ -0,0 +1,56 @@
+"""Staged pipeline tests"""
+
+from time import perf_counter, sleep
+
+import pytest
+
+from bert_extractor.pipeline import run_pipeline
+
+
+def slow(seconds):
+    """Stage that takes `seconds` per item."""
+
+    def stage(items):
+        for item in items:
+            sleep(seconds)
+            yield item
+
+    return stage
+
+
+def test_run_pipeline():
+    """Test the items go through every stage in order."""
+    stages = [
+        lambda items: (item + 1 for item in items),
+        lambda items: (item * 2 for item in items),
+    ]
+
+    assert list(run_pipeline(range(100), stages, 2)) == [
+        (item + 1) * 2 for item in range(100)
+    ]
+
+
+def test_run_pipeline_concurrent():
+    """Test the stages overlap, close to the slowest stage time."""
+    start = perf_counter()
+    list(run_pipeline(range(10), [slow(0.02), slow(0.02), slow(0.02)], 2))
+
+    assert perf_counter() - start < 0.5
+
+
+def test_run_pipeline_error():
+    """Test an error of a stage is raised to the consumer, and stopping
+    early doesn't hang."""
+
+    def failing(items):
+        for item in items:
+            if item == 5:
+                raise KeyError(item)
+            yield item
+
+    with pytest.raises(KeyError):
+        list(run_pipeline(range(10), [failing], 1))
+
+    results = run_pipeline(range(10 ** 6), [slow(0)], 1)
+    assert next(results) == 0
+    results.close()
@@ -0,0 +1,78 @@
+"""Corpus profiling tests"""
+
+from unittest.mock import patch
+
+import numpy as np
+
+from bert_extractor.extractors.reviews import ReviewsExtractor
+from bert_extractor.profiling import padded_bytes, profile_corpus
+from tests.extractors.sample_data import (
+    bert_vocab_path,
+    extractor_configs,
+    local_extractor_configs,
+    sample_extracted,
+)
+
+
+def test_profile_corpus(tmp_path, local_extractor_configs, sample_extracted):
+    """Test the profile of the reviews sample, labels are mapped stars, and
+    the preprocessed cache is used."""
+    configs = {**local_extractor_configs, "cache_path": str(tmp_path)}
+    with patch(
+        "bert_extractor.extractors.reviews.ReviewsExtractor.extract_raw"
+    ) as extract_raw:
+        extract_raw.return_value = sample_extracted
+        profile = profile_corpus(ReviewsExtractor(**configs), "")
+        cached = profile_corpus(ReviewsExtractor(**configs, read_cache=True), "")
+
+    extract_raw.assert_called_once()
+    assert cached.length_percentiles == profile.length_percentiles
+    assert profile.rows == profile.sampled_rows == 2
+    assert profile.label_counts == {4: 2}
+    assert profile.max_length % 8 == 0
+    assert profile.length_percentiles[100] <= profile.max_length
+    assert profile.padded_bytes["no_padding"] <= profile.padded_bytes["max_length"]
+
+
+def test_padded_bytes_policies():
+    """Test the estimated bytes of each padding policy."""
+    lengths = np.array([4, 8, 16, 16])
+
+    estimated = padded_bytes(lengths, 8, 16, 3, False, training_batch_size=2)
+    compact = padded_bytes(lengths, 8, 16, 1, False, training_batch_size=2)
+
+    labels_bytes = 8 * 8
+    assert estimated["max_length"] == 8 * 16 * 3 * 8 + labels_bytes
+    assert estimated["no_padding"] == 2 * 44 * 3 * 8 + labels_bytes
+    assert estimated["batch_longest"] >= estimated["no_padding"]
+    assert compact["max_length"] == 8 * 16 * 8 + labels_bytes
+
+
+def test_profile_compact_inputs(tmp_path, local_extractor_configs, sample_extracted):
+    """Test the estimated bytes count only the arrays the extraction keeps."""
+    configs = {**local_extractor_configs, "cache_path": str(tmp_path)}
+    with patch(
+        "bert_extractor.extractors.reviews.ReviewsExtractor.extract_raw"
+    ) as extract_raw:
+        extract_raw.return_value = sample_extracted
+        full = profile_corpus(ReviewsExtractor(**configs), "")
+        compact = profile_corpus(ReviewsExtractor(**configs, compact_inputs=True), "")
+
+    labels_bytes = 2 * 8
+    assert full.padded_bytes["max_length"] - labels_bytes == 3 * (
+        compact.padded_bytes["max_length"] - labels_bytes
+    )
+
+
+def test_profile_empty_corpus(tmp_path, local_extractor_configs):
+    """Test an empty corpus has a profile of zeros."""
+    configs = {**local_extractor_configs, "cache_path": str(tmp_path)}
+    with patch(
+        "bert_extractor.extractors.reviews.ReviewsExtractor.extract_raw"
+    ) as extract_raw:
+        extract_raw.return_value = []
+        profile = profile_corpus(ReviewsExtractor(**configs), "")
+
+    assert profile.rows == profile.max_length == 0
+    assert set(profile.length_percentiles.values()) == {0.0}
+    assert set(profile.padded_bytes.values()) == {0}
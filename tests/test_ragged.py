@@ -0,0 +1,48 @@
+"""Ragged arrays tests"""
+
+import numpy as np
+
+from bert_extractor.ragged import RaggedArray, StringBuffer
+
+
+def test_string_buffer():
+    """Test the strings are decoded back, one by one or in slices."""
+    strings = ["SOCCER", "", "Zürich", ","]
+    buffer = StringBuffer.from_strings(strings)
+
+    assert len(buffer) == 4
+    assert buffer[2] == "Zürich"
+    assert buffer[1:3] == ["", "Zürich"]
+    assert buffer.tolist() == strings
+    assert buffer.equals("SOCCER").tolist() == [True, False, False, False]
+    assert buffer.equals("").tolist() == [False, True, False, False]
+    assert buffer.equals("SOCCEZ").tolist() == [False] * 4
+    assert not StringBuffer.from_strings([]).equals("SOCCER").any()
+    assert buffer.take(np.array([3, 0])).tolist() == [",", "SOCCER"]
+    assert StringBuffer.concatenate([buffer, buffer]).tolist() == strings * 2
+
+
+def test_ragged_array():
+    """Test rows of words and labels keep their values when taken or sliced."""
+    rows = [["SOCCER", "JAPAN"], [], ["WIN", ",", "."]]
+    words = RaggedArray.from_lists(rows, dtype=str)
+    labels = RaggedArray.from_lists([[9, 1], [], [9, 9, 9]], dtype=np.int8)
+
+    assert words.tolist() == rows
+    assert words[2] == ["WIN", ",", "."]
+    assert words.lengths.tolist() == [2, 0, 3]
+    assert words[1:].tolist() == rows[1:]
+    assert words.take(np.array([2, 0])).tolist() == [rows[2], rows[0]]
+    assert labels.values.dtype == np.int8
+    assert labels[0].tolist() == [9, 1]
+    assert labels.flat_index(np.array([0, 2]), np.array([1, 2])).tolist() == [1, 4]
+
+
+def test_ragged_array_empty():
+    """Test rows without values keep the given dtype."""
+    words = RaggedArray.from_lists([[], []], dtype=str)
+    labels = RaggedArray.from_lists([[], []], dtype=np.int8)
+
+    assert isinstance(words.values, StringBuffer)
+    assert words.tolist() == [[], []]
+    assert labels.values.dtype == np.int8
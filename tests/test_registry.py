@@ -0,0 +1,75 @@
+"""Extractors registry tests"""
+
+from unittest.mock import patch
+
+import pytest
+
+from bert_extractor import registry
+from bert_extractor.configs import read_config
+from bert_extractor.constants import NER_KAGGLE_DATASET
+from bert_extractor.extractors.base import BaseBERTExtractor
+from bert_extractor.extractors.local import LocalFileExtractor
+from bert_extractor.extractors.ner import NERExtractor
+
+
+class FakeEntryPoint:
+    """Entry point that loads a given object."""
+
+    def __init__(self, name, loaded):
+        self.name = name
+        self.loaded = loaded
+
+    def load(self):
+        return self.loaded
+
+
+class PluginExtractor(BaseBERTExtractor):
+    """Extractor of a third party package."""
+
+
+def test_builtin_extractors():
+    """Test the built-in extractors and datasets are found by name."""
+    assert registry.get_extractor_class("ner") is NERExtractor
+    assert registry.get_extractor_class("local") is LocalFileExtractor
+    assert registry.resolve_url("ner", "conll_2003") == NER_KAGGLE_DATASET["conll_2003"]
+    assert registry.resolve_url("local", "data/reviews.csv") == "data/reviews.csv"
+
+    with pytest.raises(ValueError):
+        registry.get_extractor_class("unknown")
+    with pytest.raises(ValueError):
+        registry.resolve_url("ner", "unknown")
+
+
+def test_entry_point_extractors():
+    """Test extractors and datasets declared as entry points are found."""
+    installed = {
+        registry.EXTRACTORS_ENTRY_POINTS: {
+            "plugin": FakeEntryPoint("plugin", PluginExtractor)
+        },
+        registry.DATASETS_ENTRY_POINTS: {
+            "plugin": FakeEntryPoint("plugin", {"sample": "https://sample"})
+        },
+    }
+    with patch.object(registry, "_entry_points", side_effect=installed.get):
+        assert "plugin" in registry.extractor_types()
+        assert registry.get_extractor_class("plugin") is PluginExtractor
+        assert registry.resolve_url("plugin", "sample") == "https://sample"
+
+
+def test_registered_config(tmp_path):
+    """Test a registered extractor type passes the configuration validation."""
+    config_path = tmp_path / "config.json"
+    config_path.write_text(
+        '{"extractor_type": "registered", "extractor_config": {},'
+        ' "extractor_url": "sample"}'
+    )
+    with pytest.raises(ValueError):
+        read_config(config_path)
+
+    with patch.dict(registry._registered_extractors), patch.dict(
+        registry._registered_datasets
+    ):
+        registry.register_extractor("registered", PluginExtractor)
+        registry.register_datasets("registered", {"sample": "https://sample"})
+
+        assert read_config(config_path)["extractor_url"] == "sample"
@@ -0,0 +1,171 @@
+"""Extraction server tests"""
+
+from concurrent.futures import ThreadPoolExecutor
+import io
+import json
+from pathlib import Path
+from threading import Thread
+from unittest.mock import patch
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import numpy as np
+import pytest
+
+from bert_extractor.batching import MicroBatcher
+from bert_extractor.constants import NPZ_CONTENT_TYPE
+from bert_extractor.extractors.local import LocalFileExtractor
+from bert_extractor.manifest import read_manifest
+from bert_extractor.server import ExtractionServer
+from bert_extractor.utils import from_pickle
+from tests.extractors.sample_data import (
+    bert_vocab_path,
+    extractor_configs,
+    local_extractor_configs,
+)
+
+
+@pytest.fixture
+def server(tmp_path, local_extractor_configs):
+    """Server of a local file configuration, on a free port."""
+    data_path = tmp_path / "reviews.jsonl"
+    data_path.write_text(
+        "\n".join(
+            json.dumps({"text": f"soccer japan win {index}", "label": index % 2})
+            for index in range(10)
+        )
+    )
+    config_path = tmp_path / "config.json"
+    config_path.write_text(
+        json.dumps(
+            {
+                "extractor_type": "local",
+                "extractor_config": {
+                    **local_extractor_configs,
+                    "cache_path": str(tmp_path / "cache"),
+                },
+                "extractor_url": str(data_path),
+            }
+        )
+    )
+    server = ExtractionServer(
+        ("127.0.0.1", 0),
+        str(config_path),
+        max_length=16,
+        output_path=str(tmp_path / "output"),
+    )
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server, path, body, headers=None):
+    """POST a JSON body to the server."""
+    request = Request(
+        f"http://127.0.0.1:{server.server_address[1]}{path}",
+        data=json.dumps(body).encode(),
+        headers={"Content-Type": "application/json", **(headers or {})},
+    )
+    with urlopen(request) as response:
+        return response.read()
+
+
+def test_micro_batcher(local_extractor_configs):
+    """Test concurrent callers are tokenized together and each one gets
+    its own rows."""
+    tokenizer = LocalFileExtractor(**local_extractor_configs).load_tokenizer()
+    batcher = MicroBatcher(tokenizer, max_length=8, max_latency_ms=200)
+    sentences = [[f"soccer {index}"] * (index + 1) for index in range(4)]
+
+    with patch.object(batcher, "tokenizer", wraps=tokenizer) as wrapped:
+        with ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(batcher.tokenize, sentences))
+        batcher.close()
+
+        assert wrapped.call_count < len(sentences)
+    for request, result in zip(sentences, results):
+        expected = tokenizer(request, max_length=8, padding="max_length")
+        assert np.array_equal(result["input_ids"], expected["input_ids"])
+        assert result["attention_mask"].shape == (len(request), 8)
+        assert result["input_ids"].base is None
+    with pytest.raises(ValueError):
+        batcher.submit([])
+
+
+def test_server_tokenize(server):
+    """Test /tokenize returns the tokenized arrays, as JSON or npz."""
+    sentences = ["soccer japan win", "japan"]
+    tokenized = json.loads(post(server, "/tokenize", {"sentences": sentences}))
+    npz = post(
+        server, "/tokenize", {"sentences": sentences}, {"Accept": NPZ_CONTENT_TYPE}
+    )
+
+    assert set(tokenized) == {"input_ids", "token_type_ids", "attention_mask"}
+    assert np.array(tokenized["input_ids"]).shape == (2, 16)
+    with np.load(io.BytesIO(npz)) as arrays:
+        assert np.array_equal(arrays["input_ids"], tokenized["input_ids"])
+
+
+def test_server_extract(tmp_path, server):
+    """Test /extract stores the tensor with the resident extractor."""
+    response = json.loads(post(server, "/extract", {"output_path": str(tmp_path)}))
+    tensor = from_pickle(response["path"])
+
+    assert len(tensor.train_labels) + len(tensor.validation_labels) == 10
+    manifest = read_manifest(
+        tmp_path / response["path"].replace("tensor.pkl", "manifest.json")
+    )
+    assert manifest["max_length"] == tensor.train_inputs["input_ids"].shape[1]
+    assert manifest["output"] == Path(response["path"]).name
+
+
+def test_server_tokenize_manifest_length(server):
+    """Test /tokenize pads to the max length of the stored extraction."""
+    response = json.loads(post(server, "/extract", {}))
+    tensor = from_pickle(response["path"])
+    tokenized = json.loads(post(server, "/tokenize", {"sentences": ["japan"]}))
+
+    assert Path(response["path"]).parent == Path(server.output_path)
+    assert (
+        np.array(tokenized["input_ids"]).shape[1]
+        == tensor.train_inputs["input_ids"].shape[1]
+    )
+
+
+@pytest.mark.parametrize("sentences", ["soccer japan", [["soccer"]], [1, 2], None, []])
+def test_server_bad_sentences(server, sentences):
+    """Test /tokenize rejects sentences that are not a list of strings."""
+    with pytest.raises(HTTPError) as error:
+        post(server, "/tokenize", {"sentences": sentences})
+
+    assert error.value.code == 400
+    assert "sentences" in json.loads(error.value.read())["error"]
+
+
+def test_server_internal_error(server):
+    """Test failures while extracting, value errors included, are answered
+    with a JSON 500."""
+    extractor = server.load().extractor
+    with patch.object(
+        extractor, "extract_preprocess", side_effect=ValueError("bad data")
+    ):
+        with pytest.raises(HTTPError) as error:
+            post(server, "/extract", {})
+
+    assert error.value.code == 500
+    assert json.loads(error.value.read()) == {"error": "internal server error"}
+
+
+@pytest.mark.parametrize(
+    "body",
+    [[], {"config_path": "missing.json"}, {"codec": "snappy"}],
+)
+def test_server_bad_request(server, body):
+    """Test invalid bodies and configurations are answered with a JSON 400."""
+    with pytest.raises(HTTPError) as error:
+        post(server, "/extract", body)
+
+    assert error.value.code == 400
+    assert "error" in json.loads(error.value.read())
@@ -0,0 +1,59 @@
+"""Sharded storage tests"""
+
+import numpy as np
+import pytest
+from transformers.tokenization_utils_base import BatchEncoding
+
+from bert_extractor.extractors.base import TokenizedTensor
+from bert_extractor.shards import ShardedTensorReader
+from bert_extractor.utils import store_tensor
+
+
+@pytest.fixture
+def sample_tensor():
+    input_ids = np.arange(40).reshape(10, 4)
+    return TokenizedTensor(
+        train_inputs=BatchEncoding({"input_ids": input_ids}),
+        validation_inputs=BatchEncoding({"input_ids": input_ids[:3]}),
+        train_labels=np.arange(10),
+        validation_labels=np.arange(3),
+    )
+
+
+def test_shards_index(tmp_path, sample_tensor):
+    """Test the index keeps rows and offsets of fixed-size shards."""
+    index_path = store_tensor(sample_tensor, tmp_path, "test", num_shards=4)
+
+    with ShardedTensorReader(index_path) as reader:
+        shards = reader.index["splits"]["train"]["shards"]
+        assert [shard["rows"] for shard in shards] == [3, 3, 3, 1]
+        assert [shard["offset"] for shard in shards] == [0, 3, 6, 9]
+        assert reader.num_rows("validation") == 3
+
+
+def test_shards_for_rank(tmp_path, sample_tensor):
+    """Test the workers shards cover each row exactly once."""
+    index_path = store_tensor(sample_tensor, tmp_path, "test", num_shards=4)
+
+    with ShardedTensorReader(index_path) as reader:
+        labels = [
+            arrays["labels"]
+            for rank in range(3)
+            for arrays in reader.iter_rank("train", rank, 3)
+        ]
+        assert reader.shards_for("train", 1, 3) == [1]
+        np.testing.assert_array_equal(np.sort(np.concatenate(labels)), np.arange(10))
+
+
+def test_shards_global_row(tmp_path, sample_tensor):
+    """Test reading any global row returns its arrays."""
+    index_path = store_tensor(
+        sample_tensor, tmp_path, "test", codec="gzip", num_shards=3
+    )
+
+    with ShardedTensorReader(index_path) as reader:
+        row = reader.row("train", 7)
+        np.testing.assert_array_equal(row["input_ids"], [28, 29, 30, 31])
+        assert row["labels"] == 7
+        with pytest.raises(IndexError):
+            reader.row("train", 10)
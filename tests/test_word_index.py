@@ -0,0 +1,87 @@
+"""Word-piece index tests"""
+
+import numpy as np
+import pytest
+from transformers import AutoTokenizer
+
+from bert_extractor.cache_store import read_metadata
+from bert_extractor.constants import SPECIAL_TOKEN_WORD_ID
+from bert_extractor.ragged import RaggedArray
+from bert_extractor.word_index import WordIndex, tokenizer_key
+from tests.extractors.sample_data import bert_vocab_path
+
+SENTENCES = [
+    ["SOCCER", "JAPAN", "WIN", ","],
+    ["Japan", "advertised", "Dry", "skin", "!!", "Zürich"],
+    [],
+    ["", "face"],
+    ["dry"] * 40,
+]
+
+
+@pytest.fixture
+def tokenizer(bert_vocab_path):
+    return AutoTokenizer.from_pretrained(
+        bert_vocab_path, do_lower_case=True, use_fast=True
+    )
+
+
+@pytest.mark.parametrize("max_length", [8, 16, 64])
+def test_encode_matches_tokenizer(tokenizer, max_length):
+    """Test the assembled sentences, truncated, padded, with empty and
+    unknown words, are the same as the tokenizer ones."""
+    index = WordIndex(tokenizer)
+    encoded = index.encode(RaggedArray.from_lists(SENTENCES, dtype=str), max_length)
+    expected = tokenizer(
+        SENTENCES,
+        max_length=max_length,
+        padding="max_length",
+        truncation=True,
+        is_split_into_words=True,
+        return_tensors="np",
+    )
+
+    assert set(encoded.keys()) == set(expected.keys()) | {"word_ids"}
+    for key, value in expected.items():
+        assert encoded[key].dtype == value.dtype
+        assert np.array_equal(encoded[key], value), key
+    expected_word_ids = [
+        [SPECIAL_TOKEN_WORD_ID if word is None else word for word in word_ids]
+        for word_ids in map(expected.word_ids, range(len(SENTENCES)))
+    ]
+    assert encoded["word_ids"].tolist() == expected_word_ids
+
+
+def test_lengths_match_tokenizer(tokenizer):
+    """Test the untruncated lengths include the special tokens."""
+    index = WordIndex(tokenizer)
+    expected = tokenizer(SENTENCES, is_split_into_words=True)["input_ids"]
+
+    assert index.lengths(SENTENCES).tolist() == [len(ids) for ids in expected]
+    assert len(index) == len({word for sentence in SENTENCES for word in sentence})
+
+
+def test_save_load(tmp_path, tokenizer):
+    """Test a loaded index encodes known words without growing, and is recorded
+    as a cache entry."""
+    index = WordIndex(tokenizer)
+    index.add(["Japan", "advertised", ""])
+    filepath = tmp_path / f"{tokenizer_key(tokenizer)}.npz"
+    index.save(filepath, "NERExtractor")
+
+    loaded = WordIndex.load(filepath, tokenizer)
+    assert loaded.words == index.words
+    assert loaded.pieces == index.pieces
+    assert read_metadata(filepath).hits == 1
+    assert np.array_equal(
+        loaded.encode([["advertised", "Japan"]], 8)["input_ids"],
+        index.encode([["advertised", "Japan"]], 8)["input_ids"],
+    )
+    assert len(loaded) == 3
+
+
+def test_left_padding(tokenizer):
+    """Test a tokenizer padding on the left is rejected."""
+    tokenizer.padding_side = "left"
+    with pytest.raises(ValueError):
+        WordIndex(tokenizer)